@@ -5,16 +5,22 @@ import os
 import time
 import json
 import pytest
-import requests
 from datetime import datetime
 from loguru import logger
-from concurrent.futures import ThreadPoolExecutor
+from common.case_executor import iter_case_results, FailureLimit
+from common.case_discovery import CaseDiscovery
+from common.scheduling import CaseScheduler
+from api_test.utils.session_pool import SessionPool
+from api_test.utils.rate_limiter import RateLimiter
+from api_test.utils.timing import start_timing, stop_timing
+from api_test.validation import ResponseValidator
 
 
 class ApiTestRunner:
     """API测试运行器，用于执行API自动化测试"""
     
-    def __init__(self, config, parallel=1, tags=None, submodule=None):
+    def __init__(self, config, parallel=1, tags=None, submodule=None, engine=None, validation=None,
+                 failure_limit=None):
         """
         初始化API测试运行器
         
@@ -23,16 +29,29 @@ class ApiTestRunner:
             parallel: 并行执行的线程数
             tags: 要执行的测试标签
             submodule: 要执行的子模块，如 'user', 'order' 等
+            engine: 执行引擎，可选值为 thread, async，默认读取配置 api.engine
+            validation: 响应验证模式，可选值为 inline, process，默认读取配置 api.validation.mode
+            failure_limit: 各模块共享的FailureLimit实例，达到失败上限后不再开始新的用例
         """
         self.config = config
         self.parallel = parallel
         self.tags = tags
         self.submodule = submodule
+        self.failure_limit = failure_limit or FailureLimit()
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.discovery = CaseDiscovery(
+            "api", os.path.join(self.base_dir, "testcases"), workers=config.get('discovery.workers', 8))
+        self.scheduler = CaseScheduler("api", config.get('scheduling.strategy', 'lpt'))
         self.api_config = config.get_api_config()
         self.base_url = self.api_config.get('base_url', '')
         self.timeout = self.api_config.get('timeout', 30)
         self.headers = self.api_config.get('headers', {})
+        self.engine = engine or self.api_config.get('engine', 'thread')
+        self.async_config = dict(self.api_config.get('async', {}))
+        self.session_config = dict(self.api_config.get('session', {}))
+        self.validation_config = dict(self.api_config.get('validation', {}))
+        self.rate_limit_config = dict(self.api_config.get('rate_limit', {}))
+        self.load_config = dict(self.api_config.get('load', {}))
         
         # 如果指定了子模块，加载子模块配置
         if submodule:
@@ -45,233 +64,360 @@ class ApiTestRunner:
                     self.timeout = module_config['timeout']
                 if 'headers' in module_config:
                     self.headers.update(module_config.get('headers', {}))
+                if 'async' in module_config:
+                    self.async_config.update(module_config.get('async', {}))
+                if 'session' in module_config:
+                    self.session_config.update(module_config.get('session', {}))
+                if 'validation' in module_config:
+                    self.validation_config.update(module_config.get('validation', {}))
+                if 'rate_limit' in module_config:
+                    self.rate_limit_config.update(module_config.get('rate_limit', {}))
+                if 'load' in module_config:
+                    self.load_config.update(module_config.get('load', {}))
+        
+        # 按线程和base_url复用的长连接会话池
+        self.session_pool = SessionPool.from_config(self.session_config)
+        
+        # 响应解析和Schema验证，process模式下在进程池中执行
+        self.validator = ResponseValidator.from_config(self.validation_config, validation)
+        # 是否在结果中保存解析后的响应JSON，报告中已有响应文本，默认不重复保存
+        self.store_response_json = self.validation_config.get('store_json', False)
+        
+        # 按base_url限速，并发上限根据429/5xx和延迟突增自适应调整
+        max_concurrency = self.async_config.get('max_concurrency', 200) if self.engine == "async" else self.parallel
+        self.rate_limiter = RateLimiter.from_config(self.rate_limit_config, max_concurrency)
     
-    def run(self):
+    def run(self, test_cases=None):
         """
         运行API测试
         
+        Args:
+            test_cases: 要执行的测试用例列表，为None时从测试用例目录加载
+        
         Returns:
             测试结果列表
         """
+        return list(self.iter_results(test_cases))
+    
+    def run_load(self, test_cases=None, rps=None, concurrency=None, duration=None):
+        """
+        压测模式，在给定时间内循环重放测试用例的请求
+        
+        Args:
+            test_cases: 参与压测的测试用例列表，为None时从测试用例目录加载
+            rps: 目标每秒请求数，为None时读取配置 api.load.rps，为0时按固定并发发送
+            concurrency: 并发线程数，为None时读取配置 api.load.concurrency
+            duration: 持续时间(秒)，为None时读取配置 api.load.duration
+        
+        Returns:
+            压测报告字典，没有测试用例时返回None
+        """
+        from api_test.load_generator import LoadGenerator
+        
+        if test_cases is None:
+            test_cases = self._get_test_cases()
+        if not test_cases:
+            logger.warning("没有找到符合条件的API测试用例")
+            return None
+        
+        generator = LoadGenerator(
+            self,
+            rps=self.load_config.get('rps', 0) if rps is None else rps,
+            concurrency=concurrency or self.load_config.get('concurrency', 10),
+            duration=duration or self.load_config.get('duration', 60)
+        )
+        try:
+            report = generator.run(test_cases)
+        finally:
+            self.session_pool.close()
+        
+        latency = report["latency"]
+        logger.info(f"压测完成: 请求 {report['requests']}, 吞吐 {report['throughput']:.1f} 请求/秒, 错误率 {report['error_rate']:.2f}%, "
+                    f"延迟(毫秒) p50 {latency['p50']:.1f}, p90 {latency['p90']:.1f}, p99 {latency['p99']:.1f}, max {latency['max']:.1f}")
+        for name, case_report in report["cases"].items():
+            latency = case_report["latency"]
+            logger.info(f"  {name}: 请求 {case_report['requests']}, 错误率 {case_report['error_rate']:.2f}%, "
+                        f"p50 {latency['p50']:.1f}, p90 {latency['p90']:.1f}, p99 {latency['p99']:.1f}, max {latency['max']:.1f}")
+        return report
+    
+    def iter_results(self, test_cases=None):
+        """
+        运行API测试，并在每个用例完成后立即产出结果
+        
+        Args:
+            test_cases: 要执行的测试用例列表，为None时从测试用例目录加载
+        
+        Yields:
+            测试结果字典
+        """
         logger.info("开始执行API测试")
         if self.submodule:
             logger.info(f"子模块: {self.submodule}")
         
         # 获取测试用例
-        test_cases = self._get_test_cases()
+        if test_cases is None:
+            test_cases = self._get_test_cases()
         logger.info(f"找到 {len(test_cases)} 个API测试用例")
         
-        # 如果没有测试用例，返回空列表
+        # 如果没有测试用例，直接返回
         if not test_cases:
             logger.warning("没有找到符合条件的API测试用例")
-            return []
+            return
+        
+        # 预编译用例中的JSON Schema，相同的schema只编译一次
+        if self.validation_config.get('precompile', True):
+            self.validator.precompile([c["validate_schema"] for c in test_cases if c.get("validate_schema")])
+        
+        # 按历史耗时安排执行顺序，耗时长的用例先执行
+        workers = self.async_config.get('max_concurrency', 200) if self.engine == "async" else self.parallel
+        test_cases = self.scheduler.order(test_cases, workers)
         
         # 执行测试用例
-        results = []
+        count = 0
+        try:
+            for result in self._iter_test_case_results(test_cases):
+                count += 1
+                self.scheduler.record(result)
+                yield result
+        finally:
+            self.scheduler.finish("API")
+            if self.rate_limiter:
+                for host, stats in self.rate_limiter.stats().items():
+                    logger.info(f"API限流 {host}: 并发上限 {stats['limit']}, 退避 {stats['backoffs']} 次, 限速等待 {stats['waited']:.2f}秒")
+            # 释放会话池中的连接
+            self.session_pool.close()
+            self.validator.close()
+            if self.validator.mode != "process":
+                stats = self.validator.stats()
+                logger.debug(f"JSON Schema验证器缓存: {stats['size']} 个, 命中 {stats['hits']}, 未命中 {stats['misses']}, 淘汰 {stats['evictions']}")
+        
+        logger.info(f"API测试执行完成，共 {count} 个结果")
+    
+    def _iter_test_case_results(self, test_cases):
+        """按执行引擎和并行度执行测试用例"""
+        if self.engine == "async":
+            # 异步引擎执行
+            from api_test.async_engine import AsyncApiEngine
+            engine = AsyncApiEngine(
+                self,
+                max_concurrency=self.async_config.get('max_concurrency', 200),
+                per_host_limit=self.async_config.get('per_host_limit', 50)
+            )
+            logger.info(f"使用异步引擎执行API测试, 最大并发 {engine.max_concurrency}, 单主机并发 {engine.per_host_limit}")
+            return engine.iter_results(test_cases)
+        
         if self.parallel > 1 and len(test_cases) > 1:
-            # 并行执行
             logger.info(f"使用 {self.parallel} 个线程并行执行API测试")
-            with ThreadPoolExecutor(max_workers=self.parallel) as executor:
-                futures = [executor.submit(self._execute_test_case, test_case) for test_case in test_cases]
-                for future in futures:
-                    result = future.result()
-                    if result:
-                        results.append(result)
-        else:
-            # 串行执行
-            logger.info("串行执行API测试")
-            for test_case in test_cases:
-                result = self._execute_test_case(test_case)
-                if result:
-                    results.append(result)
-        
-        logger.info(f"API测试执行完成，共 {len(results)} 个结果")
-        return results
+            return iter_case_results(self._execute_test_case, test_cases, self.parallel, self.failure_limit)
+        
+        logger.info("串行执行API测试")
+        return iter_case_results(self._execute_test_case, test_cases, failure_limit=self.failure_limit)
     
     def _get_test_cases(self):
         """获取测试用例"""
-        test_cases = []
-        
-        # 确定测试用例目录
-        if self.submodule:
-            test_dir = os.path.join(self.base_dir, "testcases", self.submodule)
-        else:
-            test_dir = os.path.join(self.base_dir, "testcases")
-        
-        # 如果测试用例目录不存在，返回空列表
-        if not os.path.exists(test_dir):
-            logger.warning(f"测试用例目录不存在: {test_dir}")
-            return []
-        
-        # 遍历测试用例目录
-        for root, _, files in os.walk(test_dir):
-            for file in files:
-                # 只处理JSON文件
-                if file.endswith(".json"):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            test_case = json.load(f)
-                        
-                        # 如果指定了标签，检查测试用例是否包含该标签
-                        if self.tags and not self._match_tags(test_case.get("tags", [])):
-                            continue
-                        
-                        # 添加子模块信息
-                        if self.submodule:
-                            test_case["submodule"] = self.submodule
-                        else:
-                            # 从路径中提取子模块
-                            rel_path = os.path.relpath(file_path, os.path.join(self.base_dir, "testcases"))
-                            parts = os.path.dirname(rel_path).split(os.sep)
-                            if parts and parts[0]:
-                                test_case["submodule"] = parts[0]
-                        
-                        test_case["file_path"] = file_path
-                        test_cases.append(test_case)
-                    except Exception as e:
-                        logger.error(f"加载测试用例失败: {file_path}, 错误: {str(e)}")
-        
-        return test_cases
+        return self.discovery.discover(self.submodule, self.tags)
     
-    def _match_tags(self, case_tags):
-        """检查测试用例标签是否匹配"""
-        if not self.tags:
-            return True
-        
-        # 将标签字符串拆分为列表
-        tag_list = self.tags.split(",") if isinstance(self.tags, str) else self.tags
-        
-        # 检查是否有任何一个标签匹配
-        for tag in tag_list:
-            if tag.strip() in case_tags:
-                return True
-        
-        return False
-    
-    def _execute_test_case(self, test_case):
+    def _build_request(self, test_case):
         """
-        执行单个测试用例
+        根据测试用例构建请求参数
         
         Args:
             test_case: 测试用例数据
             
         Returns:
-            测试结果字典
+            请求参数字典
         """
-        name = test_case.get("name", "未命名测试")
-        description = test_case.get("description", "")
         method = test_case.get("method", "GET").upper()
         endpoint = test_case.get("endpoint", "")
-        headers = {**self.headers, **test_case.get("headers", {})}
-        params = test_case.get("params", {})
-        data = test_case.get("data", {})
-        json_data = test_case.get("json", None)
-        expected_status = test_case.get("expected_status", 200)
-        expected_response = test_case.get("expected_response", None)
-        validate_schema = test_case.get("validate_schema", None)
-        submodule = test_case.get("submodule", "")
         
         # 构建完整URL
         url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}" if endpoint else self.base_url
         
-        # 初始化结果
-        result = {
-            "name": name,
-            "description": description,
+        return {
+            "method": method,
+            "url": url,
+            "headers": {**self.headers, **test_case.get("headers", {})},
+            "params": test_case.get("params", {}),
+            "data": test_case.get("data", {}),
+            "json": test_case.get("json", None)
+        }
+    
+    def _init_result(self, test_case, request):
+        """
+        初始化测试结果
+        
+        Args:
+            test_case: 测试用例数据
+            request: 请求参数字典
+            
+        Returns:
+            测试结果字典
+        """
+        return {
+            "name": test_case.get("name", "未命名测试"),
+            "description": test_case.get("description", ""),
             "module": "api",
-            "submodule": submodule,
+            "submodule": test_case.get("submodule", ""),
+            "file_path": test_case.get("file_path", ""),
             "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "start_timestamp": int(time.time() * 1000),
             "status": "skipped",
             "duration": 0,
             "error": "",
             "traceback": "",
-            "request": {
-                "method": method,
-                "url": url,
-                "headers": headers,
-                "params": params,
-                "data": data,
-                "json": json_data
-            },
+            "request": request,
             "response": {}
         }
+    
+    def _finish_result(self, result):
+        """记录测试结束时间"""
+        result["end_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        result["end_timestamp"] = int(time.time() * 1000)
+        return result
+    
+    def _check_response(self, test_case, result, status_code, headers, text, outcome=None):
+        """
+        记录响应并验证是否符合预期
         
-        try:
-            logger.info(f"执行API测试: {name}")
-            logger.debug(f"请求: {method} {url}")
-            
-            # 记录开始时间
-            start_time = time.time()
-            
-            # 发送请求
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=headers,
-                params=params,
-                data=data,
-                json=json_data,
-                timeout=self.timeout
-            )
-            
-            # 计算耗时
-            duration = time.time() - start_time
-            result["duration"] = duration
-            
-            # 记录响应
-            result["response"] = {
-                "status_code": response.status_code,
-                "headers": dict(response.headers),
-                "content": response.text,
-            }
+        Args:
+            test_case: 测试用例数据
+            result: 测试结果字典
+            status_code: 响应状态码
+            headers: 响应头
+            text: 响应文本
+            outcome: 已完成的验证结果，为None时使用响应验证器验证
             
+        Returns:
+            测试结果字典
+        """
+        name = result["name"]
+        expected_status = test_case.get("expected_status", 200)
+        
+        # 记录响应
+        result["response"] = {
+            "status_code": status_code,
+            "headers": dict(headers),
+            "content": text,
+        }
+        
+        if self.store_response_json:
             try:
-                result["response"]["json"] = response.json()
-            except:
+                result["response"]["json"] = json.loads(text)
+            except ValueError:
                 pass
+        
+        # 验证响应内容和JSON Schema
+        if outcome is None:
+            outcome = self._submit_validation(test_case, status_code, text).result()
+        error, detail = outcome
+        
+        # 验证状态码
+        if status_code != expected_status:
+            result["status"] = "failed"
+            result["error"] = f"状态码不匹配: 期望 {expected_status}, 实际 {status_code}"
+            logger.error(f"测试失败: {name}, {result['error']}")
+            return result
+        
+        if error:
+            result["status"] = "failed"
+            result["error"] = error
+            if detail:
+                result["traceback"] = detail
+            logger.error(f"测试失败: {name}, {result['error']}")
+            return result
+        
+        # 测试通过
+        result["status"] = "passed"
+        logger.info(f"测试通过: {name}, 耗时: {result['duration']:.2f}秒")
+        return result
+    
+    def _submit_validation(self, test_case, status_code, text):
+        """
+        提交响应验证，状态码不匹配时不做验证
+        
+        Args:
+            test_case: 测试用例数据
+            status_code: 响应状态码
+            text: 响应文本
+            
+        Returns:
+            concurrent.futures.Future，结果为 (错误信息, 错误详情)
+        """
+        return self.validator.submit(
+            text,
+            expected_response=test_case.get("expected_response", None),
+            schema=test_case.get("validate_schema", None),
+            check=status_code == test_case.get("expected_status", 200)
+        )
+    
+    def _send_request(self, request):
+        """
+        发送请求，按主机限流并复用当前线程对应主机的长连接会话
+        
+        Args:
+            request: _build_request 返回的请求参数字典
             
-            # 验证状态码
-            if response.status_code != expected_status:
-                result["status"] = "failed"
-                result["error"] = f"状态码不匹配: 期望 {expected_status}, 实际 {response.status_code}"
-                logger.error(f"测试失败: {name}, {result['error']}")
-                return result
+        Returns:
+            (requests.Response, 耗时秒数, 各阶段耗时字典)，等待并发名额和令牌的时间不计入耗时；
+            未启用计时连接时各阶段耗时为None
+        """
+        limiter = self.rate_limiter.get(request["url"]) if self.rate_limiter else None
+        ticket = limiter.acquire() if limiter else None
+        
+        # 使用单调时钟记录开始时间
+        timing = start_timing() if self.session_pool.timing else None
+        start_time = time.perf_counter()
+        
+        session = self.session_pool.get(request["url"])
+        status_code = None
+        try:
+            response = session.request(
+                method=request["method"],
+                url=request["url"],
+                headers=request["headers"],
+                params=request["params"],
+                data=request["data"],
+                json=request["json"],
+                timeout=self.timeout
+            )
+            status_code = response.status_code
+        finally:
+            end_time = time.perf_counter()
+            duration = end_time - start_time
+            stop_timing()
+            if limiter:
+                limiter.release(ticket, status_code, duration)
+        
+        if timing is None:
+            return response, duration, None
+        if timing.headers_at is not None:
+            timing.add("body", end_time - timing.headers_at)
+        return response, duration, timing.to_dict(duration)
+    
+    def _execute_test_case(self, test_case):
+        """
+        执行单个测试用例
+        
+        Args:
+            test_case: 测试用例数据
             
-            # 验证响应内容
-            if expected_response:
-                try:
-                    response_json = response.json()
-                    for key, value in expected_response.items():
-                        if key not in response_json or response_json[key] != value:
-                            result["status"] = "failed"
-                            result["error"] = f"响应内容不匹配: 键 '{key}' 期望值 '{value}', 实际值 '{response_json.get(key, 'missing')}'"
-                            logger.error(f"测试失败: {name}, {result['error']}")
-                            return result
-                except Exception as e:
-                    result["status"] = "failed"
-                    result["error"] = f"验证响应内容失败: {str(e)}"
-                    result["traceback"] = str(e)
-                    logger.error(f"测试失败: {name}, {result['error']}")
-                    return result
+        Returns:
+            测试结果字典
+        """
+        request = self._build_request(test_case)
+        result = self._init_result(test_case, request)
+        name = result["name"]
+        
+        try:
+            logger.info(f"执行API测试: {name}")
+            logger.debug(f"请求: {request['method']} {request['url']}")
             
-            # 验证JSON Schema
-            if validate_schema:
-                try:
-                    from jsonschema import validate
-                    response_json = response.json()
-                    validate(instance=response_json, schema=validate_schema)
-                except Exception as e:
-                    result["status"] = "failed"
-                    result["error"] = f"JSON Schema验证失败: {str(e)}"
-                    result["traceback"] = str(e)
-                    logger.error(f"测试失败: {name}, {result['error']}")
-                    return result
+            # 发送请求并记录耗时
+            response, result["duration"], timing = self._send_request(request)
+            if timing:
+                result["timing"] = timing
             
-            # 测试通过
-            result["status"] = "passed"
-            logger.info(f"测试通过: {name}, 耗时: {duration:.2f}秒")
+            self._check_response(test_case, result, response.status_code, response.headers, response.text)
         
         except Exception as e:
             # 测试执行异常
@@ -280,8 +426,4 @@ class ApiTestRunner:
             result["traceback"] = str(e)
             logger.error(f"测试执行异常: {name}, 错误: {str(e)}")
         
-        # 记录结束时间
-        result["end_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        result["end_timestamp"] = int(time.time() * 1000)
-        
-        return result 
\ No newline at end of file
+        return self._finish_result(result)
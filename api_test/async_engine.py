@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import queue
+import asyncio
+import threading
+from loguru import logger
+
+from api_test.utils.timing import RequestTiming, create_trace_config
+
+
+class AsyncApiEngine:
+    """基于asyncio的API测试执行引擎，在单个事件循环中复用大量并发请求"""
+
+    def __init__(self, runner, max_concurrency=200, per_host_limit=50):
+        """
+        初始化异步执行引擎
+
+        Args:
+            runner: ApiTestRunner实例，复用其请求构建和响应验证逻辑
+            max_concurrency: 同时在途的最大请求数
+            per_host_limit: 单个主机的最大并发连接数
+        """
+        self.runner = runner
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.per_host_limit = max(1, int(per_host_limit))
+
+    def run(self, test_cases):
+        """
+        执行测试用例
+
+        Args:
+            test_cases: 测试用例列表
+
+        Returns:
+            测试结果列表，按完成顺序排列
+        """
+        return list(self.iter_results(test_cases))
+
+    def iter_results(self, test_cases):
+        """
+        在后台线程的事件循环中执行测试用例，并按完成顺序逐个产出结果
+
+        Args:
+            test_cases: 测试用例列表
+
+        Yields:
+            测试结果字典
+        """
+        results = queue.Queue()
+        done = object()
+        errors = []
+
+        def target():
+            try:
+                asyncio.run(self._run_all(test_cases, results.put))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                results.put(done)
+
+        thread = threading.Thread(target=target, name="AsyncApiEngine", daemon=True)
+        thread.start()
+
+        while True:
+            result = results.get()
+            if result is done:
+                break
+            if result:
+                yield result
+
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    async def _run_all(self, test_cases, on_result):
+        """在事件循环中执行全部测试用例，每完成一个用例回调一次"""
+        try:
+            import aiohttp
+        except ImportError:
+            raise RuntimeError("异步引擎需要安装aiohttp: pip install aiohttp")
+
+        pending = asyncio.Queue()
+        for test_case in test_cases:
+            pending.put_nowait(test_case)
+
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host_limit)
+        timeout = aiohttp.ClientTimeout(total=self.runner.timeout)
+        trace_configs = [create_trace_config()] if self.runner.session_pool.timing else None
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=trace_configs) as session:
+
+            failure_limit = self.runner.failure_limit
+
+            async def worker():
+                while not failure_limit.tripped:
+                    try:
+                        test_case = pending.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    result = await self._execute_test_case(session, test_case)
+                    failure_limit.record(result)
+                    on_result(result)
+
+            workers = min(self.max_concurrency, len(test_cases))
+            await asyncio.gather(*(worker() for _ in range(workers)))
+            if pending.qsize():
+                logger.warning(f"已取消 {pending.qsize()} 个未执行的用例")
+
+    async def _execute_test_case(self, session, test_case):
+        """
+        异步执行单个测试用例，结果结构与线程模式一致
+
+        Args:
+            session: aiohttp会话
+            test_case: 测试用例数据
+
+        Returns:
+            测试结果字典
+        """
+        runner = self.runner
+        request = runner._build_request(test_case)
+        result = runner._init_result(test_case, request)
+        name = result["name"]
+
+        try:
+            logger.info(f"执行API测试: {name}")
+            logger.debug(f"请求: {request['method']} {request['url']}")
+
+            # 按主机限流，等待并发名额和令牌的时间不计入耗时
+            limiter = runner.rate_limiter.get(request["url"]) if runner.rate_limiter else None
+            ticket = await limiter.acquire_async() if limiter else None
+
+            # 使用单调时钟记录开始时间
+            timing = RequestTiming() if runner.session_pool.timing else None
+            start_time = time.perf_counter()
+
+            # 与requests保持一致: 同时存在表单数据和JSON时只发送表单数据
+            kwargs = {"headers": request["headers"], "trace_request_ctx": timing}
+            if request["params"]:
+                kwargs["params"] = self._normalize_params(request["params"])
+            if request["data"]:
+                kwargs["data"] = request["data"]
+            elif request["json"] is not None:
+                kwargs["json"] = request["json"]
+
+            # 发送请求
+            status_code = None
+            try:
+                async with session.request(request["method"], request["url"], **kwargs) as response:
+                    text = await response.text(errors="replace")
+                    status_code = response.status
+                    headers = response.headers
+            finally:
+                if limiter:
+                    limiter.release(ticket, status_code, time.perf_counter() - start_time)
+
+            # 计算耗时
+            end_time = time.perf_counter()
+            result["duration"] = end_time - start_time
+            if timing is not None:
+                if timing.headers_at is not None:
+                    timing.add("body", end_time - timing.headers_at)
+                result["timing"] = timing.to_dict(result["duration"])
+
+            # process模式下在进程池中验证，不阻塞事件循环
+            outcome = None
+            if runner.validator.mode == "process":
+                outcome = await asyncio.wrap_future(runner._submit_validation(test_case, status_code, text))
+            runner._check_response(test_case, result, status_code, headers, text, outcome)
+
+        except Exception as e:
+            # 测试执行异常
+            result["status"] = "failed"
+            result["error"] = f"测试执行异常: {str(e) or type(e).__name__}"
+            result["traceback"] = str(e)
+            logger.error(f"测试执行异常: {name}, 错误: {str(e) or type(e).__name__}")
+
+        return runner._finish_result(result)
+
+    @staticmethod
+    def _normalize_params(params):
+        """aiohttp只接受字符串类型的查询参数，按requests的规则转换"""
+        normalized = []
+        for key, value in params.items():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for item in values:
+                if item is None:
+                    continue
+                normalized.append((str(key), str(item)))
+        return normalized
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+API执行引擎基准测试: 在本地启动一个带固定延迟的HTTP服务，
+分别使用线程池引擎和异步引擎执行相同数量的测试用例并对比耗时。
+
+用法:
+    python api_test/benchmark_engines.py --cases 1000 --delay 0.05 --parallel 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+from common.config_manager import ConfigManager
+from common.duration_history import DurationHistory
+from common.scheduling import CaseScheduler
+from api_test.api_test_runner import ApiTestRunner
+
+
+def start_server(delay):
+    """启动本地HTTP服务，每个请求延迟 delay 秒后返回JSON"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(delay)
+            body = json.dumps({"success": True}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API执行引擎基准测试")
+    parser.add_argument("--cases", type=int, default=500, help="测试用例数量")
+    parser.add_argument("--delay", type=float, default=0.05, help="服务端响应延迟(秒)")
+    parser.add_argument("--parallel", type=int, default=20, help="线程池引擎的线程数")
+    parser.add_argument("--concurrency", type=int, default=200, help="异步引擎的最大并发数")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    server = start_server(args.delay)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    test_cases = [
+        {"name": f"benchmark_{i}", "method": "GET", "endpoint": "/ping",
+         "expected_status": 200, "expected_response": {"success": True}}
+        for i in range(args.cases)
+    ]
+
+    config = ConfigManager("test")
+    timings = {}
+    # 基准测试用例的耗时记录到临时文件，不写入真实的耗时历史，避免影响LPT调度的估计
+    history_dir = tempfile.TemporaryDirectory(prefix="benchmark_history_")
+    for engine in ("thread", "async"):
+        runner = ApiTestRunner(config, parallel=args.parallel, engine=engine)
+        runner.scheduler = CaseScheduler("api", config.get('scheduling.strategy', 'lpt'),
+                                         history=DurationHistory(os.path.join(history_dir.name, f"{engine}.json")))
+        runner.base_url = base_url
+        runner.async_config.update({"max_concurrency": args.concurrency, "per_host_limit": args.concurrency})
+
+        start = time.time()
+        results = runner.run(list(test_cases))
+        elapsed = time.time() - start
+        passed = sum(1 for r in results if r.get("status") == "passed")
+        timings[engine] = elapsed
+        print(f"{engine:>6}: {len(results)} 个用例, 通过 {passed}, 耗时 {elapsed:.2f}秒, "
+              f"吞吐 {len(results) / elapsed:.1f} 请求/秒")
+
+    server.shutdown()
+    history_dir.cleanup()
+    if timings["async"] > 0:
+        print(f"加速比: {timings['thread'] / timings['async']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
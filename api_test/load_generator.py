@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import itertools
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+from common.latency_histogram import LatencyHistogram
+
+
+class CaseLoadStats:
+    """单个用例在压测中的请求数、错误数、状态码和延迟分布"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.status_codes = Counter()
+        self.first_error = ""
+        self.latency = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def record(self, latency, status_code, error):
+        """
+        记录一次请求
+
+        Args:
+            latency: 延迟(秒)
+            status_code: 响应状态码，请求异常时为None
+            error: 错误信息，请求成功时为空
+        """
+        self.latency.record(latency)
+        with self._lock:
+            self.requests += 1
+            self.status_codes[str(status_code) if status_code is not None else "error"] += 1
+            if error:
+                self.errors += 1
+                self.first_error = self.first_error or error
+
+    def to_dict(self, elapsed):
+        """
+        转换为报告中的字典
+
+        Args:
+            elapsed: 压测实际持续时间(秒)
+
+        Returns:
+            包含 requests、errors、error_rate、throughput、status_codes、latency 的字典
+        """
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": (self.errors / self.requests * 100) if self.requests else 0,
+            "throughput": self.requests / elapsed if elapsed > 0 else 0,
+            "status_codes": dict(self.status_codes),
+            "first_error": self.first_error,
+            "latency": self.latency.to_dict()
+        }
+
+
+class LoadGenerator:
+    """
+    压测模式，循环重放API测试用例的请求。
+    指定rps时按固定到达速率发送请求(开放模型)，延迟从计划发送时间算起，服务端变慢导致的排队也计入延迟；
+    否则由固定数量的线程连续发送请求(封闭模型)。
+    """
+
+    def __init__(self, runner, rps=0, concurrency=10, duration=60):
+        """
+        初始化压测
+
+        Args:
+            runner: ApiTestRunner实例，复用其请求构建、会话池和限流器
+            rps: 目标每秒请求数，为0时使用封闭模型
+            concurrency: 封闭模型的并发线程数，开放模型中为发送请求的最大线程数
+            duration: 压测持续时间(秒)
+        """
+        self.runner = runner
+        self.rps = max(0.0, float(rps or 0))
+        self.concurrency = max(1, int(concurrency))
+        self.duration = max(0.0, float(duration))
+
+    def run(self, test_cases):
+        """
+        执行压测
+
+        Args:
+            test_cases: 参与压测的测试用例列表，按顺序轮流发送
+
+        Returns:
+            压测报告字典，包括总体和各用例的请求数、错误率、吞吐量和延迟分布
+        """
+        targets = [(test_case.get("name", "未命名测试"), self.runner._build_request(test_case),
+                    test_case.get("expected_status", 200)) for test_case in test_cases]
+        stats = {name: CaseLoadStats() for name, _, _ in targets}
+
+        start_time = time.perf_counter()
+        if self.rps:
+            logger.info(f"开始压测: {len(targets)} 个用例, 目标 {self.rps:g} 请求/秒, 持续 {self.duration:g}秒")
+            self._run_open(targets, stats, start_time)
+        else:
+            logger.info(f"开始压测: {len(targets)} 个用例, 并发 {self.concurrency}, 持续 {self.duration:g}秒")
+            self._run_closed(targets, stats, start_time)
+        elapsed = time.perf_counter() - start_time
+
+        total = CaseLoadStats()
+        for case_stats in stats.values():
+            total.requests += case_stats.requests
+            total.errors += case_stats.errors
+            total.status_codes.update(case_stats.status_codes)
+            total.first_error = total.first_error or case_stats.first_error
+            total.latency.merge(case_stats.latency)
+
+        return dict(
+            total.to_dict(elapsed),
+            mode="rps" if self.rps else "concurrency",
+            target_rps=self.rps,
+            concurrency=self.concurrency,
+            duration=elapsed,
+            cases={name: case_stats.to_dict(elapsed) for name, case_stats in stats.items()}
+        )
+
+    def _fire(self, target, stats, scheduled_time=None):
+        """
+        发送一次请求并记录结果
+
+        Args:
+            target: (用例名称, 请求参数, 期望状态码)
+            stats: {用例名称: CaseLoadStats}
+            scheduled_time: 开放模型中的计划发送时间，延迟从该时间算起
+        """
+        name, request, expected_status = target
+        status_code = None
+        error = ""
+        start_time = time.perf_counter()
+        try:
+            response, _, _ = self.runner._send_request(request)
+            status_code = response.status_code
+            if status_code != expected_status:
+                error = f"状态码不匹配: 期望 {expected_status}, 实际 {status_code}"
+        except Exception as e:
+            error = f"请求异常: {str(e) or type(e).__name__}"
+        stats[name].record(time.perf_counter() - (scheduled_time or start_time), status_code, error)
+
+    def _run_closed(self, targets, stats, start_time):
+        """封闭模型：每个线程在上一个请求完成后立即发送下一个请求"""
+        deadline = start_time + self.duration
+        sequence = itertools.count()
+
+        def worker():
+            while time.perf_counter() < deadline:
+                self._fire(targets[next(sequence) % len(targets)], stats)
+
+        threads = [threading.Thread(target=worker, name=f"load-{i}", daemon=True) for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _run_open(self, targets, stats, start_time):
+        """开放模型：按计划时间发送请求，线程不足时请求排队，排队时间计入延迟"""
+        interval = 1 / self.rps
+        total = int(self.duration * self.rps)
+        # 排队的请求数有上限，避免服务端停止响应时内存无限增长
+        window = threading.BoundedSemaphore(self.concurrency * 2)
+
+        def fire(target, scheduled_time):
+            try:
+                self._fire(target, stats, scheduled_time)
+            finally:
+                window.release()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="load") as executor:
+            for i in range(total):
+                scheduled_time = start_time + i * interval
+                delay = scheduled_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                window.acquire()
+                executor.submit(fire, targets[i % len(targets)], scheduled_time)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+
+class TokenBucket:
+    """令牌桶限速器，按固定速率补充令牌，允许不超过桶容量的突发请求"""
+
+    def __init__(self, rate=0, burst=10):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数，为0时不限速
+            burst: 桶容量，即允许的最大突发请求数
+        """
+        self.rate = max(0.0, float(rate or 0))
+        self.burst = max(1.0, float(burst or 1))
+        self.waited = 0.0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        预留一个令牌
+
+        Returns:
+            取得令牌前需要等待的秒数，令牌数可以为负，表示已预留给等待中的请求
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += delay
+            return delay
+
+
+class AdaptiveConcurrency:
+    """AIMD自适应并发上限：响应正常时逐步增加并发，出现429/5xx或延迟突增时按比例减小"""
+
+    def __init__(self, initial=4, minimum=1, maximum=50, backoff_factor=0.5, latency_factor=2.0,
+                 backoff_status=None):
+        """
+        初始化自适应并发上限
+
+        Args:
+            initial: 初始并发上限
+            minimum: 最小并发上限
+            maximum: 最大并发上限
+            backoff_factor: 退避时并发上限乘以的系数
+            latency_factor: 延迟超过基准延迟的倍数时视为延迟突增
+            backoff_status: 触发退避的响应状态码列表
+        """
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = float(min(self.maximum, max(self.minimum, int(initial))))
+        self.backoff_factor = backoff_factor
+        self.latency_factor = latency_factor
+        self.backoff_status = set(backoff_status or [429, 500, 502, 503, 504])
+        self.backoffs = 0
+        self.baseline = None
+        self._samples = 0
+        self._in_flight = 0
+        self._issued = 0
+        self._backoff_ticket = 0
+        self._slow_start = True
+        self._condition = threading.Condition()
+
+    def try_acquire(self):
+        """
+        尝试占用一个并发名额
+
+        Returns:
+            请求编号，当前在途请求数已达上限时返回None
+        """
+        with self._condition:
+            if self._in_flight >= int(self.limit):
+                return None
+            self._in_flight += 1
+            self._issued += 1
+            return self._issued
+
+    def acquire(self):
+        """
+        占用一个并发名额，达到上限时阻塞等待
+
+        Returns:
+            请求编号，释放名额时传回
+        """
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+            self._issued += 1
+            return self._issued
+
+    def release(self, ticket, status_code, latency):
+        """
+        释放并发名额，并根据响应调整并发上限
+
+        Args:
+            ticket: acquire返回的请求编号
+            status_code: 响应状态码，请求异常时为None
+            latency: 请求耗时(秒)
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if self._is_congested(status_code, latency):
+                # 退避之前发出的请求反映的是旧的并发水平，不再重复退避
+                if ticket > self._backoff_ticket:
+                    self.limit = max(self.minimum, self.limit * self.backoff_factor)
+                    self._backoff_ticket = self._issued
+                    self._slow_start = False
+                    self.backoffs += 1
+                    logger.debug(f"并发上限退避到 {int(self.limit)}, 状态码: {status_code}, 耗时: {latency:.3f}秒")
+            elif self._slow_start:
+                # 首次退避之前每个正常响应加1，并发上限按轮次翻倍增长
+                self.limit = min(self.maximum, self.limit + 1)
+            else:
+                # 每一轮正常响应把并发上限加1
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _is_congested(self, status_code, latency):
+        """判断响应是否表明目标服务已过载，并更新基准延迟"""
+        if status_code is None or status_code in self.backoff_status:
+            return True
+        if self.baseline is not None and self._samples >= 5 and latency > self.baseline * self.latency_factor:
+            return True
+        # 基准延迟只使用正常响应更新
+        self._samples += 1
+        self.baseline = latency if self.baseline is None else self.baseline * 0.9 + latency * 0.1
+        return False
+
+
+class HostLimiter:
+    """单个base_url的限流器，组合令牌桶限速与自适应并发上限"""
+
+    def __init__(self, key, bucket, concurrency=None):
+        """
+        初始化主机限流器
+
+        Args:
+            key: 主机键，格式为 scheme://netloc
+            bucket: TokenBucket实例
+            concurrency: AdaptiveConcurrency实例，为None时不限制并发
+        """
+        self.key = key
+        self.bucket = bucket
+        self.concurrency = concurrency
+
+    def acquire(self):
+        """
+        在线程中等待并发名额和令牌
+
+        Returns:
+            请求编号，释放时传回
+        """
+        ticket = self.concurrency.acquire() if self.concurrency else None
+        delay = self.bucket.reserve()
+        if delay:
+            time.sleep(delay)
+        return ticket
+
+    async def acquire_async(self, poll_interval=0.01):
+        """
+        在事件循环中等待并发名额和令牌，不阻塞其他协程
+
+        Args:
+            poll_interval: 并发名额已满时的检查间隔(秒)
+
+        Returns:
+            请求编号，释放时传回
+        """
+        ticket = None
+        if self.concurrency:
+            ticket = self.concurrency.try_acquire()
+            while ticket is None:
+                await asyncio.sleep(poll_interval)
+                ticket = self.concurrency.try_acquire()
+        delay = self.bucket.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return ticket
+
+    def release(self, ticket, status_code, latency):
+        """
+        释放并发名额并反馈响应结果
+
+        Args:
+            ticket: acquire返回的请求编号
+            status_code: 响应状态码，请求异常时为None
+            latency: 请求耗时(秒)
+        """
+        if self.concurrency:
+            self.concurrency.release(ticket, status_code, latency)
+
+
+class RateLimiter:
+    """按base_url划分的限流器集合，同一主机的请求共享令牌桶和并发上限"""
+
+    def __init__(self, rate=0, burst=10, adaptive=True, initial_concurrency=4, min_concurrency=1,
+                 max_concurrency=50, backoff_factor=0.5, latency_factor=2.0, backoff_status=None):
+        """
+        初始化限流器
+
+        Args:
+            rate: 每个主机每秒的最大请求数，为0时不限速
+            burst: 每个主机允许的最大突发请求数
+            adaptive: 是否按AIMD自适应调整每个主机的并发上限
+            initial_concurrency: 初始并发上限
+            min_concurrency: 最小并发上限
+            max_concurrency: 最大并发上限
+            backoff_factor: 退避时并发上限乘以的系数
+            latency_factor: 延迟超过基准延迟的倍数时视为延迟突增
+            backoff_status: 触发退避的响应状态码列表
+        """
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.backoff_factor = backoff_factor
+        self.latency_factor = latency_factor
+        self.backoff_status = backoff_status
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, rate_limit_config, max_concurrency=50):
+        """
+        根据配置创建限流器
+
+        Args:
+            rate_limit_config: 限流配置字典，对应配置文件中的 api.rate_limit 或模块配置中的 rate_limit
+            max_concurrency: 配置未指定最大并发上限时使用的值，通常为并行数
+
+        Returns:
+            RateLimiter实例，配置未启用时返回None
+        """
+        rate_limit_config = rate_limit_config or {}
+        if not rate_limit_config.get('enabled', False):
+            return None
+        return cls(
+            rate=rate_limit_config.get('rate', 0),
+            burst=rate_limit_config.get('burst', 10),
+            adaptive=rate_limit_config.get('adaptive', True),
+            initial_concurrency=rate_limit_config.get('initial_concurrency', 4),
+            min_concurrency=rate_limit_config.get('min_concurrency', 1),
+            max_concurrency=rate_limit_config.get('max_concurrency') or max_concurrency,
+            backoff_factor=rate_limit_config.get('backoff_factor', 0.5),
+            latency_factor=rate_limit_config.get('latency_factor', 2.0),
+            backoff_status=rate_limit_config.get('backoff_status')
+        )
+
+    def get(self, url):
+        """
+        获取请求URL对应主机的限流器，不存在时创建
+
+        Args:
+            url: 请求URL或base_url
+
+        Returns:
+            HostLimiter实例
+        """
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            host = self._hosts.get(key)
+            if host is None:
+                concurrency = None
+                if self.adaptive:
+                    concurrency = AdaptiveConcurrency(
+                        self.initial_concurrency, self.min_concurrency, self.max_concurrency,
+                        self.backoff_factor, self.latency_factor, self.backoff_status)
+                host = HostLimiter(key, TokenBucket(self.rate, self.burst), concurrency)
+                self._hosts[key] = host
+            return host
+
+    def stats(self):
+        """
+        各主机的限流统计
+
+        Returns:
+            {主机键: {"limit", "backoffs", "waited"}}，未启用自适应并发时limit和backoffs为None
+        """
+        with self._lock:
+            hosts = list(self._hosts.values())
+        stats = {}
+        for host in hosts:
+            concurrency = host.concurrency
+            stats[host.key] = {
+                "limit": int(concurrency.limit) if concurrency else None,
+                "backoffs": concurrency.backoffs if concurrency else None,
+                "waited": host.bucket.waited
+            }
+        return stats
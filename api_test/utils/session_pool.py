@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from api_test.utils.timing import TimedHTTPAdapter
+
+
+class SessionPool:
+    """线程安全的requests会话池，每个工作线程按base_url持有独立的长连接会话"""
+
+    def __init__(self, pool_size=10, max_retries=0, backoff_factor=0, retry_status=None, keep_alive=True,
+                 timing=True):
+        """
+        初始化会话池
+
+        Args:
+            pool_size: 每个会话内单个主机保持的连接数
+            max_retries: 连接失败或命中重试状态码时的重试次数
+            backoff_factor: 重试退避系数(秒)
+            retry_status: 需要重试的响应状态码列表
+            keep_alive: 是否复用TCP/TLS连接
+            timing: 是否使用计时连接记录DNS、连接、TLS、首字节等阶段耗时
+        """
+        self.pool_size = max(1, int(pool_size))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_factor = backoff_factor
+        self.retry_status = list(retry_status or [])
+        self.keep_alive = keep_alive
+        self.timing = timing
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions = []
+
+    @classmethod
+    def from_config(cls, session_config):
+        """
+        根据配置创建会话池
+
+        Args:
+            session_config: 会话配置字典，对应配置文件中的 api.session
+
+        Returns:
+            SessionPool实例
+        """
+        session_config = session_config or {}
+        return cls(
+            pool_size=session_config.get('pool_size', 10),
+            max_retries=session_config.get('max_retries', 0),
+            backoff_factor=session_config.get('backoff_factor', 0),
+            retry_status=session_config.get('retry_status', []),
+            keep_alive=session_config.get('keep_alive', True),
+            timing=session_config.get('timing', True)
+        )
+
+    def get(self, url):
+        """
+        获取当前线程中对应主机的会话，不存在时创建
+
+        Args:
+            url: 请求URL或base_url
+
+        Returns:
+            requests.Session实例
+        """
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+
+        sessions = getattr(self._local, "sessions", None)
+        if sessions is None:
+            sessions = self._local.sessions = {}
+
+        session = sessions.get(key)
+        if session is None:
+            session = self._create_session()
+            sessions[key] = session
+            with self._lock:
+                self._sessions.append(session)
+            logger.debug(f"创建HTTP会话: {key}, 线程: {threading.current_thread().name}")
+        return session
+
+    def _create_session(self):
+        """创建配置好连接池和重试策略的会话"""
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.retry_status,
+            raise_on_status=False
+        )
+        adapter_class = TimedHTTPAdapter if self.timing else HTTPAdapter
+        adapter = adapter_class(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def close(self):
+        """关闭所有线程创建的会话，释放连接"""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as e:
+                logger.warning(f"关闭HTTP会话失败: {str(e)}")
+        self._local = threading.local()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import socket
+import threading
+from time import perf_counter
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+
+class RequestTiming:
+    """单个请求各阶段的耗时(秒)，复用连接时没有DNS、连接和TLS阶段"""
+
+    PHASES = ("dns", "connect", "tls", "ttfb", "body")
+
+    def __init__(self):
+        self.phases = {}
+        self.headers_at = None
+
+    def add(self, phase, seconds):
+        """累加一个阶段的耗时，重定向或重试时同一阶段会出现多次"""
+        self.phases[phase] = self.phases.get(phase, 0.0) + max(0.0, seconds)
+
+    def to_dict(self, total):
+        """
+        转换为测试结果中的timing字典
+
+        Args:
+            total: 请求总耗时(秒)
+
+        Returns:
+            {阶段: 耗时秒数}，包括 total；未测量的阶段不出现
+        """
+        timing = {phase: round(self.phases[phase], 6) for phase in self.PHASES if phase in self.phases}
+        timing["total"] = round(total, 6)
+        return timing
+
+
+# 当前线程正在发送的请求的耗时记录，由连接类写入
+_local = threading.local()
+
+
+def start_timing():
+    """开始记录当前线程下一个请求的各阶段耗时"""
+    _local.timing = RequestTiming()
+    return _local.timing
+
+
+def stop_timing():
+    """停止记录当前线程的请求耗时"""
+    _local.timing = None
+
+
+def current_timing():
+    """当前线程正在记录的RequestTiming，未开始记录时返回None"""
+    return getattr(_local, "timing", None)
+
+
+class TimingConnectionMixin:
+    """记录DNS解析、TCP连接和首字节时间的urllib3连接混入类"""
+
+    def _new_conn(self):
+        timing = current_timing()
+        if timing is None:
+            return super()._new_conn()
+
+        start = perf_counter()
+        try:
+            infos = socket.getaddrinfo(self._dns_host.strip("[]"), self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror:
+            # 由urllib3给出统一的解析错误
+            return super()._new_conn()
+        resolved = perf_counter()
+        timing.add("dns", resolved - start)
+
+        # 与urllib3的create_connection一样依次尝试解析到的每个地址，前一个地址连接失败时尝试下一个；
+        # 每次尝试时把_dns_host临时替换为该地址，建立连接后立即恢复，TLS仍使用原主机名
+        dns_host = self._dns_host
+        error = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in infos):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+        finally:
+            self._dns_host = dns_host
+            timing.add("connect", perf_counter() - resolved)
+        if error is None:
+            return super()._new_conn()
+        raise error
+
+    def getresponse(self, *args, **kwargs):
+        timing = current_timing()
+        start = perf_counter()
+        response = super().getresponse(*args, **kwargs)
+        if timing is not None:
+            timing.headers_at = perf_counter()
+            timing.add("ttfb", timing.headers_at - start)
+        return response
+
+
+class TimedHTTPConnection(TimingConnectionMixin, HTTPConnection):
+    """记录各阶段耗时的HTTP连接"""
+
+
+class TimedHTTPSConnection(TimingConnectionMixin, HTTPSConnection):
+    """记录各阶段耗时的HTTPS连接，TLS握手时间为建立连接的总时间减去DNS和TCP连接时间"""
+
+    def connect(self):
+        timing = current_timing()
+        if timing is None:
+            return super().connect()
+
+        before = timing.phases.get("dns", 0.0) + timing.phases.get("connect", 0.0)
+        start = perf_counter()
+        super().connect()
+        elapsed = perf_counter() - start
+        timing.add("tls", elapsed - (timing.phases.get("dns", 0.0) + timing.phases.get("connect", 0.0) - before))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """使用计时连接的requests适配器，请求前调用start_timing()后即可得到各阶段耗时"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+def create_trace_config():
+    """
+    创建记录请求各阶段耗时的aiohttp TraceConfig，请求时通过 trace_request_ctx 传入RequestTiming。
+    aiohttp的连接建立包含TLS握手，因此异步引擎的connect阶段包含TLS，不单独记录tls。
+
+    Returns:
+        aiohttp.TraceConfig实例
+    """
+    import aiohttp
+
+    def timing_of(context):
+        timing = context.trace_request_ctx
+        return timing if isinstance(timing, RequestTiming) else None
+
+    async def on_request_start(session, context, params):
+        context.request_start = perf_counter()
+        context.sent_at = context.request_start
+
+    async def on_dns_resolvehost_start(session, context, params):
+        context.dns_start = perf_counter()
+
+    async def on_dns_resolvehost_end(session, context, params):
+        timing = timing_of(context)
+        if timing is not None:
+            timing.add("dns", perf_counter() - context.dns_start)
+
+    async def on_connection_create_start(session, context, params):
+        timing = timing_of(context)
+        context.connect_start = perf_counter()
+        context.dns_before = timing.phases.get("dns", 0.0) if timing is not None else 0.0
+
+    async def on_connection_create_end(session, context, params):
+        timing = timing_of(context)
+        context.sent_at = perf_counter()
+        if timing is not None:
+            dns = timing.phases.get("dns", 0.0) - context.dns_before
+            timing.add("connect", context.sent_at - context.connect_start - dns)
+
+    async def on_request_end(session, context, params):
+        timing = timing_of(context)
+        if timing is not None:
+            timing.headers_at = perf_counter()
+            timing.add("ttfb", timing.headers_at - context.sent_at)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
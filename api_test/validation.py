@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from loguru import logger
+
+
+def schema_hash(schema):
+    """
+    计算JSON Schema的规范化哈希，键顺序不同的相同schema得到相同的哈希
+
+    Args:
+        schema: JSON Schema字典
+
+    Returns:
+        十六进制哈希字符串
+    """
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class SchemaValidatorCache:
+    """已编译的JSON Schema验证器缓存，按规范化的schema哈希索引，超出容量时淘汰最久未使用的验证器"""
+
+    def __init__(self, max_size=128):
+        """
+        初始化验证器缓存
+
+        Args:
+            max_size: 最多缓存的验证器数量
+        """
+        self.max_size = max(1, int(max_size))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._validators = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, schema, key=None):
+        """
+        获取已编译的验证器，未命中时编译并加入缓存
+
+        Args:
+            schema: JSON Schema字典
+            key: schema哈希，为None时自动计算
+
+        Returns:
+            jsonschema验证器实例
+
+        Raises:
+            jsonschema.exceptions.SchemaError: schema本身不合法
+        """
+        key = key or schema_hash(schema)
+        with self._lock:
+            validator = self._validators.get(key)
+            if validator is not None:
+                self._validators.move_to_end(key)
+                self.hits += 1
+                return validator
+            self.misses += 1
+
+        from jsonschema.validators import validator_for
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        validator = cls(schema)
+
+        with self._lock:
+            self._validators[key] = validator
+            self._validators.move_to_end(key)
+            while len(self._validators) > self.max_size:
+                self._validators.popitem(last=False)
+                self.evictions += 1
+        return validator
+
+    def precompile(self, schemas):
+        """
+        预编译一组schema，相同的schema只编译一次，不计入命中统计
+
+        Args:
+            schemas: JSON Schema字典的可迭代对象
+
+        Returns:
+            新编译的验证器数量
+        """
+        compiled = 0
+        attempted = 0
+        for schema in schemas:
+            key = schema_hash(schema)
+            with self._lock:
+                if key in self._validators:
+                    continue
+            attempted += 1
+            try:
+                self.get(schema, key)
+                compiled += 1
+            except Exception as e:
+                logger.warning(f"预编译JSON Schema失败: {str(e).splitlines()[0]}")
+        with self._lock:
+            self.misses -= attempted
+        return compiled
+
+    def grow(self, max_size):
+        """
+        扩大缓存容量，已缓存的验证器保留；容量只增不减，多个验证器共用缓存时互不影响
+
+        Args:
+            max_size: 需要的最小容量
+        """
+        with self._lock:
+            self.max_size = max(self.max_size, int(max_size))
+
+    def stats(self):
+        """缓存统计，包括 size、hits、misses、evictions"""
+        with self._lock:
+            return {
+                "size": len(self._validators),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+# 当前进程的验证器缓存，进程池中的每个进程各有一份
+_validator_cache = SchemaValidatorCache()
+
+
+def configure_cache(max_size=128, schemas=None):
+    """
+    重建当前进程的验证器缓存并预编译schema，也用作进程池的初始化函数
+
+    Args:
+        max_size: 最多缓存的验证器数量
+        schemas: 需要预编译的JSON Schema列表
+    """
+    global _validator_cache
+    _validator_cache = SchemaValidatorCache(max_size)
+    if schemas:
+        _validator_cache.precompile(schemas)
+
+
+def get_validator(schema, key=None):
+    """
+    获取已编译的JSON Schema验证器，同一schema在每个进程中只编译一次
+
+    Args:
+        schema: JSON Schema字典
+        key: schema哈希，为None时自动计算
+
+    Returns:
+        jsonschema验证器实例
+    """
+    return _validator_cache.get(schema, key)
+
+
+def validate_response(text, expected_response=None, schema=None, key=None):
+    """
+    解析响应JSON并验证响应内容和JSON Schema，可以在线程中直接调用，也可以提交到进程池。
+    只返回验证结论，进程池模式下不把解析后的响应JSON传回主进程
+
+    Args:
+        text: 响应文本
+        expected_response: 期望的响应内容，逐个比较顶层键
+        schema: JSON Schema字典
+        key: schema哈希
+
+    Returns:
+        (错误信息, 错误详情)，验证通过时均为None
+    """
+    if not expected_response and not schema:
+        return None, None
+
+    try:
+        response_json = json.loads(text)
+    except Exception as e:
+        if expected_response:
+            return f"验证响应内容失败: {str(e)}", str(e)
+        return f"JSON Schema验证失败: {str(e)}", str(e)
+
+    # 验证响应内容
+    if expected_response:
+        try:
+            for k, value in expected_response.items():
+                if k not in response_json or response_json[k] != value:
+                    return f"响应内容不匹配: 键 '{k}' 期望值 '{value}', 实际值 '{response_json.get(k, 'missing')}'", None
+        except Exception as e:
+            return f"验证响应内容失败: {str(e)}", str(e)
+
+    # 验证JSON Schema
+    if schema:
+        try:
+            from jsonschema.exceptions import best_match
+            error = best_match(get_validator(schema, key).iter_errors(response_json))
+            if error is not None:
+                raise error
+        except Exception as e:
+            return f"JSON Schema验证失败: {str(e)}", str(e)
+
+    return None, None
+
+
+class ResponseValidator:
+    """响应验证器，inline模式在当前线程验证，process模式把JSON解析和Schema验证交给进程池以避开GIL，进程间只传回验证结论"""
+
+    def __init__(self, mode="inline", workers=None, cache_size=128):
+        """
+        初始化响应验证器
+
+        Args:
+            mode: 验证模式，可选值为 inline, process
+            workers: process模式的进程数，为None时等于CPU核数
+            cache_size: 每个进程最多缓存的已编译验证器数量
+        """
+        self.mode = mode
+        self.workers = workers
+        self.cache_size = cache_size
+        self._schemas = []
+        self._executor = None
+        self._lock = threading.Lock()
+        if mode != "process":
+            # 当前进程的缓存由所有inline模式的验证器共用，只在配置的容量更大时扩容，不丢弃已编译的验证器
+            _validator_cache.grow(cache_size)
+
+    @classmethod
+    def from_config(cls, validation_config, mode=None):
+        """
+        根据配置创建响应验证器
+
+        Args:
+            validation_config: 验证配置字典，对应配置文件中的 api.validation
+            mode: 验证模式，为None时读取配置中的mode
+
+        Returns:
+            ResponseValidator实例
+        """
+        validation_config = validation_config or {}
+        return cls(
+            mode=mode or validation_config.get('mode', 'inline'),
+            workers=validation_config.get('workers'),
+            cache_size=validation_config.get('cache_size', 128)
+        )
+
+    def precompile(self, schemas):
+        """
+        预编译用例中的schema；process模式下在进程池的每个进程启动时编译
+
+        Args:
+            schemas: JSON Schema字典列表
+        """
+        unique = {}
+        for schema in schemas:
+            unique.setdefault(schema_hash(schema), schema)
+        if not unique:
+            return
+
+        if self.mode == "process":
+            with self._lock:
+                self._schemas = list(unique.values())
+            logger.info(f"进程池启动时将预编译 {len(unique)} 个JSON Schema")
+            return
+        compiled = _validator_cache.precompile(unique.values())
+        logger.info(f"已预编译 {compiled} 个JSON Schema")
+
+    def submit(self, text, expected_response=None, schema=None, check=True):
+        """
+        提交一次响应验证，没有需要验证的内容时不提交到进程池
+
+        Args:
+            text: 响应文本
+            expected_response: 期望的响应内容
+            schema: JSON Schema字典
+            check: 为False时不做验证(例如状态码已不匹配)
+
+        Returns:
+            concurrent.futures.Future，结果为 validate_response 的返回值
+        """
+        if not check:
+            expected_response = schema = None
+        key = schema_hash(schema) if schema else None
+        if self.mode != "process" or (not expected_response and not schema):
+            future = Future()
+            try:
+                future.set_result(validate_response(text, expected_response, schema, key))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=configure_cache,
+                                                     initargs=(self.cache_size, self._schemas))
+            executor = self._executor
+        return executor.submit(validate_response, text, expected_response, schema, key)
+
+    def validate(self, text, expected_response=None, schema=None, check=True):
+        """
+        验证响应并等待结果
+
+        Returns:
+            validate_response 的返回值
+        """
+        return self.submit(text, expected_response, schema, check).result()
+
+    def stats(self):
+        """当前进程的验证器缓存统计，process模式下验证在子进程中完成，不计入此统计"""
+        return _validator_cache.stats()
+
+    def close(self):
+        """关闭进程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
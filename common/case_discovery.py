@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import copy
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+
+INDEX_VERSION = 2
+
+
+def parse_tags(tags):
+    """
+    将标签参数转换为标签列表
+
+    Args:
+        tags: 逗号分隔的标签字符串或标签列表
+
+    Returns:
+        去除空白后的标签列表
+    """
+    if not tags:
+        return []
+    tag_list = tags.split(",") if isinstance(tags, str) else tags
+    return [tag.strip() for tag in tag_list if tag.strip()]
+
+
+def match_tags(case_tags, tags):
+    """
+    检查测试用例标签是否匹配
+
+    Args:
+        case_tags: 测试用例的标签列表
+        tags: 要执行的标签，逗号分隔的字符串或列表
+
+    Returns:
+        没有指定标签或任意一个标签匹配时返回True
+    """
+    tag_list = parse_tags(tags)
+    if not tag_list:
+        return True
+
+    # 检查是否有任何一个标签匹配
+    for tag in tag_list:
+        if tag in case_tags:
+            return True
+
+    return False
+
+
+class CaseDiscovery:
+    """测试用例发现组件，并行加载用例文件，并按路径、修改时间和大小持久化解析后的用例"""
+
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, module, testcases_dir, index_path=None, workers=8):
+        """
+        初始化测试用例发现组件
+
+        Args:
+            module: 模块类型，如 'api', 'ui', 'ssh'
+            testcases_dir: 测试用例根目录
+            index_path: 用例索引文件路径，默认为 data/case_index_<模块>.json
+            workers: 并行加载用例文件的线程数
+        """
+        self.module = module
+        self.testcases_dir = testcases_dir
+        if index_path is None:
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            index_path = os.path.join(base_dir, "data", f"case_index_{module}.json")
+        self.index_path = index_path
+        self.workers = max(1, int(workers))
+
+        with CaseDiscovery._locks_guard:
+            self._lock = CaseDiscovery._locks.setdefault(self.index_path, threading.Lock())
+
+    def discover(self, submodule=None, tags=None):
+        """
+        获取测试用例
+
+        用例索引中记录了每个文件的修改时间、大小和解析后的用例，文件未变化时直接使用索引中的用例，
+        不再读取和解析该文件；只有新增或修改过的文件需要解析。
+
+        Args:
+            submodule: 要执行的子模块，为None时加载全部用例
+            tags: 要执行的测试标签
+
+        Returns:
+            测试用例列表，按文件路径排序
+        """
+        # 确定测试用例目录
+        if submodule:
+            test_dir = os.path.join(self.testcases_dir, submodule)
+        else:
+            test_dir = self.testcases_dir
+
+        # 如果测试用例目录不存在，返回空列表
+        if not os.path.exists(test_dir):
+            logger.warning(f"测试用例目录不存在: {test_dir}")
+            return []
+
+        with self._lock:
+            index = self._load_index()
+            entries = index["files"]
+            files = self._scan(test_dir)
+            tag_list = parse_tags(tags)
+
+            # 文件未变化时使用索引中的用例，其余文件需要重新解析
+            cases = {}
+            to_load = []
+            for rel_path, stat in files:
+                entry = entries.get(rel_path)
+                if entry is not None and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    cases[rel_path] = entry["case"]
+                else:
+                    to_load.append(rel_path)
+
+            # 并行加载用例文件
+            if len(to_load) > 1 and self.workers > 1:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    loaded = list(executor.map(self._load_case, to_load))
+            else:
+                loaded = [self._load_case(rel_path) for rel_path in to_load]
+
+            # 更新用例索引，并移除已删除文件的记录
+            stats = dict(files)
+            changed = False
+            for rel_path, test_case in zip(to_load, loaded):
+                if test_case is None:
+                    entries.pop(rel_path, None)
+                    continue
+                stat = stats[rel_path]
+                entries[rel_path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "case": test_case}
+                cases[rel_path] = test_case
+                changed = True
+
+            prefix = os.path.relpath(test_dir, self.testcases_dir)
+            prefix = "" if prefix == "." else prefix + os.sep
+            for rel_path in list(entries):
+                if rel_path.startswith(prefix) and rel_path not in stats:
+                    del entries[rel_path]
+                    changed = True
+
+            if changed:
+                self._save_index(index)
+
+            # 按标签筛选，返回副本，执行时对用例的修改不会影响索引
+            test_cases = []
+            for rel_path, _ in files:
+                test_case = cases.get(rel_path)
+                if test_case is None or (tag_list and not match_tags(test_case.get("tags", []), tag_list)):
+                    continue
+                test_cases.append(self._annotate(copy.deepcopy(test_case), rel_path, submodule))
+
+        logger.debug(f"{self.module}用例发现: 扫描 {len(files)} 个文件, 解析 {len(to_load)} 个, 匹配 {len(test_cases)} 个")
+        return test_cases
+
+    def _scan(self, test_dir):
+        """遍历测试用例目录，返回 (相对路径, 文件状态) 列表"""
+        files = []
+        stack = [test_dir]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError as e:
+                logger.error(f"读取测试用例目录失败: {directory}, 错误: {str(e)}")
+                continue
+
+            subdirs = []
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                elif entry.name.endswith(".json") and entry.is_file():
+                    rel_path = os.path.relpath(entry.path, self.testcases_dir)
+                    files.append((rel_path, entry.stat()))
+            stack.extend(reversed(subdirs))
+        return files
+
+    def _load_case(self, rel_path):
+        """读取并解析单个用例文件，失败时返回None"""
+        file_path = os.path.join(self.testcases_dir, rel_path)
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                test_case = json.load(f)
+            if not isinstance(test_case, dict):
+                raise ValueError("测试用例必须是JSON对象")
+            return test_case
+        except Exception as e:
+            logger.error(f"加载测试用例失败: {file_path}, 错误: {str(e)}")
+            return None
+
+    def _annotate(self, test_case, rel_path, submodule):
+        """添加子模块和文件路径信息"""
+        if submodule:
+            test_case["submodule"] = submodule
+        else:
+            # 从路径中提取子模块
+            parts = os.path.dirname(rel_path).split(os.sep)
+            if parts and parts[0]:
+                test_case["submodule"] = parts[0]
+
+        test_case["file_path"] = os.path.join(self.testcases_dir, rel_path)
+        return test_case
+
+    def _load_index(self):
+        """加载用例索引，文件不存在或版本不一致时返回空索引"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION and index.get("testcases_dir") == self.testcases_dir:
+                return index
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"用例索引损坏，将重新建立: {self.index_path}, 错误: {str(e)}")
+        return {"version": INDEX_VERSION, "testcases_dir": self.testcases_dir, "files": {}}
+
+    def _save_index(self, index):
+        """原子地写入用例索引"""
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            logger.warning(f"保存用例索引失败: {self.index_path}, 错误: {str(e)}")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from loguru import logger
+
+
+class FailureLimit:
+    """失败数上限，同一次运行中的各模块共享，达到上限后不再开始新的用例"""
+
+    def __init__(self, max_failures=0):
+        """
+        初始化失败数上限
+
+        Args:
+            max_failures: 允许的最大失败数，为0时不限制
+        """
+        self.max_failures = max(0, int(max_failures or 0))
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def tripped(self):
+        """是否已达到失败数上限"""
+        return bool(self.max_failures) and self.failures >= self.max_failures
+
+    def record(self, result):
+        """
+        记录一个测试结果
+
+        Args:
+            result: 测试结果字典
+
+        Returns:
+            记录后是否已达到失败数上限
+        """
+        if result.get("status") == "failed":
+            with self._lock:
+                self.failures += 1
+                if self.failures == self.max_failures:
+                    logger.warning(f"失败用例数达到上限 {self.max_failures}，取消尚未开始的用例")
+        return self.tripped
+
+
+def iter_case_results(execute, test_cases, parallel=1, failure_limit=None):
+    """
+    执行测试用例并逐个产出结果，供各测试运行器共用
+
+    并行模式下最多只有 parallel * 2 个用例同时在途，已产出的结果不再被持有，
+    因此内存占用与用例总数无关。
+
+    Args:
+        execute: 执行单个测试用例的函数，返回测试结果字典
+        test_cases: 测试用例可迭代对象
+        parallel: 并行执行的线程数
+        failure_limit: FailureLimit实例，达到上限后取消尚未开始的用例，已在执行的用例照常完成
+
+    Yields:
+        测试结果字典，按完成顺序产出
+    """
+    if failure_limit is None:
+        failure_limit = FailureLimit()
+
+    if parallel <= 1:
+        skipped = 0
+        for test_case in test_cases:
+            if failure_limit.tripped:
+                skipped += 1
+                continue
+            result = execute(test_case)
+            if result:
+                failure_limit.record(result)
+                yield result
+        if skipped:
+            logger.warning(f"已取消 {skipped} 个未执行的用例")
+        return
+
+    window = parallel * 2
+    cases = iter(test_cases)
+    pending = set()
+    cancelled = 0
+    executor = ThreadPoolExecutor(max_workers=parallel)
+    try:
+        while True:
+            # 补充在途用例，达到失败上限后不再提交
+            while len(pending) < window and not failure_limit.tripped:
+                test_case = next(cases, None)
+                if test_case is None:
+                    break
+                pending.add(executor.submit(execute, test_case))
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                result = future.result()
+                if result:
+                    failure_limit.record(result)
+                    yield result
+
+            # 取消已提交但尚未开始的用例
+            if failure_limit.tripped and pending:
+                remaining = set()
+                for future in pending:
+                    if future.cancel():
+                        cancelled += 1
+                    else:
+                        remaining.add(future)
+                pending = remaining
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+    if failure_limit.tripped:
+        cancelled += sum(1 for _ in cases)
+        if cancelled:
+            logger.warning(f"已取消 {cancelled} 个未执行的用例")
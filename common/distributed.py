@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import queue
+import socket
+import threading
+import subprocess
+from collections import Counter
+from multiprocessing.connection import Listener, Client
+from loguru import logger
+
+from common.duration_history import DurationHistory, case_key
+from common.orchestrator import ModuleOrchestrator
+from common.case_executor import FailureLimit
+from common.scheduling import lpt_partition
+
+
+# 工作节点认证密钥的环境变量，本地工作进程通过它继承协调节点生成的随机密钥
+AUTHKEY_ENV = "GXPT_AUTHKEY"
+
+
+def parse_address(address):
+    """
+    解析 host:port 格式的地址
+
+    Args:
+        address: 地址字符串
+
+    Returns:
+        (host, port) 元组
+    """
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def item_key(item):
+    """分片中单个用例在耗时历史中的键"""
+    case = item["case"]
+    return case_key(item["module"], case.get("submodule", ""), case.get("name", "未命名测试"))
+
+
+def shard_cases(items, shards, history):
+    """
+    按历史耗时把用例分成若干分片，使各分片总耗时接近
+
+    Args:
+        items: 用例列表，每项为 {"module", "submodule", "case"}
+        shards: 分片数
+        history: DurationHistory实例
+
+    Returns:
+        [(预计耗时, 用例列表)]，分片内按预计耗时从长到短排列
+    """
+    return lpt_partition(items, shards, lambda item: history.estimate(item_key(item)))
+
+
+class Shard:
+    """分配给工作节点的一组用例"""
+
+    def __init__(self, shard_id, items, predicted):
+        self.shard_id = shard_id
+        self.items = items
+        self.predicted = predicted
+
+
+class DistributedCoordinator:
+    """分布式协调节点，把用例按耗时均衡分片后分发给工作节点，并把工作节点回传的结果合并为一个结果流"""
+
+    def __init__(self, address, authkey, options, shards=1, local_workers=0, history=None, failure_limit=None):
+        """
+        初始化协调节点
+
+        Args:
+            address: 监听地址 (host, port)，端口为0时自动分配
+            authkey: 工作节点连接使用的认证密钥(bytes)
+            options: 转发给工作节点的运行参数，包括 env、parallel、tags、engine、validation、max_failures
+            shards: 分片数，通常等于工作节点数
+            local_workers: 在本机启动的工作进程数
+            history: DurationHistory实例，为None时使用默认历史文件
+            failure_limit: FailureLimit实例，达到失败上限后不再分发剩余分片
+        """
+        self.address = address
+        self.authkey = authkey
+        self.options = options
+        self.shards = max(1, int(shards))
+        self.local_workers = max(0, int(local_workers))
+        self.history = history if history is not None else DurationHistory.shared()
+        self.failure_limit = failure_limit or FailureLimit()
+        self.errors = []
+        self._pending = []
+        self._outstanding = 0
+        self._next_id = 0
+        self._cond = threading.Condition()
+        self._results = queue.Queue(maxsize=1000)
+        self._finished = object()
+        self._processes = []
+        self._closed = False
+
+    def iter_results(self, runners):
+        """
+        发现全部用例，分片分发给工作节点，并按完成顺序产出测试结果
+
+        Args:
+            runners: (模块类型, 子模块, 运行器实例) 或 (模块类型, 子模块, 运行器实例, 测试用例列表) 列表，
+                运行器只用于发现用例，给出测试用例列表时不再发现
+
+        Yields:
+            测试结果字典
+
+        Raises:
+            工作节点执行失败或本地工作进程全部退出时，在结果流结束后抛出异常
+        """
+        items = []
+        for module, submodule, runner, *test_cases in runners:
+            test_cases = test_cases[0] if test_cases and test_cases[0] is not None else runner._get_test_cases()
+            for test_case in test_cases:
+                items.append({"module": module, "submodule": submodule, "case": test_case})
+
+        if not items:
+            logger.warning("没有找到符合条件的测试用例")
+            return
+
+        for predicted, shard_items in shard_cases(items, self.shards, self.history):
+            self._add_shard(shard_items, predicted)
+        logger.info(f"共 {len(items)} 个用例, 分为 {len(self._pending)} 个分片, "
+                    f"预计各分片耗时: {', '.join(f'{s.predicted:.1f}秒' for s in self._pending)}")
+
+        listener = Listener(self.address, authkey=self.authkey)
+        host, port = listener.address
+        logger.info(f"协调节点监听 {host}:{port}")
+        accept_thread = threading.Thread(target=self._accept, args=(listener,), name="coordinator-accept", daemon=True)
+        accept_thread.start()
+
+        try:
+            self._start_local_workers(host, port)
+            while True:
+                try:
+                    result = self._results.get(timeout=1)
+                except queue.Empty:
+                    self._check_local_workers()
+                    continue
+                if result is self._finished:
+                    break
+                self.history.record(result)
+                if self.failure_limit.record(result):
+                    self._cancel_pending()
+                yield result
+        finally:
+            self._closed = True
+            listener.close()
+            self._stop_local_workers()
+            self.history.save()
+
+        if self.errors:
+            raise self.errors[0]
+
+    def _add_shard(self, items, predicted):
+        """加入一个待分发的分片"""
+        with self._cond:
+            self._pending.append(Shard(self._next_id, items, predicted))
+            self._next_id += 1
+            self._outstanding += 1
+            self._cond.notify()
+
+    def _next_shard(self):
+        """取出下一个待分发的分片，全部分片完成时返回None"""
+        with self._cond:
+            while not self._pending and self._outstanding > 0:
+                self._cond.wait()
+            return self._pending.pop(0) if self._pending else None
+
+    def _cancel_pending(self):
+        """取消尚未分发的分片，已分发的分片由工作节点按自身的失败上限处理"""
+        with self._cond:
+            cancelled = self._pending
+            self._pending = []
+        if cancelled:
+            logger.warning(f"失败用例数达到上限，取消 {len(cancelled)} 个未分发的分片")
+        for _ in cancelled:
+            self._complete_shard()
+
+    def _complete_shard(self):
+        """标记一个分片完成，全部完成时结束结果流"""
+        with self._cond:
+            self._outstanding -= 1
+            finished = self._outstanding == 0
+            self._cond.notify_all()
+        if finished:
+            self._results.put(self._finished)
+
+    def _accept(self, listener):
+        """接受工作节点连接，每个连接由单独的线程服务"""
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception:
+                # 监听已关闭，或认证失败的连接
+                if self._closed:
+                    return
+                logger.warning("拒绝未通过认证的工作节点连接")
+                continue
+            threading.Thread(target=self._serve, args=(conn,), name="coordinator-worker", daemon=True).start()
+
+    def _serve(self, conn):
+        """向一个工作节点依次分发分片并接收结果，连接中断时把未完成的用例重新排队"""
+        shard = None
+        remaining = Counter()
+        try:
+            _, worker = conn.recv()
+            logger.info(f"工作节点已连接: {worker}")
+            while True:
+                shard = self._next_shard()
+                if shard is None:
+                    conn.send(("stop",))
+                    return
+
+                remaining = Counter(item_key(item) for item in shard.items)
+                logger.info(f"分发分片 {shard.shard_id} 到 {worker}: {len(shard.items)} 个用例, 预计 {shard.predicted:.1f}秒")
+                conn.send(("run", shard.shard_id, self.options, shard.items))
+                while True:
+                    message = conn.recv()
+                    if message[0] == "result":
+                        result = message[2]
+                        remaining[case_key(result.get("module"), result.get("submodule"), result.get("name"))] -= 1
+                        self._results.put(result)
+                    elif message[0] == "error":
+                        logger.error(f"工作节点 {worker} 执行分片 {shard.shard_id} 失败: {message[2]}")
+                        self.errors.append(RuntimeError(message[2]))
+                        break
+                    else:
+                        break
+                shard = None
+                self._complete_shard()
+        except (EOFError, OSError) as e:
+            if shard is None:
+                return
+            # 工作节点中断，未回传结果的用例交给其他工作节点
+            items = []
+            for item in shard.items:
+                key = item_key(item)
+                if remaining[key] > 0:
+                    remaining[key] -= 1
+                    items.append(item)
+            logger.warning(f"工作节点连接中断, 分片 {shard.shard_id} 剩余 {len(items)} 个用例重新分发: {str(e)}")
+            if items:
+                self._add_shard(items, sum(self.history.estimate(item_key(item)) for item in items))
+            self._complete_shard()
+        finally:
+            conn.close()
+
+    def _start_local_workers(self, host, port):
+        """在本机启动工作进程，使用与协调节点相同的运行入口"""
+        if not self.local_workers:
+            return
+        if host in ("0.0.0.0", ""):
+            host = "127.0.0.1"
+        run_script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run.py")
+        env = dict(os.environ, **{AUTHKEY_ENV: self.authkey.decode("utf-8")})
+        for _ in range(self.local_workers):
+            command = [sys.executable, run_script, "--worker", f"{host}:{port}", "--env", self.options.get("env", "test")]
+            self._processes.append(subprocess.Popen(command, env=env))
+        logger.info(f"已启动 {self.local_workers} 个本地工作进程")
+
+    def _check_local_workers(self):
+        """本地工作进程全部退出而分片未完成时结束结果流"""
+        if not self._processes or any(p.poll() is None for p in self._processes):
+            return
+        with self._cond:
+            unfinished = self._outstanding > 0
+            self._outstanding = 0
+            self._cond.notify_all()
+        if unfinished:
+            self.errors.append(RuntimeError("本地工作进程已全部退出，仍有分片未完成"))
+            self._results.put(self._finished)
+
+    def _stop_local_workers(self):
+        """等待本地工作进程退出"""
+        for process in self._processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+class DistributedWorker:
+    """分布式工作节点，连接协调节点并执行其分发的分片，逐个回传测试结果"""
+
+    def __init__(self, address, authkey, create_runner):
+        """
+        初始化工作节点
+
+        Args:
+            address: 协调节点地址 (host, port)
+            authkey: 认证密钥(bytes)
+            create_runner: 创建运行器的函数，参数为 (运行参数, 模块类型, 子模块)
+        """
+        self.address = address
+        self.authkey = authkey
+        self.create_runner = create_runner
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+
+    def run(self):
+        """连接协调节点并执行分片，直到协调节点通知停止"""
+        with Client(self.address, authkey=self.authkey) as conn:
+            conn.send(("hello", self.name))
+            while True:
+                message = conn.recv()
+                if message[0] == "stop":
+                    return
+                _, shard_id, options, items = message
+                logger.info(f"工作节点 {self.name} 开始执行分片 {shard_id}: {len(items)} 个用例")
+                try:
+                    for result in self._iter_shard(options, items):
+                        conn.send(("result", shard_id, result))
+                except Exception as e:
+                    logger.error(f"分片 {shard_id} 执行失败: {str(e)}")
+                    conn.send(("error", shard_id, str(e)))
+                    continue
+                conn.send(("done", shard_id))
+
+    def _iter_shard(self, options, items):
+        """按模块分组后并发执行分片中的用例"""
+        groups = {}
+        for item in items:
+            groups.setdefault((item["module"], item["submodule"]), []).append(item["case"])
+
+        runners = []
+        for (module, submodule), test_cases in groups.items():
+            runner = self.create_runner(options, module, submodule)
+            runners.append((module.upper(), submodule, runner, test_cases))
+        return ModuleOrchestrator(runners).iter_results()
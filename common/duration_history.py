@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import threading
+from loguru import logger
+
+
+def case_key(module, submodule, name):
+    """
+    生成测试用例在耗时历史中的键
+
+    Args:
+        module: 模块类型，如 'api', 'ui', 'ssh'
+        submodule: 子模块
+        name: 测试用例名称
+
+    Returns:
+        形如 'api/user/登录接口' 的字符串
+    """
+    return f"{module}/{submodule or ''}/{name}"
+
+
+class DurationHistory:
+    """测试用例耗时历史，使用指数移动平均记录每个用例的执行耗时，用于按耗时均衡分片和排序"""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path=None, alpha=0.3, default_duration=1.0):
+        """
+        初始化耗时历史
+
+        Args:
+            path: 历史文件路径，默认为 data/duration_history.json
+            alpha: 指数移动平均中最近一次耗时的权重
+            default_duration: 没有历史记录且无法估计时使用的耗时(秒)
+        """
+        if path is None:
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            path = os.path.join(base_dir, "data", "duration_history.json")
+        self.path = path
+        self.alpha = alpha
+        self.default_duration = default_duration
+        self._median_value = None
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._durations = self._read()
+
+    @classmethod
+    def shared(cls, path=None):
+        """
+        获取进程内共享的耗时历史，同一进程中并发运行的各模块记录到同一个实例
+
+        Args:
+            path: 历史文件路径，默认为 data/duration_history.json
+
+        Returns:
+            DurationHistory实例
+        """
+        with cls._shared_lock:
+            history = cls._shared.get(path)
+            if history is None:
+                history = cls._shared[path] = cls(path)
+            return history
+
+    def __len__(self):
+        return len(self._durations)
+
+    def estimate(self, key):
+        """
+        估计用例耗时
+
+        Args:
+            key: case_key 生成的用例键
+
+        Returns:
+            历史平均耗时，没有记录时返回已知用例耗时的中位数
+        """
+        with self._lock:
+            duration = self._durations.get(key)
+            if duration is not None:
+                return duration
+            return self._median()
+
+    def record(self, result):
+        """
+        记录一个测试结果的耗时
+
+        Args:
+            result: 测试结果字典，需要包含 module、submodule、name 和 duration
+        """
+        duration = result.get("duration")
+        if not isinstance(duration, (int, float)) or result.get("status") == "skipped":
+            return
+        key = case_key(result.get("module"), result.get("submodule"), result.get("name"))
+        with self._lock:
+            previous = self._durations.get(key)
+            if previous is None:
+                self._durations[key] = float(duration)
+            else:
+                self._durations[key] = self.alpha * duration + (1 - self.alpha) * previous
+            self._median_value = None
+            self._dirty.add(key)
+
+    def save(self):
+        """把本实例更新过的记录合并到历史文件中并原子地写入，不覆盖其他进程写入的记录"""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                updates = {key: self._durations[key] for key in self._dirty}
+                self._dirty = set()
+            try:
+                durations = self._read()
+                durations.update(updates)
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"durations": durations}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.warning(f"保存用例耗时历史失败: {self.path}, 错误: {str(e)}")
+
+    def _read(self):
+        """读取历史文件，文件不存在或损坏时返回空记录"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return dict(json.load(f).get("durations", {}))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"用例耗时历史损坏，将重新记录: {self.path}, 错误: {str(e)}")
+        return {}
+
+    def _median(self):
+        """已知用例耗时的中位数，记录变化前复用上次的计算结果"""
+        if not self._durations:
+            return self.default_duration
+        if self._median_value is None:
+            values = sorted(self._durations.values())
+            self._median_value = values[len(values) // 2]
+        return self._median_value
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+
+
+class LatencyHistogram:
+    """
+    HDR风格的延迟直方图：按2的幂分组，组内线性细分，
+    在整个取值范围内保持固定的相对精度，内存占用与样本数无关
+    """
+
+    def __init__(self, sub_bucket_bits=7):
+        """
+        初始化延迟直方图
+
+        Args:
+            sub_bucket_bits: 每组细分桶数的二进制位数，7表示相对误差不超过 1/64
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.sub_bucket_half = self.sub_bucket_count >> 1
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _index(self, value):
+        """样本值(微秒)对应的桶序号"""
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return shift * self.sub_bucket_half + (value >> shift)
+
+    def _upper_bound(self, index):
+        """桶序号对应的最大样本值(微秒)"""
+        if index < self.sub_bucket_count:
+            return index
+        shift = (index - self.sub_bucket_count) // self.sub_bucket_half + 1
+        sub_bucket = index - shift * self.sub_bucket_half
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, seconds):
+        """
+        记录一个延迟样本
+
+        Args:
+            seconds: 延迟(秒)
+        """
+        value = max(0, int(seconds * 1000000))
+        index = self._index(value)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+            self.min = value if self.min is None else min(self.min, value)
+
+    def merge(self, other):
+        """
+        合并另一个直方图的样本
+
+        Args:
+            other: 使用相同精度的LatencyHistogram实例
+        """
+        with other._lock:
+            counts = dict(other._counts)
+            count, total, minimum, maximum = other.count, other.total, other.min, other.max
+        with self._lock:
+            for index, n in counts.items():
+                self._counts[index] = self._counts.get(index, 0) + n
+            self.count += count
+            self.total += total
+            self.max = max(self.max, maximum)
+            if minimum is not None:
+                self.min = minimum if self.min is None else min(self.min, minimum)
+
+    def percentile(self, percent):
+        """
+        计算延迟分位数
+
+        Args:
+            percent: 百分位，如 50、90、99
+
+        Returns:
+            分位数(毫秒)，取所在桶的上界且不超过最大值；没有样本时返回0
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, int(self.count * percent / 100 + 0.5))
+            seen = 0
+            for index in sorted(self._counts):
+                seen += self._counts[index]
+                if seen >= target:
+                    return min(self._upper_bound(index), self.max) / 1000
+            return self.max / 1000
+
+    def buckets(self):
+        """
+        非空桶列表
+
+        Returns:
+            [(桶上界(毫秒), 样本数)]，按上界从小到大排列
+        """
+        with self._lock:
+            return [(self._upper_bound(index) / 1000, self._counts[index]) for index in sorted(self._counts)]
+
+    def summary(self):
+        """
+        延迟统计
+
+        Returns:
+            包含 count、min、mean、p50、p90、p99、max 的字典，延迟单位为毫秒
+        """
+        return {
+            "count": self.count,
+            "min": (self.min or 0) / 1000,
+            "mean": self.total / self.count / 1000 if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max / 1000
+        }
+
+    def to_dict(self):
+        """转换为报告中的字典，包括统计值和非空桶"""
+        return dict(self.summary(), buckets=self.buckets())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import queue
+import threading
+from loguru import logger
+
+
+class ModuleOrchestrator:
+    """模块编排器，并发运行API、UI、SSH等测试运行器，并把各自的结果流合并为一个结果流"""
+
+    def __init__(self, runners, buffer_size=1000):
+        """
+        初始化模块编排器
+
+        Args:
+            runners: (模块名称, 子模块, 运行器实例) 列表，每个运行器使用自己的并行度；
+                也可以是 (模块名称, 子模块, 运行器实例, 测试用例列表)，此时运行器直接执行给定的用例
+            buffer_size: 合并队列的容量，报告写入跟不上时运行器会在此处等待
+        """
+        self.runners = runners
+        self.buffer_size = buffer_size
+        self.errors = []
+
+    def iter_results(self):
+        """
+        并发运行所有测试运行器，并按完成顺序逐个产出测试结果
+
+        Yields:
+            测试结果字典
+
+        Raises:
+            任一模块执行失败时，在其余模块完成后抛出第一个异常
+        """
+        if len(self.runners) == 1:
+            yield from self._iter_module(*self.runners[0])
+            return
+
+        results = queue.Queue(maxsize=self.buffer_size)
+        done = object()
+        # 消费方提前停止(例如达到失败上限或抛出异常)时通知运行器线程停止，避免阻塞在已满的队列上
+        stop = threading.Event()
+        self.errors = []
+
+        def put(item):
+            """放入合并队列，消费方已停止时放弃并返回False"""
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def target(label, *args):
+            module_results = self._iter_module(label, *args)
+            try:
+                for result in module_results:
+                    if not put(result):
+                        logger.info(f"结果消费已停止，结束{label}测试")
+                        break
+            except Exception as e:
+                logger.error(f"{label}测试执行过程中发生错误: {str(e)}")
+                self.errors.append(e)
+            finally:
+                module_results.close()
+                put(done)
+
+        threads = []
+        for entry in self.runners:
+            label = entry[0]
+            thread = threading.Thread(target=target, args=entry,
+                                      name=f"{label}-runner", daemon=True)
+            thread.start()
+            threads.append(thread)
+        logger.info(f"并发执行 {len(threads)} 个测试模块")
+
+        try:
+            remaining = len(threads)
+            while remaining:
+                result = results.get()
+                if result is done:
+                    remaining -= 1
+                    continue
+                yield result
+        finally:
+            stop.set()
+
+        for thread in threads:
+            thread.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+    def _iter_module(self, label, submodule, runner, test_cases=None):
+        """运行单个模块并产出结果"""
+        suffix = f": {submodule}" if submodule else ""
+        logger.info(f"开始执行{label}测试{suffix}, 并行数: {runner.parallel}")
+        yield from runner.iter_results(test_cases)
+        logger.info(f"{label}测试执行完成{suffix}")
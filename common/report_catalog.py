@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from loguru import logger
+
+from common.report_index import sidecar_path
+from common.report_storage import strip_compression
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    filename TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    total INTEGER,
+    passed INTEGER,
+    failed INTEGER,
+    skipped INTEGER,
+    pass_rate REAL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports (type, created_at);
+CREATE INDEX IF NOT EXISTS idx_reports_id ON reports (type, id);
+CREATE INDEX IF NOT EXISTS idx_reports_failed ON reports (type, failed);
+CREATE INDEX IF NOT EXISTS idx_reports_pass_rate ON reports (type, pass_rate);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 报告列表可排序的列
+SORT_COLUMNS = ("created_at", "id", "total", "failed", "pass_rate")
+
+
+def report_type(filename, is_dir=False):
+    """
+    根据文件名判断报告类型
+
+    Args:
+        filename: 报告目录中的文件名，可以带压缩后缀
+        is_dir: 是否为目录
+
+    Returns:
+        html、json、allure，不是报告时返回None
+    """
+    if is_dir:
+        return "allure" if filename.startswith("allure_report_") else None
+    filename = strip_compression(filename)
+    if filename.startswith("report_"):
+        if filename.endswith(".html"):
+            return "html"
+        if filename.endswith(".json"):
+            return "json"
+    return None
+
+
+class ReportCatalog:
+    """
+    报告目录的SQLite索引，报告写入和删除时同步更新，报告列表按页查询，无需每次扫描报告目录。
+    手工复制或删除的报告由 reconcile 补齐，应在启动时和按间隔在后台调用，报告目录修改时间未变化时不扫描目录。
+    """
+
+    def __init__(self, reports_dir=None, path=None):
+        """
+        初始化报告索引
+
+        Args:
+            reports_dir: 报告目录，默认为项目根目录下的 reports
+            path: 索引数据库路径，默认为 data/report_catalog.db
+        """
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.reports_dir = reports_dir or os.path.join(base_dir, "reports")
+        self.path = path or os.path.join(base_dir, "data", "report_catalog.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        """打开数据库连接，每次操作使用独立连接，可在多个线程和进程中同时使用"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _entry(self, filename, stat, is_dir=False, summary=None):
+        """
+        构建一条报告记录
+
+        Args:
+            filename: 报告文件名
+            stat: 报告文件的os.stat结果
+            is_dir: 是否为目录形式的报告
+            summary: 报告汇总字典，为None时从报告的结果索引头读取
+
+        Returns:
+            reports表的一行，不是报告时返回None
+        """
+        kind = report_type(filename, is_dir)
+        if kind is None:
+            return None
+        if summary is None and kind != "allure":
+            summary = self._read_summary(os.path.join(self.reports_dir, filename))
+        summary = summary or {}
+        return (
+            filename,
+            filename if is_dir else os.path.splitext(strip_compression(filename))[0],
+            kind,
+            0 if is_dir else stat.st_size,
+            stat.st_mtime_ns,
+            # 按保留策略压缩的报告会保留原修改时间，取两者中较早的作为创建时间
+            min(stat.st_ctime, stat.st_mtime),
+            summary.get("total"),
+            summary.get("passed"),
+            summary.get("failed"),
+            summary.get("skipped"),
+            summary.get("pass_rate")
+        )
+
+    @staticmethod
+    def _read_summary(report_path):
+        """从报告的结果索引头读取汇总信息，旧报告没有结果索引时返回None"""
+        try:
+            with open(f"{sidecar_path(report_path)}.idx", "rb") as f:
+                return json.loads(f.readline()).get("summary")
+        except (OSError, ValueError):
+            return None
+
+    def add(self, report_path, summary=None):
+        """
+        添加或更新一份报告
+
+        Args:
+            report_path: 报告文件或目录路径
+            summary: 报告汇总字典，包含 total、passed、failed、skipped、pass_rate
+
+        Returns:
+            是否已记录，不是报告目录中的报告时返回False
+        """
+        if not report_path or os.path.dirname(os.path.abspath(report_path)) != os.path.abspath(self.reports_dir):
+            return False
+        stat = os.stat(report_path)
+        entry = self._entry(os.path.basename(report_path), stat, os.path.isdir(report_path), summary)
+        if entry is None:
+            return False
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", entry)
+            # 同一报告改为压缩或未压缩形式保存时，删除已不存在的另一种形式的记录
+            rows = conn.execute("SELECT filename FROM reports WHERE type = ? AND id = ? AND filename != ?",
+                                (entry[2], entry[1], entry[0])).fetchall()
+            conn.executemany("DELETE FROM reports WHERE filename = ?", [
+                (row["filename"],) for row in rows
+                if not os.path.exists(os.path.join(self.reports_dir, row["filename"]))])
+        return True
+
+    def remove(self, filename):
+        """
+        删除一份报告的记录
+
+        Args:
+            filename: 报告文件名，如 report_20250101_000000.html
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM reports WHERE filename = ?", (filename,))
+
+    def get(self, filename):
+        """
+        查询一份报告
+
+        Args:
+            filename: 报告文件名
+
+        Returns:
+            报告字典，不存在时返回None
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM reports WHERE filename = ?", (filename,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def find(self, report_id, type="html"):
+        """
+        按报告ID查询报告，报告文件可能已压缩。
+        同一ID同时有压缩和未压缩的记录时返回修改时间最新的、文件仍存在的一份，修改时间相同时优先压缩的一份；
+        文件已不存在的记录会被删除
+
+        Args:
+            report_id: 不带后缀的报告ID，如 report_20250101_000000
+            type: 报告类型
+
+        Returns:
+            报告字典，不存在时返回None
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM reports WHERE type = ? AND id = ? ORDER BY mtime_ns DESC, filename DESC",
+                                (type, report_id)).fetchall()
+            found = None
+            stale = []
+            for row in rows:
+                if os.path.exists(os.path.join(self.reports_dir, row["filename"])):
+                    found = row
+                    break
+                stale.append((row["filename"],))
+            if stale:
+                with conn:
+                    conn.executemany("DELETE FROM reports WHERE filename = ?", stale)
+        return self._to_dict(found) if found else None
+
+    def reconcile(self, force=False):
+        """
+        将索引与报告目录同步，目录修改时间未变化时直接返回
+
+        Args:
+            force: 为True时忽略目录修改时间，总是扫描目录
+
+        Returns:
+            新增、更新和删除的报告数
+        """
+        try:
+            # 扫描前读取修改时间，扫描期间的变化会在下次同步时处理
+            dir_mtime = str(os.stat(self.reports_dir).st_mtime_ns)
+        except FileNotFoundError:
+            dir_mtime = ""
+
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'dir_mtime'").fetchone()
+            if not force and row and row["value"] == dir_mtime:
+                return 0
+
+            known = {filename: (mtime_ns, size) for filename, mtime_ns, size
+                     in conn.execute("SELECT filename, mtime_ns, size FROM reports")}
+            changed = []
+            seen = set()
+            if dir_mtime:
+                with os.scandir(self.reports_dir) as entries:
+                    for entry in entries:
+                        is_dir = entry.is_dir()
+                        if report_type(entry.name, is_dir) is None:
+                            continue
+                        seen.add(entry.name)
+                        stat = entry.stat()
+                        if known.get(entry.name) == (stat.st_mtime_ns, 0 if is_dir else stat.st_size):
+                            continue
+                        changed.append(self._entry(entry.name, stat, is_dir))
+            removed = [(filename,) for filename in known if filename not in seen]
+
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", changed)
+                conn.executemany("DELETE FROM reports WHERE filename = ?", removed)
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('dir_mtime', ?)", (dir_mtime,))
+
+        if changed or removed:
+            logger.info(f"报告索引已同步: 新增或更新 {len(changed)} 个, 删除 {len(removed)} 个")
+        return len(changed) + len(removed)
+
+    def list(self, type="html", page=1, per_page=50, sort="created_at", order="desc"):
+        """
+        分页查询报告
+
+        Args:
+            type: 报告类型，为None时查询全部类型
+            page: 页码，从1开始
+            per_page: 每页报告数，为None时返回全部
+            sort: 排序列，可选值见 SORT_COLUMNS
+            order: asc 或 desc
+
+        Returns:
+            (报告总数, 当前页的报告字典列表)
+        """
+        if sort not in SORT_COLUMNS:
+            sort = "created_at"
+        direction = "ASC" if order == "asc" else "DESC"
+        where, params = ("WHERE type = ?", [type]) if type else ("", [])
+        limit, page_params = "", []
+        if per_page:
+            limit, page_params = " LIMIT ? OFFSET ?", [per_page, (max(1, page) - 1) * per_page]
+
+        with closing(self._connect()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM reports {where}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT * FROM reports {where} ORDER BY {sort} {direction}, filename {direction}{limit}",
+                                params + page_params).fetchall()
+        return total, [self._to_dict(row) for row in rows]
+
+    def older_than(self, timestamp, type=None, min_size=0, summarized=False, limit=100):
+        """
+        查询创建时间早于给定时间的报告，最早的在前
+
+        Args:
+            timestamp: 截止时间(Unix时间戳)
+            type: 报告类型，为None时查询全部类型
+            min_size: 只返回文件大小不小于该值(字节)的报告
+            summarized: 为True时只返回有汇总信息的报告
+            limit: 最多返回的报告数
+
+        Returns:
+            报告字典列表
+        """
+        where, params = ("AND type = ?", [type]) if type else ("", [])
+        if summarized:
+            where += " AND total IS NOT NULL"
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT * FROM reports WHERE created_at < ? AND size >= ? {where} "
+                                f"ORDER BY created_at LIMIT ?", [timestamp, min_size] + params + [limit]).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def beyond(self, keep, type="html", limit=100):
+        """
+        查询按创建时间保留最新的 keep 份之外的报告，最早的在前
+
+        Args:
+            keep: 保留的报告数
+            type: 报告类型
+            limit: 最多返回的报告数
+
+        Returns:
+            报告字典列表
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM (SELECT * FROM reports WHERE type = ? ORDER BY created_at DESC "
+                                "LIMIT -1 OFFSET ?) ORDER BY created_at LIMIT ?", (type, keep, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def count(self, type="html"):
+        """
+        报告数量
+
+        Args:
+            type: 报告类型，为None时统计全部类型
+
+        Returns:
+            报告数量
+        """
+        return self.list(type, per_page=1)[0]
+
+    def failed_total(self, type="html"):
+        """
+        所有报告的失败用例总数
+
+        Args:
+            type: 报告类型，为None时统计全部类型
+
+        Returns:
+            失败用例总数
+        """
+        where, params = ("WHERE type = ?", (type,)) if type else ("", ())
+        with closing(self._connect()) as conn:
+            return conn.execute(f"SELECT COALESCE(SUM(failed), 0) FROM reports {where}", params).fetchone()[0]
+
+    @staticmethod
+    def _to_dict(row):
+        """将数据库行转换为报告字典"""
+        report = dict(row)
+        report["created_at"] = datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        return report
@@ -2,26 +2,102 @@
 # -*- coding: utf-8 -*-
 
 import os
+import html
 import json
 import time
 import shutil
 from datetime import datetime
+from urllib.parse import urlsplit
 from loguru import logger
 
+from common.latency_histogram import LatencyHistogram
+from common.report_index import ResultIndexWriter
+from common.report_catalog import ReportCatalog
+from common.report_storage import open_report, resolve_compression
+
+
+class EndpointTimings:
+    """按接口(请求方法和路径)汇总API请求各阶段耗时的直方图"""
+    
+    # 报告中的阶段顺序和名称
+    PHASES = (("dns", "DNS"), ("connect", "连接"), ("tls", "TLS"), ("ttfb", "首字节"), ("body", "下载"), ("total", "总耗时"))
+    
+    def __init__(self):
+        self.endpoints = {}
+    
+    def add(self, result):
+        """累加一个带有timing的测试结果"""
+        timing = result.get("timing")
+        if not timing:
+            return
+        request = result.get("request") or {}
+        endpoint = f"{request.get('method', '')} {urlsplit(request.get('url', '')).path or '/'}"
+        phases = self.endpoints.setdefault(endpoint, {})
+        for phase, seconds in timing.items():
+            if phase not in phases:
+                phases[phase] = LatencyHistogram()
+            phases[phase].record(seconds)
+    
+    def to_dict(self):
+        """转换为报告中的字典: {接口: {阶段: 直方图}}，延迟单位为毫秒"""
+        return {endpoint: {phase: histogram.to_dict() for phase, histogram in phases.items()}
+                for endpoint, phases in sorted(self.endpoints.items())}
+
+
+class ResultSummary:
+    """测试结果汇总，在结果流经时用计数器累加，无需持有全部结果"""
+    
+    def __init__(self):
+        self.total = 0
+        self.passed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.timings = EndpointTimings()
+    
+    def add(self, result):
+        """累加一个测试结果"""
+        self.total += 1
+        self.timings.add(result)
+        status = result.get("status")
+        if status == "passed":
+            self.passed += 1
+        elif status == "failed":
+            self.failed += 1
+        elif status == "skipped":
+            self.skipped += 1
+    
+    @property
+    def pass_rate(self):
+        """通过率(百分比)"""
+        return (self.passed / self.total * 100) if self.total > 0 else 0
+    
+    def to_dict(self):
+        """转换为报告中的summary字典"""
+        return {
+            "total": self.total,
+            "passed": self.passed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "pass_rate": self.pass_rate
+        }
+
 
 class ReportGenerator:
     """报告生成器，用于生成不同格式的测试报告"""
     
-    def __init__(self, report_type="html"):
+    def __init__(self, report_type="html", compression=None):
         """
         初始化报告生成器
         
         Args:
             report_type: 报告类型，可选值为 html, allure, json
+            compression: 报告压缩方式，可选值为 none, gzip, zstd；Allure报告不压缩
         """
         self.report_type = report_type
+        self.compression = resolve_compression(compression)
         self.base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.report_dir = os.path.join(self.base_dir, "reports")
+        self.summary = ResultSummary()
         
         # 确保报告目录存在
         if not os.path.exists(self.report_dir):
@@ -29,42 +105,87 @@ class ReportGenerator:
     
     def generate(self, results):
         """
-        生成测试报告
+        生成测试报告，逐个消费结果并增量写入磁盘
         
         Args:
-            results: 测试结果列表
+            results: 测试结果列表或按完成顺序产出结果的迭代器
             
         Returns:
             生成的报告路径
         """
+        writer = self.open_writer()
+        try:
+            for result in results:
+                writer.write(result)
+        finally:
+            report_path = writer.close()
+        return report_path
+    
+    def open_writer(self):
+        """
+        创建增量报告写入器，调用方通过 write(result) 写入结果，close() 完成报告
+        
+        Returns:
+            报告写入器实例
+        """
         timestamp = time.strftime("%Y%m%d_%H%M%S")
+        self.summary = ResultSummary()
         
         if self.report_type == "html":
-            return self._generate_html_report(results, timestamp)
+            return HtmlReportWriter(self.report_dir, timestamp, self.summary, self.compression)
         elif self.report_type == "allure":
-            return self._generate_allure_report(results, timestamp)
+            return AllureReportWriter(self.report_dir, timestamp, self.summary)
         elif self.report_type == "json":
-            return self._generate_json_report(results, timestamp)
+            return JsonReportWriter(self.report_dir, timestamp, self.summary, self.compression)
         else:
             logger.warning(f"不支持的报告类型: {self.report_type}，将使用HTML格式")
-            return self._generate_html_report(results, timestamp)
+            return HtmlReportWriter(self.report_dir, timestamp, self.summary, self.compression)
+
+
+class ReportWriter:
+    """增量报告写入器基类，同时写入报告结果的NDJSON副本和偏移索引，供报告查看页分页读取"""
     
-    def _generate_html_report(self, results, timestamp):
-        """生成HTML格式的测试报告"""
-        report_path = os.path.join(self.report_dir, f"report_{timestamp}.html")
-        
-        # 统计测试结果
-        total = len(results)
-        passed = sum(1 for r in results if r.get("status") == "passed")
-        failed = sum(1 for r in results if r.get("status") == "failed")
-        skipped = sum(1 for r in results if r.get("status") == "skipped")
-        
-        # 计算通过率
-        pass_rate = (passed / total * 100) if total > 0 else 0
+    def __init__(self, report_dir, timestamp, summary, compression=None):
+        """
+        初始化报告写入器
         
-        # 生成HTML报告
-        with open(report_path, "w", encoding="utf-8") as f:
-            f.write(f"""<!DOCTYPE html>
+        Args:
+            report_dir: 报告目录
+            timestamp: 报告时间戳
+            summary: 结果汇总计数器
+            compression: 报告压缩方式，为None时不压缩；结果索引始终不压缩，以便按偏移量读取
+        """
+        self.report_dir = report_dir
+        self.timestamp = timestamp
+        self.summary = summary
+        self.compression = compression
+        self.sidecar = ResultIndexWriter(os.path.join(report_dir, f"report_{timestamp}.ndjson"))
+    
+    def write(self, result):
+        """写入一个测试结果"""
+        self.summary.add(result)
+        self.sidecar.write(result)
+        self._write_result(result, self.summary.total)
+    
+    def _write_result(self, result, index):
+        raise NotImplementedError
+    
+    def close(self):
+        """完成报告和结果索引，返回报告路径"""
+        self.sidecar.close(self.summary.to_dict())
+        report_path = self._finish()
+        try:
+            ReportCatalog(self.report_dir).add(report_path, self.summary.to_dict())
+        except Exception as e:
+            logger.warning(f"更新报告索引失败: {str(e)}")
+        return report_path
+    
+    def _finish(self):
+        raise NotImplementedError
+
+
+# HTML报告头部模板，生成报告时只渲染一次
+_HTML_HEADER = """<!DOCTYPE html>
 <html>
 <head>
     <meta charset="utf-8">
@@ -151,7 +272,7 @@ class ReportGenerator:
 <body>
     <div class="container">
         <h1>自动化测试报告</h1>
-        <p>生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+        <p>生成时间: {generated_at}</p>
         
         <div class="summary">
             <div class="summary-item total">
@@ -173,7 +294,7 @@ class ReportGenerator:
         </div>
         
         <h2>通过率: {pass_rate:.2f}%</h2>
-        
+        {timings}
         <h2>测试详情</h2>
         <table>
             <tr>
@@ -183,113 +304,221 @@ class ReportGenerator:
                 <th>状态</th>
                 <th>耗时(秒)</th>
             </tr>
-""")
-            
-            # 添加测试结果行
-            for i, result in enumerate(results):
-                status_class = f"status-{result.get('status', '')}"
-                f.write(f"""
+"""
+
+def _render_row(result, index):
+    """
+    渲染一个HTML结果行；f-string在导入时编译，比运行时解析的模板快数倍
+
+    Args:
+        result: 测试结果字典
+        index: 结果序号
+
+    Returns:
+        HTML片段
+    """
+    # 名称、描述和错误信息来自用例和响应，需要转义；其余字段由运行器生成
+    escape = html.escape
+    error = result.get('error')
+    error = f"<strong>错误信息:</strong> {escape(str(error), quote=False)}" if error else ""
+    status = result.get('status', '')
+    return f"""
             <tr>
-                <td>{i+1}</td>
+                <td>{index}</td>
                 <td>{result.get('module', '')}</td>
-                <td>{result.get('name', '')}</td>
-                <td class="{status_class}">{result.get('status', '')}</td>
-                <td>{result.get('duration', 0):.2f}</td>
+                <td>{escape(str(result.get('name', '')), quote=False)}</td>
+                <td class="status-{status}">{status}</td>
+                <td>{result.get('duration', 0) or 0:.2f}</td>
             </tr>
             <tr>
                 <td colspan="5">
                     <div class="details">
-                        <strong>描述:</strong> {result.get('description', '')}<br>
+                        <strong>描述:</strong> {escape(str(result.get('description', '')), quote=False)}<br>
                         <strong>开始时间:</strong> {result.get('start_time', '')}<br>
                         <strong>结束时间:</strong> {result.get('end_time', '')}<br>
-                        {f"<strong>错误信息:</strong> {result.get('error', '')}" if result.get('error') else ''}
+                        {error}
                     </div>
                 </td>
             </tr>
-""")
-            
-            f.write("""
+"""
+
+
+_HTML_FOOTER = """
         </table>
     </div>
 </body>
 </html>
-""")
+"""
+
+
+def render_summary_report(summary, generated_at):
+    """
+    渲染只包含汇总信息的HTML报告，用于按保留策略清理结果明细后的旧报告
+
+    Args:
+        summary: 报告汇总字典，包含 total、passed、failed、skipped、pass_rate
+        generated_at: 原报告的生成时间
+
+    Returns:
+        HTML文本
+    """
+    return _HTML_HEADER.format(
+        generated_at=generated_at,
+        total=summary.get("total") or 0,
+        passed=summary.get("passed") or 0,
+        failed=summary.get("failed") or 0,
+        skipped=summary.get("skipped") or 0,
+        pass_rate=summary.get("pass_rate") or 0,
+        timings=""
+    ) + """
+            <tr>
+                <td colspan="5">结果明细已按保留策略清理，只保留汇总信息</td>
+            </tr>
+""" + _HTML_FOOTER
+
+
+class HtmlReportWriter(ReportWriter):
+    """HTML报告写入器，结果行按块写入临时文件，结束时与汇总信息拼接成完整报告，内存占用与结果数无关"""
+    
+    # 每积累多少行写入一次临时文件
+    CHUNK_ROWS = 500
+    # 文件写入和拼接使用的缓冲区大小
+    BUFFER_SIZE = 1024 * 1024
+    
+    def __init__(self, report_dir, timestamp, summary, compression=None):
+        super().__init__(report_dir, timestamp, summary, compression)
+        self.report_path = os.path.join(self.report_dir, f"report_{timestamp}.html")
+        self.rows_path = f"{self.report_path}.part"
+        self.rows_file = open(self.rows_path, "w", encoding="utf-8", buffering=self.BUFFER_SIZE)
+        self.rows = []
+    
+    def _write_result(self, result, index):
+        """渲染一个测试结果行，积累到一块后写入临时文件"""
+        self.rows.append(_render_row(result, index))
+        if len(self.rows) >= self.CHUNK_ROWS:
+            self._flush_rows()
+    
+    def _flush_rows(self):
+        """把积累的结果行写入临时文件"""
+        self.rows_file.write("".join(self.rows))
+        self.rows = []
+    
+    def _finish(self):
+        """写入汇总信息并拼接结果行，生成HTML报告"""
+        self._flush_rows()
+        self.rows_file.close()
         
-        logger.info(f"HTML报告已生成: {report_path}")
-        return report_path
+        f, self.report_path = open_report(self.report_path, self.compression, self.BUFFER_SIZE)
+        with f:
+            f.write(_HTML_HEADER.format(
+                generated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                total=self.summary.total,
+                passed=self.summary.passed,
+                failed=self.summary.failed,
+                skipped=self.summary.skipped,
+                pass_rate=self.summary.pass_rate,
+                timings=self._render_timings()
+            ))
+            with open(self.rows_path, "r", encoding="utf-8") as rows:
+                shutil.copyfileobj(rows, f, self.BUFFER_SIZE)
+            f.write(_HTML_FOOTER)
+        
+        os.remove(self.rows_path)
+        logger.info(f"HTML报告已生成: {self.report_path}")
+        return self.report_path
     
-    def _generate_allure_report(self, results, timestamp):
-        """生成Allure格式的测试报告"""
+    def _render_timings(self):
+        """渲染各接口请求阶段耗时表，单元格为 p50 / p99 (毫秒)"""
+        endpoints = self.summary.timings.endpoints
+        if not endpoints:
+            return ""
+        
+        header = "".join(f"<th>{label}</th>" for _, label in EndpointTimings.PHASES)
+        rows = []
+        for endpoint, phases in sorted(endpoints.items()):
+            count = phases["total"].count if "total" in phases else 0
+            cells = "".join(
+                f"<td>{phases[phase].percentile(50):.1f} / {phases[phase].percentile(99):.1f}</td>"
+                if phase in phases else "<td>-</td>"
+                for phase, _ in EndpointTimings.PHASES)
+            rows.append(f"<tr><td>{html.escape(endpoint)}</td><td>{count}</td>{cells}</tr>")
+        return f"""
+        <h2>接口耗时分布 (p50 / p99, 毫秒)</h2>
+        <table>
+            <tr><th>接口</th><th>请求数</th>{header}</tr>
+            {"".join(rows)}
+        </table>
+"""
+
+
+class AllureReportWriter(ReportWriter):
+    """Allure报告写入器，每个结果到达时立即写入对应的结果文件"""
+    
+    def __init__(self, report_dir, timestamp, summary):
+        super().__init__(report_dir, timestamp, summary)
         # 创建临时结果目录
-        results_dir = os.path.join(self.report_dir, f"allure_results_{timestamp}")
-        report_dir = os.path.join(self.report_dir, f"allure_report_{timestamp}")
+        self.results_dir = os.path.join(self.report_dir, f"allure_results_{timestamp}")
+        self.allure_report_dir = os.path.join(self.report_dir, f"allure_report_{timestamp}")
         
-        if not os.path.exists(results_dir):
-            os.makedirs(results_dir)
+        if not os.path.exists(self.results_dir):
+            os.makedirs(self.results_dir)
+    
+    def _write_result(self, result, index):
+        """为测试结果生成Allure JSON文件"""
+        result_file = os.path.join(self.results_dir, f"result_{index}.json")
         
-        # 为每个测试结果生成Allure JSON文件
-        for i, result in enumerate(results):
-            result_file = os.path.join(results_dir, f"result_{i+1}.json")
-            
-            allure_result = {
-                "name": result.get("name", ""),
-                "status": result.get("status", ""),
-                "statusDetails": {
-                    "message": result.get("error", "") if result.get("status") == "failed" else "",
-                    "trace": result.get("traceback", "") if result.get("status") == "failed" else ""
-                },
-                "stage": "finished",
-                "description": result.get("description", ""),
-                "start": result.get("start_timestamp", 0),
-                "stop": result.get("end_timestamp", 0),
-                "labels": [
-                    {"name": "suite", "value": result.get("module", "")}
-                ]
-            }
-            
-            with open(result_file, "w", encoding="utf-8") as f:
-                json.dump(allure_result, f, ensure_ascii=False, indent=2)
+        allure_result = {
+            "name": result.get("name", ""),
+            "status": result.get("status", ""),
+            "statusDetails": {
+                "message": result.get("error", "") if result.get("status") == "failed" else "",
+                "trace": result.get("traceback", "") if result.get("status") == "failed" else ""
+            },
+            "stage": "finished",
+            "description": result.get("description", ""),
+            "start": result.get("start_timestamp", 0),
+            "stop": result.get("end_timestamp", 0),
+            "labels": [
+                {"name": "suite", "value": result.get("module", "")}
+            ]
+        }
         
-        # 尝试使用allure命令生成报告
+        with open(result_file, "w", encoding="utf-8") as f:
+            json.dump(allure_result, f, ensure_ascii=False, indent=2)
+    
+    def _finish(self):
+        """尝试使用allure命令生成报告"""
         try:
             import subprocess
-            subprocess.run(["allure", "generate", results_dir, "-o", report_dir, "--clean"], check=True)
-            logger.info(f"Allure报告已生成: {report_dir}")
-            return report_dir
+            subprocess.run(["allure", "generate", self.results_dir, "-o", self.allure_report_dir, "--clean"], check=True)
+            logger.info(f"Allure报告已生成: {self.allure_report_dir}")
+            return self.allure_report_dir
         except Exception as e:
             logger.error(f"生成Allure报告失败: {str(e)}")
-            logger.info(f"Allure结果文件已保存在: {results_dir}")
-            return results_dir
+            logger.info(f"Allure结果文件已保存在: {self.results_dir}")
+            return self.results_dir
+
+
+class JsonReportWriter(ReportWriter):
+    """JSON报告写入器，结果数组逐个追加写入，汇总信息在结束时写入"""
     
-    def _generate_json_report(self, results, timestamp):
-        """生成JSON格式的测试报告"""
-        report_path = os.path.join(self.report_dir, f"report_{timestamp}.json")
-        
-        # 统计测试结果
-        total = len(results)
-        passed = sum(1 for r in results if r.get("status") == "passed")
-        failed = sum(1 for r in results if r.get("status") == "failed")
-        skipped = sum(1 for r in results if r.get("status") == "skipped")
-        
-        # 计算通过率
-        pass_rate = (passed / total * 100) if total > 0 else 0
-        
-        # 生成报告数据
-        report_data = {
-            "summary": {
-                "total": total,
-                "passed": passed,
-                "failed": failed,
-                "skipped": skipped,
-                "pass_rate": pass_rate
-            },
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "results": results
-        }
-        
-        # 写入JSON文件
-        with open(report_path, "w", encoding="utf-8") as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
+    def __init__(self, report_dir, timestamp, summary, compression=None):
+        super().__init__(report_dir, timestamp, summary, compression)
+        self.file, self.report_path = open_report(os.path.join(self.report_dir, f"report_{timestamp}.json"), compression)
+        self.file.write('{\n  "timestamp": %s,\n  "results": [' % json.dumps(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    
+    def _write_result(self, result, index):
+        """追加一个测试结果"""
+        content = json.dumps(result, ensure_ascii=False, indent=2).replace("\n", "\n    ")
+        self.file.write(("\n    " if index == 1 else ",\n    ") + content)
+    
+    def _finish(self):
+        """写入汇总信息并结束JSON文档"""
+        summary = json.dumps(self.summary.to_dict(), ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        timings = json.dumps(self.summary.timings.to_dict(), ensure_ascii=False).replace("\n", "\n  ")
+        self.file.write(('\n  ' if self.summary.total else '') + '],\n  "endpoint_timings": ' + timings
+                        + ',\n  "summary": ' + summary + '\n}\n')
+        self.file.close()
         
-        logger.info(f"JSON报告已生成: {report_path}")
-        return report_path 
\ No newline at end of file
+        logger.info(f"JSON报告已生成: {self.report_path}")
+        return self.report_path
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import struct
+
+from common.report_storage import strip_compression
+
+# 索引记录: 结果行在NDJSON文件中的偏移量、状态编号、模块编号
+_RECORD = struct.Struct("<QHH")
+
+# 写入NDJSON的结果字段，请求和响应内容只保留在完整报告中
+SIDECAR_FIELDS = ("module", "submodule", "name", "status", "duration", "description",
+                  "start_time", "end_time", "error", "traceback")
+
+# 错误堆栈在NDJSON中保留的最大字符数
+TRACEBACK_LIMIT = 4000
+
+
+def sidecar_path(report_path):
+    """
+    报告对应的NDJSON结果文件路径
+
+    Args:
+        report_path: 报告文件或目录路径，如 reports/report_20250101_000000.html 或压缩的 .html.gz
+
+    Returns:
+        NDJSON文件路径，如 reports/report_20250101_000000.ndjson
+    """
+    return f"{os.path.splitext(strip_compression(report_path))[0]}.ndjson"
+
+
+class ResultIndexWriter:
+    """报告结果的NDJSON副本和偏移索引写入器，查看报告时按页读取，无需加载完整报告"""
+
+    def __init__(self, path):
+        """
+        初始化写入器
+
+        Args:
+            path: NDJSON文件路径，索引写入同名的 .idx 文件
+        """
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.statuses = {}
+        self.modules = {}
+        self.count = 0
+        self._file = open(path, "wb")
+        self._records = open(f"{self.index_path}.part", "wb")
+
+    def write(self, result):
+        """追加一个测试结果"""
+        record = {field: result.get(field) for field in SIDECAR_FIELDS if result.get(field) not in (None, "")}
+        if len(record.get("traceback", "")) > TRACEBACK_LIMIT:
+            record["traceback"] = record["traceback"][:TRACEBACK_LIMIT] + "..."
+        if result.get("reused"):
+            record["reused"] = True
+        record["index"] = self.count + 1
+
+        status = self.statuses.setdefault(str(result.get("status", "")), len(self.statuses))
+        module = self.modules.setdefault(str(result.get("module", "")), len(self.modules))
+        self._records.write(_RECORD.pack(self._file.tell(), status, module))
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+        self.count += 1
+
+    def close(self, summary=None):
+        """
+        写入索引头并完成索引文件
+
+        Args:
+            summary: 报告汇总字典，写入索引头供查看页直接显示
+        """
+        self._file.close()
+        self._records.close()
+        header = {
+            "count": self.count,
+            "statuses": list(self.statuses),
+            "modules": list(self.modules),
+            "summary": summary or {}
+        }
+        with open(self.index_path, "wb") as f:
+            f.write(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")
+            with open(f"{self.index_path}.part", "rb") as records:
+                while True:
+                    chunk = records.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+        os.remove(f"{self.index_path}.part")
+
+
+class ResultIndexReader:
+    """按页读取报告结果，支持按状态和模块过滤"""
+
+    def __init__(self, path):
+        """
+        打开NDJSON结果文件的索引
+
+        Args:
+            path: NDJSON文件路径
+
+        Raises:
+            FileNotFoundError: 结果文件或索引不存在
+        """
+        self.path = path
+        with open(f"{path}.idx", "rb") as f:
+            self.header = json.loads(f.readline())
+            self._records = f.read()
+
+    @property
+    def count(self):
+        """结果总数"""
+        return self.header["count"]
+
+    @property
+    def summary(self):
+        """报告汇总信息"""
+        return self.header.get("summary", {})
+
+    def facets(self):
+        """
+        各状态和模块的结果数
+
+        Returns:
+            {"status": {状态: 数量}, "module": {模块: 数量}}
+        """
+        statuses = self.header["statuses"]
+        modules = self.header["modules"]
+        status_counts = dict.fromkeys(statuses, 0)
+        module_counts = dict.fromkeys(modules, 0)
+        for _, status, module in _RECORD.iter_unpack(self._records):
+            status_counts[statuses[status]] += 1
+            module_counts[modules[module]] += 1
+        return {"status": status_counts, "module": module_counts}
+
+    def page(self, page=1, per_page=50, status=None, module=None):
+        """
+        读取一页结果
+
+        Args:
+            page: 页码，从1开始
+            per_page: 每页结果数
+            status: 只返回该状态的结果
+            module: 只返回该模块的结果
+
+        Returns:
+            (符合条件的结果总数, 当前页的结果列表)
+        """
+        statuses = self.header["statuses"]
+        modules = self.header["modules"]
+        status_id = statuses.index(status) if status in statuses else None
+        module_id = modules.index(module) if module in modules else None
+        if (status and status_id is None) or (module and module_id is None):
+            return 0, []
+
+        start = max(0, (page - 1) * per_page)
+        if status_id is None and module_id is None:
+            # 不过滤时直接按位置截取索引记录
+            records = self._records[start * _RECORD.size:(start + per_page) * _RECORD.size]
+            return self.count, self._read([offset for offset, _, _ in _RECORD.iter_unpack(records)])
+
+        offsets = []
+        total = 0
+        for offset, record_status, record_module in _RECORD.iter_unpack(self._records):
+            if status_id is not None and record_status != status_id:
+                continue
+            if module_id is not None and record_module != module_id:
+                continue
+            if start <= total < start + per_page:
+                offsets.append(offset)
+            total += 1
+        return total, self._read(offsets)
+
+    def _read(self, offsets):
+        """读取给定偏移量处的结果行"""
+        results = []
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                results.append(json.loads(f.readline()))
+        return results
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import gzip
+from loguru import logger
+
+# 压缩方式对应的文件后缀和HTTP Content-Encoding
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+CONTENT_ENCODINGS = {".gz": "gzip", ".zst": "zstd"}
+
+# 压缩级别，兼顾写入速度和压缩率
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def resolve_compression(compression):
+    """
+    检查压缩方式是否可用
+
+    Args:
+        compression: none、gzip 或 zstd
+
+    Returns:
+        实际使用的压缩方式，不压缩时返回None；未安装zstandard时使用gzip
+    """
+    if not compression or compression == "none":
+        return None
+    if compression not in COMPRESSION_SUFFIXES:
+        logger.warning(f"不支持的报告压缩方式: {compression}，将使用gzip")
+        return "gzip"
+    if compression == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            logger.warning("未安装zstandard，报告将使用gzip压缩")
+            return "gzip"
+    return compression
+
+
+def strip_compression(path):
+    """
+    去掉路径中的压缩后缀
+
+    Args:
+        path: 报告路径，如 reports/report_20250101_000000.html.gz
+
+    Returns:
+        未压缩的报告路径，如 reports/report_20250101_000000.html
+    """
+    root, ext = os.path.splitext(path)
+    return root if ext in CONTENT_ENCODINGS else path
+
+
+def content_encoding(path):
+    """
+    报告文件的Content-Encoding
+
+    Args:
+        path: 报告文件路径
+
+    Returns:
+        gzip、zstd，未压缩时返回None
+    """
+    return CONTENT_ENCODINGS.get(os.path.splitext(path)[1])
+
+
+def find_report(path):
+    """
+    查找报告文件，报告可能以未压缩或压缩形式保存
+
+    Args:
+        path: 未压缩的报告路径
+
+    Returns:
+        存在的报告文件路径，不存在时返回None
+    """
+    for suffix in ("", *COMPRESSION_SUFFIXES.values()):
+        if os.path.isfile(path + suffix):
+            return path + suffix
+    return None
+
+
+def open_report(path, compression=None, buffering=-1):
+    """
+    以文本方式打开要写入的报告文件，按压缩方式在文件名后追加压缩后缀
+
+    Args:
+        path: 未压缩的报告路径
+        compression: resolve_compression 返回的压缩方式
+        buffering: 未压缩时的写入缓冲区大小
+
+    Returns:
+        (文本文件对象, 实际写入的文件路径)
+    """
+    if compression is None:
+        return open(path, "w", encoding="utf-8", buffering=buffering), path
+
+    path += COMPRESSION_SUFFIXES[compression]
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=GZIP_LEVEL), path
+
+    import zstandard
+    raw = open(path, "wb")
+    writer = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+    return io.TextIOWrapper(writer, encoding="utf-8"), path
+
+
+def open_decompressed(path):
+    """
+    以二进制方式读取报告内容，压缩的报告在读取时解压
+
+    Args:
+        path: 报告文件路径
+
+    Returns:
+        可读取解压后内容的二进制文件对象
+    """
+    encoding = content_encoding(path)
+    if encoding == "gzip":
+        return gzip.open(path, "rb")
+    if encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
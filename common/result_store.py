@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import hashlib
+import threading
+from loguru import logger
+
+
+# 结果库中保存的结果字段，请求、响应、命令输出和错误堆栈只保留在报告中
+STORED_FIELDS = ("module", "submodule", "name", "description", "status", "duration", "start_time", "end_time")
+
+# 错误信息在结果库中保留的最大字符数
+ERROR_LIMIT = 500
+
+
+def compact_result(result):
+    """
+    提取结果中增量执行和复用结果所需的字段
+
+    Args:
+        result: 测试结果字典
+
+    Returns:
+        只包含 STORED_FIELDS 和截断后错误信息的字典
+    """
+    compact = {field: result[field] for field in STORED_FIELDS if field in result}
+    error = str(result.get("error") or "")
+    compact["error"] = error[:ERROR_LIMIT] + "..." if len(error) > ERROR_LIMIT else error
+    return compact
+
+
+class ResultStore:
+    """
+    本地结果库，按 (用例文件路径, 文件内容哈希, 环境) 记录每个用例最近一次的结果，用于只重跑失败或变更的用例。
+    每个用例文件只包含一个用例，因此用例文件路径即可唯一确定用例；只保存结果的状态、耗时和错误摘要。
+    """
+
+    def __init__(self, env, path=None):
+        """
+        初始化结果库
+
+        Args:
+            env: 测试环境，不同环境的结果分开保存
+            path: 结果库文件路径，默认为 data/result_store_<环境>.json
+        """
+        self.env = env
+        self.base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.path = path or os.path.join(self.base_dir, "data", f"result_store_{env}.json")
+        self._entries = self._read()
+        self._hashes = {}
+        self._changed = False
+        self._lock = threading.Lock()
+
+    def file_hash(self, file_path):
+        """
+        计算用例文件内容的哈希，同一次运行中每个文件只读取一次
+
+        Args:
+            file_path: 用例文件路径
+
+        Returns:
+            十六进制哈希字符串，文件不存在时返回None
+        """
+        digest = self._hashes.get(file_path)
+        if digest is None:
+            try:
+                with open(file_path, "rb") as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()
+            except OSError:
+                return None
+            self._hashes[file_path] = digest
+        return digest
+
+    def testcases_dir(self, module):
+        """模块的用例目录"""
+        return os.path.join(self.base_dir, f"{module}_test", "testcases")
+
+    def case_path(self, module, file_path):
+        """
+        用例文件相对模块用例目录的路径，协调节点和工作节点的项目根目录不同时结果相同
+
+        Args:
+            module: 模块类型
+            file_path: 用例文件路径，可以是其他节点上的绝对路径
+
+        Returns:
+            以 / 分隔的相对路径，不在用例目录中时返回None
+        """
+        if not file_path:
+            return None
+        marker = f"/{module}_test/testcases/"
+        path = file_path.replace("\\", "/")
+        if marker in path:
+            return path.rsplit(marker, 1)[1]
+        try:
+            rel_path = os.path.relpath(file_path, self.testcases_dir(module)).replace(os.sep, "/")
+        except ValueError:
+            # Windows上位于不同驱动器
+            return None
+        return None if rel_path.startswith("../") else rel_path
+
+    def key(self, module, file_path):
+        """
+        用例在结果库中的键，由模块和用例文件相对模块用例目录的路径组成
+
+        Args:
+            module: 模块类型
+            file_path: 用例文件路径
+
+        Returns:
+            键字符串，没有文件路径或不在用例目录中时返回None
+        """
+        case_path = self.case_path(module, file_path)
+        return f"{module}:{case_path}" if case_path else None
+
+    def select(self, module, test_cases, rerun_failed=False, changed_only=False):
+        """
+        选出需要执行的用例，其余用例复用上次的结果
+
+        Args:
+            module: 模块类型，如 'api', 'ui', 'ssh'
+            test_cases: 发现的全部测试用例
+            rerun_failed: 选出上次未通过的用例
+            changed_only: 选出文件内容变更过的用例
+
+        Returns:
+            (需要执行的用例列表, 复用的历史结果列表)；没有可复用结果的用例总是执行
+        """
+        selected = []
+        reused = []
+        for test_case in test_cases:
+            entry = self._entries.get(self.key(module, test_case.get("file_path")))
+            current_hash = self.file_hash(test_case.get("file_path", ""))
+            if entry is None or entry["hash"] != current_hash:
+                # 新增或变更的用例，以及无法比较内容的用例
+                selected.append(test_case)
+            elif rerun_failed and entry["result"].get("status") != "passed":
+                selected.append(test_case)
+            elif not changed_only and not rerun_failed:
+                selected.append(test_case)
+            else:
+                reused.append(dict(entry["result"], reused=True))
+
+        logger.info(f"{module}增量执行: 执行 {len(selected)} 个用例, 复用 {len(reused)} 个上次的结果")
+        return selected, reused
+
+    def track(self, results):
+        """
+        把结果流中的每个结果按其用例文件路径记入结果库，结果原样产出
+
+        Args:
+            results: 测试结果可迭代对象
+
+        Yields:
+            测试结果字典
+        """
+        for result in results:
+            if not result.get("reused"):
+                self.record(result)
+            yield result
+
+    def record(self, result):
+        """
+        记录一个用例的结果
+
+        Args:
+            result: 测试结果字典，需要包含 module 和 file_path
+        """
+        module = result.get("module")
+        case_path = self.case_path(module, result.get("file_path"))
+        # 按本地用例目录计算哈希，工作节点上报的结果中的文件路径在协调节点上不一定存在
+        digest = self.file_hash(os.path.join(self.testcases_dir(module), case_path)) if case_path else None
+        if digest is None:
+            logger.warning(f"无法记录用例结果到结果库: {result.get('name')}, 用例文件: {result.get('file_path') or '未知'}")
+            return
+        with self._lock:
+            self._entries[f"{module}:{case_path}"] = {"hash": digest, "result": compact_result(result)}
+            self._changed = True
+
+    def save(self):
+        """原子地写入结果库"""
+        with self._lock:
+            if not self._changed:
+                return
+            data = {"env": self.env, "entries": dict(self._entries)}
+            self._changed = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"保存结果库失败: {self.path}, 错误: {str(e)}")
+
+    def _read(self):
+        """读取结果库，文件不存在或损坏时返回空记录"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f).get("entries", {})
+            return {key: {"hash": entry["hash"], "result": compact_result(entry["result"])}
+                    for key, entry in entries.items()}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"结果库损坏，将重新记录: {self.path}, 错误: {str(e)}")
+        return {}
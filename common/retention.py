@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import shutil
+import fnmatch
+import threading
+from collections import Counter
+from loguru import logger
+
+from common.report_catalog import ReportCatalog
+from common.report_index import sidecar_path
+from common.report_storage import content_encoding, open_report, strip_compression
+from common.report_generator import render_summary_report
+
+# 小于该大小(字节)的报告不再压缩为汇总形式，已压缩的报告也不会被重复处理
+COMPACT_MIN_SIZE = 16 * 1024
+
+DAY = 86400
+
+
+class RetentionEngine:
+    """
+    报告和附件的保留策略。
+    按报告类型设置保留天数和份数，超期报告先压缩为只含汇总信息的形式，再按保留天数删除；
+    截图、命令日志等附件目录按保留天数清理；报告所在磁盘空间不足时从最早的报告开始删除。
+    报告通过报告索引查询，不扫描报告目录；每次执行最多处理 batch_size 个报告或附件，避免长时间占用磁盘。
+    """
+
+    def __init__(self, policies=None, attachments=None, min_free_mb=0, batch_size=500, interval=3600,
+                 catalog=None, base_dir=None):
+        """
+        初始化保留策略
+
+        Args:
+            policies: {报告类型: {"max_age_days": 天数, "max_count": 份数, "summary_after_days": 天数}}，
+                      未设置或为0的项不生效
+            attachments: 附件目录规则列表，每项为 {"path": 相对项目根目录的路径, "pattern": 文件名通配符, "max_age_days": 天数}
+            min_free_mb: 报告所在磁盘的最小剩余空间(MB)，为0时不检查
+            batch_size: 每次执行最多处理的报告和附件数
+            interval: 后台执行间隔(秒)
+            catalog: ReportCatalog实例，默认使用项目根目录下的报告目录
+            base_dir: 项目根目录，附件路径相对该目录
+        """
+        self.base_dir = base_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.policies = policies or {}
+        self.attachments = attachments or []
+        self.min_free_mb = float(min_free_mb or 0)
+        self.batch_size = max(1, int(batch_size))
+        self.interval = max(60, int(interval))
+        self.catalog = catalog or ReportCatalog()
+        self._lock = threading.Lock()
+        # 附件目录上次完整扫描后的 (目录修改时间, 保留文件中最早的修改时间)
+        self._scan_state = {}
+        self._budget = 0
+
+    @classmethod
+    def from_config(cls, retention_config):
+        """
+        根据 retention 配置创建保留策略
+
+        Args:
+            retention_config: 配置字典，包括 enabled、interval、batch_size、min_free_mb、reports、attachments
+
+        Returns:
+            RetentionEngine实例，未启用时返回None
+        """
+        retention_config = retention_config or {}
+        if not retention_config.get("enabled", False):
+            return None
+        return cls(
+            policies=retention_config.get("reports"),
+            attachments=retention_config.get("attachments"),
+            min_free_mb=retention_config.get("min_free_mb", 0),
+            batch_size=retention_config.get("batch_size", 500),
+            interval=retention_config.get("interval", 3600)
+        )
+
+    def run(self):
+        """
+        执行一次保留策略，上一次执行尚未结束时直接返回
+
+        Returns:
+            处理统计: compacted、deleted、attachments、freed_bytes
+        """
+        if not self._lock.acquire(blocking=False):
+            logger.info("保留策略正在执行，跳过本次执行")
+            return {}
+        try:
+            stats = Counter()
+            self._budget = self.batch_size
+            now = time.time()
+
+            for report_type, policy in self.policies.items():
+                policy = policy or {}
+                if policy.get("max_age_days"):
+                    for report in self._take(self.catalog.older_than(
+                            now - policy["max_age_days"] * DAY, report_type, limit=self._budget)):
+                        self._delete_report(report, stats)
+                if policy.get("max_count"):
+                    for report in self._take(self.catalog.beyond(policy["max_count"], report_type, limit=self._budget)):
+                        self._delete_report(report, stats)
+                if policy.get("summary_after_days") and report_type in ("html", "json"):
+                    for report in self._take(self.catalog.older_than(
+                            now - policy["summary_after_days"] * DAY, report_type, min_size=COMPACT_MIN_SIZE,
+                            summarized=True, limit=self._budget)):
+                        self._compact_report(report, stats)
+
+            for rule in self.attachments:
+                self._prune_attachments(rule, now, stats)
+
+            if self.min_free_mb:
+                self._relieve_disk_pressure(stats)
+
+            if stats:
+                logger.info(f"保留策略执行完成: 压缩 {stats['compacted']} 份报告, 删除 {stats['deleted']} 份报告"
+                            f"和 {stats['attachments']} 个附件, 释放 {stats['freed_bytes'] / 1024 / 1024:.1f}MB")
+            return dict(stats)
+        finally:
+            self._lock.release()
+
+    def _take(self, items):
+        """按本次执行的剩余处理数截取并扣减"""
+        items = items[:self._budget]
+        self._budget -= len(items)
+        return items
+
+    def _report_path(self, report):
+        return os.path.join(self.catalog.reports_dir, report["filename"])
+
+    def _delete_report(self, report, stats):
+        """删除报告及其NDJSON结果副本和索引"""
+        path = self._report_path(report)
+        freed = report["size"]
+        try:
+            if report["type"] == "allure":
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                if os.path.exists(path):
+                    os.remove(path)
+                freed += self._remove_sidecar(path)
+        except OSError as e:
+            logger.warning(f"删除报告失败: {report['filename']}, 错误: {str(e)}")
+            return
+        self.catalog.remove(report["filename"])
+        stats["deleted"] += 1
+        stats["freed_bytes"] += freed
+        logger.debug(f"已按保留策略删除报告: {report['filename']}")
+
+    @staticmethod
+    def _remove_sidecar(path):
+        """删除报告的NDJSON结果副本和索引，返回释放的字节数"""
+        freed = 0
+        ndjson_path = sidecar_path(path)
+        for sidecar_file in (ndjson_path, f"{ndjson_path}.idx"):
+            if os.path.exists(sidecar_file):
+                freed += os.path.getsize(sidecar_file)
+                os.remove(sidecar_file)
+        return freed
+
+    def _compact_report(self, report, stats):
+        """把报告替换为只含汇总信息的形式，保留原压缩方式和修改时间"""
+        path = self._report_path(report)
+        summary = {key: report[key] for key in ("total", "passed", "failed", "skipped", "pass_rate")}
+        base_name = strip_compression(report["filename"])
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            # 先写入临时文件再替换，临时文件名不以 report_ 开头，不会被报告索引收录
+            f, tmp_path = open_report(os.path.join(self.catalog.reports_dir, f".compact_{base_name}"),
+                                      content_encoding(path))
+            with f:
+                if report["type"] == "html":
+                    f.write(render_summary_report(summary, report["created_at"]))
+                else:
+                    json.dump({"timestamp": report["created_at"], "results": [], "summary": summary,
+                               "compacted": True}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+            freed = report["size"] - os.path.getsize(path) + self._remove_sidecar(path)
+        except (OSError, ImportError) as e:
+            logger.warning(f"压缩报告失败: {report['filename']}, 错误: {str(e)}")
+            return
+        self.catalog.add(path, summary)
+        stats["compacted"] += 1
+        stats["freed_bytes"] += freed
+        logger.debug(f"已按保留策略压缩报告: {report['filename']}")
+
+    def _prune_attachments(self, rule, now, stats):
+        """
+        删除附件目录中超过保留天数的文件和子目录。
+        目录内容自上次完整扫描后未变化、且最早的文件仍未到期时不再扫描目录。
+        """
+        directory = os.path.join(self.base_dir, rule.get("path", ""))
+        max_age_days = rule.get("max_age_days")
+        if not max_age_days or not os.path.isdir(directory):
+            return
+        cutoff = now - max_age_days * DAY
+        pattern = rule.get("pattern")
+
+        state = self._scan_state.get(directory)
+        dir_mtime = os.stat(directory).st_mtime_ns
+        if state and state[0] == dir_mtime and cutoff < state[1]:
+            return
+
+        earliest = float("inf")
+        complete = True
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or (pattern and not fnmatch.fnmatch(entry.name, pattern)):
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime >= cutoff:
+                        earliest = min(earliest, stat.st_mtime)
+                        continue
+                    if self._budget <= 0:
+                        complete = False
+                        break
+                    self._budget -= 1
+                    if entry.is_dir(follow_symlinks=False):
+                        freed = sum(os.path.getsize(os.path.join(root, name))
+                                    for root, _, names in os.walk(entry.path) for name in names)
+                        shutil.rmtree(entry.path)
+                    else:
+                        freed = stat.st_size
+                        os.remove(entry.path)
+                except OSError as e:
+                    logger.warning(f"删除附件失败: {entry.path}, 错误: {str(e)}")
+                    continue
+                stats["attachments"] += 1
+                stats["freed_bytes"] += freed
+
+        if complete:
+            self._scan_state[directory] = (os.stat(directory).st_mtime_ns, earliest)
+        else:
+            self._scan_state.pop(directory, None)
+
+    def _relieve_disk_pressure(self, stats):
+        """报告所在磁盘剩余空间不足时，从最早的报告开始删除，每种类型至少保留最新的一份"""
+        min_free = self.min_free_mb * 1024 * 1024
+        free = shutil.disk_usage(self.catalog.reports_dir).free
+        if free >= min_free:
+            return
+        logger.warning(f"报告所在磁盘剩余空间不足: {free / 1024 / 1024:.0f}MB，开始删除最早的报告")
+
+        while free < min_free and self._budget > 0:
+            candidates = []
+            for report_type in ("html", "json", "allure"):
+                candidates.extend(self.catalog.beyond(1, report_type, limit=min(self._budget, 50)))
+            if not candidates:
+                logger.warning("没有可删除的报告，磁盘剩余空间仍然不足")
+                return
+            candidates.sort(key=lambda report: report["created_at"])
+            for report in self._take(candidates[:50]):
+                self._delete_report(report, stats)
+            free = shutil.disk_usage(self.catalog.reports_dir).free
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import heapq
+from loguru import logger
+
+from common.duration_history import DurationHistory, case_key
+
+
+def lpt_partition(items, bins, estimate):
+    """
+    使用最长处理时间优先(LPT)算法把任务分到若干组，使各组总耗时接近
+
+    Args:
+        items: 任务列表
+        bins: 分组数
+        estimate: 估计单个任务耗时的函数
+
+    Returns:
+        [(预计耗时, 任务列表)]，组内按预计耗时从长到短排列，空组不返回
+    """
+    bins = max(1, min(int(bins), len(items)))
+    estimated = sorted(((estimate(item), i, item) for i, item in enumerate(items)),
+                       key=lambda x: (-x[0], x[1]))
+
+    # 预计耗时相同时优先分配给任务数较少的组
+    loads = [(0.0, 0, index) for index in range(bins)]
+    groups = [[] for _ in range(bins)]
+    for duration, _, item in estimated:
+        load, count, index = heapq.heappop(loads)
+        groups[index].append(item)
+        heapq.heappush(loads, (load + duration, count + 1, index))
+
+    totals = {index: load for load, _, index in loads}
+    return [(totals[index], groups[index]) for index in range(bins) if groups[index]]
+
+
+def predict_makespan(durations, workers):
+    """
+    预测按给定顺序提交到线程池时的总耗时，每个任务交给最早空闲的线程
+
+    Args:
+        durations: 按提交顺序排列的任务耗时列表
+        workers: 并行线程数
+
+    Returns:
+        预计总耗时(秒)
+    """
+    finish_times = [0.0] * max(1, int(workers))
+    for duration in durations:
+        heapq.heapreplace(finish_times, finish_times[0] + duration)
+    return max(finish_times)
+
+
+class CaseScheduler:
+    """按历史耗时安排用例的执行顺序，耗时长的用例先提交，避免慢用例拖在最后"""
+
+    def __init__(self, module, strategy="lpt", history=None):
+        """
+        初始化用例调度器
+
+        Args:
+            module: 模块类型，如 'api', 'ui', 'ssh'
+            strategy: 调度策略，lpt(按历史耗时从长到短) 或 file(保持用例文件顺序)
+            history: DurationHistory实例，为None时使用进程内共享的默认历史
+        """
+        self.module = module
+        self.strategy = strategy
+        self.history = history if history is not None else DurationHistory.shared()
+        self.predicted = None
+        self._start_time = None
+        self._end_time = None
+
+    def key(self, test_case):
+        """用例在耗时历史中的键"""
+        return case_key(self.module, test_case.get("submodule", ""), test_case.get("name", "未命名测试"))
+
+    def order(self, test_cases, workers):
+        """
+        安排用例执行顺序并预测总耗时
+
+        Args:
+            test_cases: 测试用例列表
+            workers: 并行执行的线程数或并发数
+
+        Returns:
+            排好顺序的测试用例列表
+        """
+        self._start_time = time.time()
+        self._end_time = None
+        estimates = [self.history.estimate(self.key(test_case)) for test_case in test_cases]
+
+        if self.strategy == "lpt":
+            ranked = sorted(range(len(test_cases)), key=lambda i: -estimates[i])
+            test_cases = [test_cases[i] for i in ranked]
+            estimates = [estimates[i] for i in ranked]
+
+        self.predicted = predict_makespan(estimates, workers)
+        return test_cases
+
+    def record(self, result):
+        """记录一个用例结果的耗时"""
+        self.history.record(result)
+        self._end_time = time.time()
+
+    def finish(self, label):
+        """
+        输出预计与实际总耗时，并保存耗时历史
+
+        Args:
+            label: 日志中的模块名称
+        """
+        if self.predicted is not None and self._end_time is not None:
+            actual = self._end_time - self._start_time
+            logger.info(f"{label}用例调度({self.strategy}): 预计总耗时 {self.predicted:.2f}秒, 实际 {actual:.2f}秒")
+        self.history.save()
@@ -5,7 +5,10 @@
 import suppress_warnings
 
 import argparse
+import itertools
+import json
 import os
+import secrets
 import sys
 import time
 import warnings
@@ -23,6 +26,11 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from common.config_manager import ConfigManager
 from common.report_generator import ReportGenerator
+from common.orchestrator import ModuleOrchestrator
+from common.case_executor import FailureLimit
+from common.result_store import ResultStore
+from common.distributed import (DistributedCoordinator, DistributedWorker, AUTHKEY_ENV,
+                                parse_address)
 from api_test.api_test_runner import ApiTestRunner
 from ui_test.ui_test_runner import UiTestRunner
 from ssh_test.ssh_test_runner import SshTestRunner
@@ -59,15 +67,187 @@ def parse_args():
                         help="指定测试环境: dev, test 或 prod")
     parser.add_argument("--report", choices=["html", "allure", "json"], default="html",
                         help="指定报告类型: html, allure 或 json")
-    parser.add_argument("--parallel", type=int, default=1,
-                        help="并行执行的进程数")
+    parser.add_argument("--parallel", type=int,
+                        help="每个模块并行执行的线程数，默认读取配置 parallel.<模块>")
     parser.add_argument("--tags", type=str, help="指定要运行的标签")
+    parser.add_argument("--engine", choices=["thread", "async"],
+                        help="API测试执行引擎: thread(线程池) 或 async(asyncio)，默认读取配置 api.engine")
+    parser.add_argument("--validation", choices=["inline", "process"],
+                        help="API响应验证模式: inline(执行线程内) 或 process(进程池)，默认读取配置 api.validation.mode")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="出现第一个失败用例后取消尚未开始的用例")
+    parser.add_argument("--max-failures", type=int, default=0,
+                        help="失败用例数达到N后取消尚未开始的用例，0表示不限制")
+    parser.add_argument("--load", action="store_true",
+                        help="压测模式：循环重放API测试用例的请求，输出延迟分位数、吞吐量和错误率")
+    parser.add_argument("--rps", type=float,
+                        help="压测的目标每秒请求数，默认读取配置 api.load.rps")
+    parser.add_argument("--concurrency", type=int,
+                        help="压测的并发线程数，默认读取配置 api.load.concurrency")
+    parser.add_argument("--duration", type=float,
+                        help="压测持续时间(秒)，默认读取配置 api.load.duration")
+    parser.add_argument("--rerun-failed", action="store_true",
+                        help="只执行上次未通过的用例，其余用例复用结果库中的结果")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="只执行用例文件内容变更过的用例，其余用例复用结果库中的结果")
+    parser.add_argument("--coordinator", action="store_true",
+                        help="以协调节点运行，把用例按历史耗时分片后分发给工作节点执行")
+    parser.add_argument("--listen", type=str,
+                        help="协调节点的监听地址 host:port，默认读取配置 distributed.listen")
+    parser.add_argument("--workers", type=int,
+                        help="分片数，通常等于工作节点数，默认读取配置 distributed.workers")
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="在本机启动的工作进程数，指定后以协调节点运行并监听本机随机端口")
+    parser.add_argument("--worker", type=str, metavar="HOST:PORT",
+                        help="以工作节点运行，连接指定的协调节点")
     parser.add_argument("--list-modules", action="store_true",
                         help="列出所有可用的模块和子模块")
     
     return parser.parse_args()
 
 
+def get_parallel(args, config, module):
+    """
+    获取模块的并行线程数
+    
+    Args:
+        args: 命令行参数
+        config: 配置管理器实例
+        module: 模块类型，如 'api', 'ui', 'ssh'
+        
+    Returns:
+        并行线程数，命令行参数优先，其次为配置 parallel.<模块>
+    """
+    if args.parallel:
+        return args.parallel
+    return config.get(f'parallel.{module}', 1)
+
+
+def get_max_failures(args):
+    """
+    获取失败用例数上限
+    
+    Args:
+        args: 命令行参数
+        
+    Returns:
+        失败用例数上限，--fail-fast 等同于1，0表示不限制
+    """
+    if getattr(args, 'fail_fast', False):
+        return 1
+    return getattr(args, 'max_failures', 0) or 0
+
+
+def create_runner(config, module, args, submodule=None, failure_limit=None):
+    """
+    创建测试运行器
+    
+    Args:
+        config: 配置管理器实例
+        module: 模块类型，如 'api', 'ui', 'ssh'
+        args: 命令行参数，使用其中的 parallel、tags、engine 和 validation
+        submodule: 子模块
+        failure_limit: 各模块共享的FailureLimit实例
+        
+    Returns:
+        测试运行器实例
+    """
+    parallel = get_parallel(args, config, module)
+    if module == "api":
+        return ApiTestRunner(config, parallel=parallel, tags=args.tags, submodule=submodule, engine=args.engine,
+                             validation=args.validation, failure_limit=failure_limit)
+    elif module == "ui":
+        return UiTestRunner(config, parallel=parallel, tags=args.tags, submodule=submodule,
+                            failure_limit=failure_limit)
+    elif module == "ssh":
+        return SshTestRunner(config, parallel=parallel, tags=args.tags, submodule=submodule,
+                             failure_limit=failure_limit)
+    raise ValueError(f"不支持的模块类型: {module}")
+
+
+def get_authkey(config, local_only):
+    """
+    获取分布式执行的认证密钥
+    
+    Args:
+        config: 配置管理器实例
+        local_only: 是否只有本地工作进程，此时未配置密钥会生成随机密钥
+        
+    Returns:
+        认证密钥(bytes)
+    """
+    authkey = os.getenv(AUTHKEY_ENV) or config.get('distributed.authkey')
+    if authkey:
+        return authkey.encode('utf-8')
+    if local_only:
+        return secrets.token_hex(16).encode('utf-8')
+    raise ValueError(f"分布式执行需要设置环境变量 {AUTHKEY_ENV} 或配置 distributed.authkey")
+
+
+def run_load(args, config, submodule=None):
+    """
+    以压测模式运行API测试用例，报告写入 reports/load_<时间戳>.json
+    
+    Args:
+        args: 命令行参数
+        config: 配置管理器实例
+        submodule: API子模块
+        
+    Returns:
+        退出码
+    """
+    runner = create_runner(config, "api", args, submodule)
+    report = runner.run_load(rps=args.rps, concurrency=args.concurrency, duration=args.duration)
+    if report is None:
+        return 1
+    
+    report_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+    os.makedirs(report_dir, exist_ok=True)
+    report_path = os.path.join(report_dir, f"load_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info(f"压测报告已生成: {report_path}")
+    return 0
+
+
+def run_worker(args):
+    """
+    以工作节点运行，执行协调节点分发的分片
+    
+    Args:
+        args: 命令行参数
+        
+    Returns:
+        退出码
+    """
+    try:
+        authkey = get_authkey(ConfigManager(args.env), local_only=False)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    
+    configs = {}
+    failure_limits = {}
+    
+    def worker_runner(options, module, submodule):
+        env = options.get('env', args.env)
+        if env not in configs:
+            configs[env] = ConfigManager(env)
+        # 同一工作节点上的各分片共享失败数上限
+        max_failures = get_max_failures(argparse.Namespace(**options))
+        if max_failures not in failure_limits:
+            failure_limits[max_failures] = FailureLimit(max_failures)
+        return create_runner(configs[env], module, argparse.Namespace(**options), submodule,
+                             failure_limits[max_failures])
+    
+    try:
+        DistributedWorker(parse_address(args.worker), authkey, worker_runner).run()
+    except Exception as e:
+        logger.error(f"工作节点执行过程中发生错误: {str(e)}")
+        return 1
+    return 0
+
+
 def list_modules(config):
     """列出所有可用的模块和子模块"""
     logger.info("可用的模块和子模块:")
@@ -116,6 +296,10 @@ def main():
     args = parse_args()
     logger.info(f"运行参数: {args}")
     
+    # 以工作节点运行时不生成报告，结果回传给协调节点
+    if args.worker:
+        return run_worker(args)
+    
     # 加载配置
     config = ConfigManager(args.env)
     logger.info(f"加载配置: {args.env}")
@@ -137,61 +321,77 @@ def main():
             logger.warning(f"子模块格式不正确: {args.submodule}，应为 'module_type.submodule'")
             return 1
     
+    # 压测模式只运行API用例
+    if args.load:
+        if module_type and module_type != "api":
+            logger.error("压测模式只支持API子模块")
+            return 1
+        return run_load(args, config, submodule)
+    
     # 初始化报告生成器
-    report_generator = ReportGenerator(args.report)
+    report_generator = ReportGenerator(args.report, config.get('report.compression'))
     
     # 根据模块选择运行不同的测试
-    results = []
+    runners = []
+    failure_limit = FailureLimit(get_max_failures(args))
     
     try:
         # 如果指定了子模块，只运行该子模块
         if module_type:
-            if module_type == "api":
-                logger.info(f"开始执行API子模块测试: {submodule}")
-                api_runner = ApiTestRunner(config, parallel=args.parallel, tags=args.tags, submodule=submodule)
-                api_results = api_runner.run()
-                results.extend(api_results)
-                logger.info(f"API子模块测试执行完成: {submodule}")
-            elif module_type == "ui":
-                logger.info(f"开始执行UI子模块测试: {submodule}")
-                ui_runner = UiTestRunner(config, parallel=args.parallel, tags=args.tags, submodule=submodule)
-                ui_results = ui_runner.run()
-                results.extend(ui_results)
-                logger.info(f"UI子模块测试执行完成: {submodule}")
-            elif module_type == "ssh":
-                logger.info(f"开始执行SSH子模块测试: {submodule}")
-                ssh_runner = SshTestRunner(config, parallel=args.parallel, tags=args.tags, submodule=submodule)
-                ssh_results = ssh_runner.run()
-                results.extend(ssh_results)
-                logger.info(f"SSH子模块测试执行完成: {submodule}")
-            else:
+            if module_type not in ["api", "ui", "ssh"]:
                 logger.error(f"不支持的模块类型: {module_type}")
                 return 1
+            runners.append((f"{module_type.upper()}子模块", module_type, submodule,
+                            create_runner(config, module_type, args, submodule, failure_limit)))
         else:
             # 否则，根据 --module 参数运行测试
-            if args.module in ["api", "all"]:
-                logger.info("开始执行API测试")
-                api_runner = ApiTestRunner(config, parallel=args.parallel, tags=args.tags)
-                api_results = api_runner.run()
-                results.extend(api_results)
-                logger.info("API测试执行完成")
-            
-            if args.module in ["ui", "all"]:
-                logger.info("开始执行UI测试")
-                ui_runner = UiTestRunner(config, parallel=args.parallel, tags=args.tags)
-                ui_results = ui_runner.run()
-                results.extend(ui_results)
-                logger.info("UI测试执行完成")
-            
-            if args.module in ["ssh", "all"]:
-                logger.info("开始执行SSH测试")
-                ssh_runner = SshTestRunner(config, parallel=args.parallel, tags=args.tags)
-                ssh_results = ssh_runner.run()
-                results.extend(ssh_results)
-                logger.info("SSH测试执行完成")
+            for module in ["api", "ui", "ssh"]:
+                if args.module in [module, "all"]:
+                    runners.append((module.upper(), module, None, create_runner(config, module, args, failure_limit=failure_limit)))
+        
+        # 增量执行：按结果库选出需要执行的用例，其余用例复用上次的结果
+        incremental = args.rerun_failed or args.changed_only
+        store = ResultStore(args.env) if incremental or config.get('result_store.enabled', True) else None
+        reused = []
+        planned = []
+        for label, module, sub, runner in runners:
+            test_cases = None
+            if incremental:
+                test_cases, module_reused = store.select(module, runner._get_test_cases(), args.rerun_failed, args.changed_only)
+                reused.extend(module_reused)
+            planned.append((label, module, sub, runner, test_cases))
         
+        # 结果在各用例完成后直接流入报告生成器，不在内存中累积
         # 生成报告时使用Docker中的路径
+        if args.coordinator or args.local_workers:
+            # 分布式执行：用例按历史耗时分片，各工作节点的结果合并到同一份报告
+            distributed_config = config.get('distributed', {}) or {}
+            if args.local_workers and not args.listen:
+                address = ("127.0.0.1", 0)
+            else:
+                address = parse_address(args.listen or distributed_config.get('listen', '0.0.0.0:7890'))
+            coordinator = DistributedCoordinator(
+                address,
+                get_authkey(config, local_only=bool(args.local_workers) and not args.listen),
+                {"env": args.env, "parallel": args.parallel, "tags": args.tags, "engine": args.engine,
+                 "validation": args.validation, "max_failures": failure_limit.max_failures},
+                shards=args.workers or args.local_workers or distributed_config.get('workers', 1),
+                local_workers=args.local_workers,
+                failure_limit=failure_limit
+            )
+            results = coordinator.iter_results([(module, sub, runner, test_cases)
+                                                for _, module, sub, runner, test_cases in planned])
+        else:
+            # 各模块访问的资源互不相关，并发执行并合并结果流
+            orchestrator = ModuleOrchestrator([(label, sub, runner, test_cases)
+                                               for label, _, sub, runner, test_cases in planned])
+            results = orchestrator.iter_results()
+        if store:
+            # 复用的结果与本次执行的结果合并为一份完整的报告
+            results = itertools.chain(reused, store.track(results))
         report_path = report_generator.generate(results)
+        if store:
+            store.save()
         logger.info(f"测试报告已生成: {report_path}")
         
         # 确保报告目录权限正确
@@ -199,14 +399,11 @@ def main():
             os.chmod(report_path, 0o644)
         
         # 统计测试结果
-        total = len(results)
-        passed = sum(1 for r in results if r.get("status") == "passed")
-        failed = sum(1 for r in results if r.get("status") == "failed")
-        skipped = sum(1 for r in results if r.get("status") == "skipped")
+        summary = report_generator.summary
         
-        logger.info(f"测试结果统计: 总计 {total}, 通过 {passed}, 失败 {failed}, 跳过 {skipped}")
+        logger.info(f"测试结果统计: 总计 {summary.total}, 通过 {summary.passed}, 失败 {summary.failed}, 跳过 {summary.skipped}")
         
-        return 1 if failed > 0 else 0
+        return 1 if summary.failed > 0 else 0
     
     except Exception as e:
         logger.error(f"测试执行过程中发生错误: {str(e)}")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import codecs
+import select
+import socket
+import tempfile
+
+# 等待输出时检查命令是否已退出的间隔(秒)，后台进程占用输出流时命令退出后可能迟迟收不到EOF
+EXIT_CHECK_INTERVAL = 1.0
+
+
+class StreamMatcher:
+    """在分块到达的输出上增量查找期望字符串，只保留跨块匹配所需的尾部"""
+
+    def __init__(self, patterns):
+        """
+        初始化匹配器
+
+        Args:
+            patterns: 期望在输出中出现的字符串列表
+        """
+        self.patterns = [p for p in patterns if p]
+        self.found = set()
+        self._keep = max((len(p) for p in self.patterns), default=1) - 1
+        self._tail = ""
+
+    def feed(self, text):
+        """匹配新到达的文本"""
+        if not self.patterns or not text:
+            return
+        window = self._tail + text
+        for pattern in self.patterns:
+            if pattern not in self.found and pattern in window:
+                self.found.add(pattern)
+        self._tail = window[-self._keep:] if self._keep else ""
+
+    def matched(self, pattern):
+        """期望字符串是否出现过，空字符串总是匹配"""
+        return not pattern or pattern in self.found
+
+
+class BoundedOutputCapture:
+    """有内存上限的输出捕获，超过上限的部分溢出到临时文件"""
+
+    def __init__(self, limit, spill_dir, spill_prefix, patterns=None):
+        """
+        初始化输出捕获
+
+        Args:
+            limit: 内存中保留的最大字节数
+            spill_dir: 溢出文件目录
+            spill_prefix: 溢出文件名前缀
+            patterns: 需要增量匹配的期望字符串列表
+        """
+        self.limit = max(0, int(limit))
+        self.spill_dir = spill_dir
+        self.spill_prefix = spill_prefix
+        self.matcher = StreamMatcher(patterns or [])
+        self.total_bytes = 0
+        self.spill_path = None
+        self._head = bytearray()
+        self._spill = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    @property
+    def truncated(self):
+        """输出是否超过内存上限"""
+        return self.total_bytes > self.limit
+
+    def feed(self, data):
+        """写入一块输出"""
+        if not data:
+            return
+        self.total_bytes += len(data)
+        self.matcher.feed(self._decoder.decode(data))
+
+        if self._spill is None:
+            room = self.limit - len(self._head)
+            if room >= len(data):
+                self._head.extend(data)
+                return
+            # 在UTF-8字符边界处截断，保证内存部分和溢出部分都能完整解码
+            while room > 0 and (data[room] & 0xC0) == 0x80:
+                room -= 1
+            self._head.extend(data[:room])
+            data = data[room:]
+        if data:
+            if self._spill is None:
+                fd, self.spill_path = tempfile.mkstemp(prefix=self.spill_prefix, suffix=".spill", dir=self.spill_dir)
+                self._spill = os.fdopen(fd, "wb")
+            self._spill.write(data)
+
+    def close(self):
+        """结束捕获"""
+        self.matcher.feed(self._decoder.decode(b"", final=True))
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def discard(self):
+        """放弃捕获并删除溢出文件"""
+        self.close()
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        self.spill_path = None
+
+    def text(self):
+        """内存中保留的输出文本"""
+        return self._head.decode("utf-8", errors="replace")
+
+
+def read_channel(channel, stdout, stderr, timeout=None, chunk_size=32768):
+    """
+    增量读取通道的标准输出和标准错误，直到命令结束
+
+    Args:
+        channel: 已执行命令的paramiko.Channel
+        stdout: 标准输出的BoundedOutputCapture
+        stderr: 标准错误的BoundedOutputCapture
+        timeout: 连续无输出的超时时间(秒)，为None时不限制
+        chunk_size: 单次读取的最大字节数
+
+    Returns:
+        命令退出码
+    """
+    idle_since = time.time()
+    while True:
+        progressed = False
+        while channel.recv_ready():
+            stdout.feed(channel.recv(chunk_size))
+            progressed = True
+        while channel.recv_stderr_ready():
+            stderr.feed(channel.recv_stderr(chunk_size))
+            progressed = True
+
+        if progressed:
+            idle_since = time.time()
+            continue
+
+        if channel.eof_received or channel.closed:
+            break
+
+        wait = EXIT_CHECK_INTERVAL
+        if timeout is not None:
+            remaining = idle_since + timeout - time.time()
+            if remaining <= 0:
+                raise socket.timeout(f"命令在 {timeout} 秒内没有输出")
+            wait = min(wait, remaining)
+        # 通道的标准输出或标准错误有数据、或收到EOF时可读，无需轮询
+        readable, _, _ = select.select([channel], [], [], wait)
+        if not readable and channel.exit_status_ready():
+            break
+
+    # 读取收到EOF前最后到达的数据
+    while channel.recv_ready():
+        stdout.feed(channel.recv(chunk_size))
+    while channel.recv_stderr_ready():
+        stderr.feed(channel.recv_stderr(chunk_size))
+
+    stdout.close()
+    stderr.close()
+    return channel.recv_exit_status()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+from contextlib import contextmanager
+from loguru import logger
+
+
+class PooledSshConnection:
+    """连接池中的一个已认证SSH连接"""
+
+    def __init__(self, key, client):
+        """
+        初始化池化连接
+
+        Args:
+            key: 连接键 (host, port, username)
+            client: 已连接的paramiko.SSHClient实例
+        """
+        self.key = key
+        self.client = client
+        self.in_use = 0
+        self.last_used = time.time()
+        self.last_checked = time.time()
+        self.broken = False
+
+    @property
+    def transport(self):
+        """底层传输层连接"""
+        return self.client.get_transport()
+
+    def is_healthy(self, check_interval):
+        """
+        检查连接是否可用，超过检查间隔时发送一个忽略包探测连接
+
+        Args:
+            check_interval: 主动探测的间隔(秒)
+
+        Returns:
+            连接可用时返回True
+        """
+        transport = self.transport
+        if self.broken or transport is None or not transport.is_active():
+            return False
+
+        if time.time() - self.last_checked >= check_interval:
+            try:
+                transport.send_ignore()
+            except Exception:
+                return False
+            self.last_checked = time.time()
+        return True
+
+    def close(self):
+        """关闭连接"""
+        try:
+            self.client.close()
+        except Exception as e:
+            logger.warning(f"关闭SSH连接失败: {self.key[0]}:{self.key[1]}, 错误: {str(e)}")
+
+
+class SshLease:
+    """从连接池借出的SSH连接，用于在同一个传输层上打开新的通道"""
+
+    def __init__(self, pool, connection):
+        self.pool = pool
+        self.connection = connection
+
+    @property
+    def client(self):
+        """paramiko.SSHClient实例"""
+        return self.connection.client
+
+    @contextmanager
+    def channel(self, timeout=None):
+        """
+        打开一个会话通道，受单主机最大通道数限制
+
+        Args:
+            timeout: 通道的读写超时时间(秒)
+
+        Yields:
+            paramiko.Channel实例
+        """
+        limit = self.pool._channel_limit(self.connection.key)
+        limit.acquire()
+        try:
+            try:
+                channel = self.connection.transport.open_session(timeout=timeout)
+            except Exception:
+                # 传输层已不可用，后续不再复用该连接
+                self.connection.broken = True
+                raise
+            channel.settimeout(timeout)
+            try:
+                yield channel
+            finally:
+                channel.close()
+        finally:
+            limit.release()
+
+
+class SshConnectionPool:
+    """SSH连接池，按 (host, port, username) 复用已认证的传输层连接，用例只需打开新通道"""
+
+    def __init__(self, connect, max_connections_per_host=2, max_channels_per_host=8,
+                 idle_timeout=300, health_check_interval=60):
+        """
+        初始化SSH连接池
+
+        Args:
+            connect: 创建连接的函数，参数为 (host, port, username, password, key_file)，返回SSHClient
+            max_connections_per_host: 单个连接键最多建立的传输层连接数
+            max_channels_per_host: 单个连接键同时打开的最大通道数
+            idle_timeout: 空闲连接的回收时间(秒)
+            health_check_interval: 复用连接前主动探测的间隔(秒)
+        """
+        self.connect = connect
+        self.max_connections_per_host = max(1, int(max_connections_per_host))
+        self.max_channels_per_host = max(1, int(max_channels_per_host))
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._connections = {}
+        self._channel_limits = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, connect, pool_config):
+        """
+        根据配置创建连接池
+
+        Args:
+            connect: 创建连接的函数
+            pool_config: 连接池配置字典，对应配置文件中的 ssh.pool
+
+        Returns:
+            SshConnectionPool实例
+        """
+        pool_config = pool_config or {}
+        return cls(
+            connect,
+            max_connections_per_host=pool_config.get('max_connections_per_host', 2),
+            max_channels_per_host=pool_config.get('max_channels_per_host', 8),
+            idle_timeout=pool_config.get('idle_timeout', 300),
+            health_check_interval=pool_config.get('health_check_interval', 60)
+        )
+
+    @contextmanager
+    def connection(self, host, port, username, password=None, key_file=None):
+        """
+        借出一个到指定主机的连接，使用完毕后归还连接池
+
+        Args:
+            host: 主机地址
+            port: 端口
+            username: 用户名
+            password: 密码
+            key_file: 密钥文件路径
+
+        Yields:
+            SshLease实例
+        """
+        connection = self._acquire(host, port, username, password, key_file)
+        try:
+            yield SshLease(self, connection)
+        finally:
+            self._release(connection)
+
+    def _acquire(self, host, port, username, password, key_file):
+        """获取可用连接，没有可复用的连接时新建"""
+        key = (host, int(port), username)
+        self._evict_idle()
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                connections = list(self._connections.get(key, []))
+
+            healthy = []
+            for connection in connections:
+                if connection.is_healthy(self.health_check_interval):
+                    healthy.append(connection)
+                    continue
+                # 失效连接在最后一个使用者归还后关闭
+                connection.broken = True
+                if connection.in_use == 0:
+                    logger.debug(f"移除失效的SSH连接: {username}@{host}:{port}")
+                    self._remove(connection)
+
+            healthy.sort(key=lambda c: c.in_use)
+            if healthy and (healthy[0].in_use == 0 or len(healthy) >= self.max_connections_per_host):
+                connection = healthy[0]
+            else:
+                logger.debug(f"新建SSH连接: {username}@{host}:{port}")
+                connection = PooledSshConnection(key, self.connect(host, port, username, password, key_file))
+                with self._lock:
+                    self._connections.setdefault(key, []).append(connection)
+
+            with self._lock:
+                connection.in_use += 1
+                connection.last_used = time.time()
+        return connection
+
+    def _release(self, connection):
+        """归还连接，已损坏的连接直接关闭"""
+        with self._lock:
+            connection.in_use -= 1
+            connection.last_used = time.time()
+            discard = connection.broken and connection.in_use == 0
+        if discard:
+            self._remove(connection)
+
+    def _remove(self, connection):
+        """从连接池移除并关闭连接"""
+        with self._lock:
+            connections = self._connections.get(connection.key, [])
+            if connection in connections:
+                connections.remove(connection)
+        connection.close()
+
+    def _evict_idle(self):
+        """关闭空闲时间超过 idle_timeout 的连接"""
+        now = time.time()
+        idle = []
+        with self._lock:
+            for connections in self._connections.values():
+                for connection in list(connections):
+                    if connection.in_use == 0 and now - connection.last_used > self.idle_timeout:
+                        connections.remove(connection)
+                        idle.append(connection)
+        for connection in idle:
+            logger.debug(f"回收空闲SSH连接: {connection.key[2]}@{connection.key[0]}:{connection.key[1]}")
+            connection.close()
+
+    def _channel_limit(self, key):
+        """获取连接键对应的通道数信号量"""
+        with self._lock:
+            limit = self._channel_limits.get(key)
+            if limit is None:
+                limit = self._channel_limits[key] = threading.BoundedSemaphore(self.max_channels_per_host)
+            return limit
+
+    def close(self):
+        """关闭连接池中的全部连接"""
+        with self._lock:
+            connections = [c for group in self._connections.values() for c in group]
+            self._connections = {}
+        for connection in connections:
+            connection.close()
@@ -4,12 +4,18 @@
 import os
 import time
 import json
+import codecs
 import traceback
 import warnings
 from datetime import datetime
 from loguru import logger
 import paramiko
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from common.case_executor import iter_case_results, FailureLimit
+from common.case_discovery import CaseDiscovery
+from common.scheduling import CaseScheduler
+from ssh_test.ssh_pool import SshConnectionPool
+from ssh_test.output_capture import BoundedOutputCapture, read_channel
 
 # 抑制 cryptography 的弃用警告
 warnings.filterwarnings(
@@ -26,7 +32,7 @@ warnings.filterwarnings(
 class SshTestRunner:
     """SSH测试运行器，用于执行SSH自动化测试"""
     
-    def __init__(self, config, parallel=1, tags=None, submodule=None):
+    def __init__(self, config, parallel=1, tags=None, submodule=None, failure_limit=None):
         """
         初始化SSH测试运行器
         
@@ -35,15 +41,23 @@ class SshTestRunner:
             parallel: 并行执行的线程数
             tags: 要执行的测试标签
             submodule: 要执行的子模块，如 'server', 'database' 等
+            failure_limit: 各模块共享的FailureLimit实例，达到失败上限后不再开始新的用例
         """
         self.config = config
         self.parallel = parallel
         self.tags = tags
         self.submodule = submodule
+        self.failure_limit = failure_limit or FailureLimit()
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.discovery = CaseDiscovery(
+            "ssh", os.path.join(self.base_dir, "testcases"), workers=config.get('discovery.workers', 8))
+        self.scheduler = CaseScheduler("ssh", config.get('scheduling.strategy', 'lpt'))
         self.ssh_config = config.get_ssh_config()
         self.timeout = self.ssh_config.get('timeout', 30)
         self.log_dir = os.path.join(self.base_dir, "logs")
+        self.pool_config = dict(self.ssh_config.get('pool', {}))
+        self.parallel_commands = self.ssh_config.get('parallel_commands', False)
+        self.output_limit = self.ssh_config.get('output_limit', 1048576)
         
         # 如果指定了子模块，加载子模块配置
         if submodule:
@@ -54,113 +68,83 @@ class SshTestRunner:
                     self.timeout = module_config['timeout']
                 if 'default_servers' in module_config:
                     self.default_servers = module_config['default_servers']
+                if 'output_limit' in module_config:
+                    self.output_limit = module_config['output_limit']
+                if 'parallel_commands' in module_config:
+                    self.parallel_commands = module_config['parallel_commands']
+                if 'pool' in module_config:
+                    self.pool_config.update(module_config.get('pool', {}))
+        
+        # 按 (host, port, username) 复用已认证连接的连接池
+        self.ssh_pool = SshConnectionPool.from_config(self._create_ssh_client, self.pool_config)
         
         # 确保日志目录存在
         if not os.path.exists(self.log_dir):
             os.makedirs(self.log_dir)
     
-    def run(self):
+    def run(self, test_cases=None):
         """
         运行SSH测试
         
+        Args:
+            test_cases: 要执行的测试用例列表，为None时从测试用例目录加载
+        
         Returns:
             测试结果列表
         """
+        return list(self.iter_results(test_cases))
+    
+    def iter_results(self, test_cases=None):
+        """
+        运行SSH测试，并在每个用例完成后立即产出结果
+        
+        Args:
+            test_cases: 要执行的测试用例列表，为None时从测试用例目录加载
+        
+        Yields:
+            测试结果字典
+        """
         logger.info("开始执行SSH测试")
         if self.submodule:
             logger.info(f"子模块: {self.submodule}")
         
         # 获取测试用例
-        test_cases = self._get_test_cases()
+        if test_cases is None:
+            test_cases = self._get_test_cases()
         logger.info(f"找到 {len(test_cases)} 个SSH测试用例")
         
-        # 如果没有测试用例，返回空列表
+        # 如果没有测试用例，直接返回
         if not test_cases:
             logger.warning("没有找到符合条件的SSH测试用例")
-            return []
+            return
         
         # 执行测试用例
-        results = []
         if self.parallel > 1 and len(test_cases) > 1:
-            # 并行执行
             logger.info(f"使用 {self.parallel} 个线程并行执行SSH测试")
-            with ThreadPoolExecutor(max_workers=self.parallel) as executor:
-                futures = [executor.submit(self._execute_test_case, test_case) for test_case in test_cases]
-                for future in futures:
-                    result = future.result()
-                    if result:
-                        results.append(result)
+            parallel = self.parallel
         else:
-            # 串行执行
             logger.info("串行执行SSH测试")
-            for test_case in test_cases:
-                result = self._execute_test_case(test_case)
-                if result:
-                    results.append(result)
-        
-        logger.info(f"SSH测试执行完成，共 {len(results)} 个结果")
-        return results
-    
-    def _get_test_cases(self):
-        """获取测试用例"""
-        test_cases = []
+            parallel = 1
         
-        # 确定测试用例目录
-        if self.submodule:
-            test_dir = os.path.join(self.base_dir, "testcases", self.submodule)
-        else:
-            test_dir = os.path.join(self.base_dir, "testcases")
+        # 按历史耗时安排执行顺序，耗时长的用例先执行
+        test_cases = self.scheduler.order(test_cases, parallel)
         
-        # 如果测试用例目录不存在，返回空列表
-        if not os.path.exists(test_dir):
-            logger.warning(f"测试用例目录不存在: {test_dir}")
-            return []
-        
-        # 遍历测试用例目录
-        for root, _, files in os.walk(test_dir):
-            for file in files:
-                # 只处理JSON文件
-                if file.endswith(".json"):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            test_case = json.load(f)
-                        
-                        # 如果指定了标签，检查测试用例是否包含该标签
-                        if self.tags and not self._match_tags(test_case.get("tags", [])):
-                            continue
-                        
-                        # 添加子模块信息
-                        if self.submodule:
-                            test_case["submodule"] = self.submodule
-                        else:
-                            # 从路径中提取子模块
-                            rel_path = os.path.relpath(file_path, os.path.join(self.base_dir, "testcases"))
-                            parts = os.path.dirname(rel_path).split(os.sep)
-                            if parts and parts[0]:
-                                test_case["submodule"] = parts[0]
-                        
-                        test_case["file_path"] = file_path
-                        test_cases.append(test_case)
-                    except Exception as e:
-                        logger.error(f"加载测试用例失败: {file_path}, 错误: {str(e)}")
+        count = 0
+        try:
+            for result in iter_case_results(self._execute_test_case, test_cases, parallel, self.failure_limit):
+                count += 1
+                self.scheduler.record(result)
+                yield result
+        finally:
+            self.scheduler.finish("SSH")
+            # 关闭连接池中的全部连接
+            self.ssh_pool.close()
         
-        return test_cases
+        logger.info(f"SSH测试执行完成，共 {count} 个结果")
     
-    def _match_tags(self, case_tags):
-        """检查测试用例标签是否匹配"""
-        if not self.tags:
-            return True
-        
-        # 将标签字符串拆分为列表
-        tag_list = self.tags.split(",") if isinstance(self.tags, str) else self.tags
-        
-        # 检查是否有任何一个标签匹配
-        for tag in tag_list:
-            if tag.strip() in case_tags:
-                return True
-        
-        return False
+    def _get_test_cases(self):
+        """获取测试用例"""
+        return self.discovery.discover(self.submodule, self.tags)
     
     def _create_ssh_client(self, host, port, username, password=None, key_file=None):
         """
@@ -212,6 +196,7 @@ class SshTestRunner:
         key_file = test_case.get("key_file", "")
         commands = test_case.get("commands", [])
         expected_results = test_case.get("expected_results", {})
+        parallel_commands = test_case.get("parallel_commands", self.parallel_commands)
         submodule = test_case.get("submodule", "")
         
         # 初始化结果
@@ -220,6 +205,7 @@ class SshTestRunner:
             "description": description,
             "module": "ssh",
             "submodule": submodule,
+            "file_path": test_case.get("file_path", ""),
             "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "start_timestamp": int(time.time() * 1000),
             "status": "skipped",
@@ -229,7 +215,6 @@ class SshTestRunner:
             "command_results": []
         }
         
-        client = None
         try:
             logger.info(f"执行SSH测试: {name}")
             logger.debug(f"连接到: {username}@{host}:{port}")
@@ -237,83 +222,9 @@ class SshTestRunner:
             # 记录开始时间
             start_time = time.time()
             
-            # 创建SSH客户端连接
-            client = self._create_ssh_client(host, port, username, password, key_file)
-            
-            # 执行命令
-            for i, command in enumerate(commands):
-                cmd_name = command.get("name", f"命令 {i+1}")
-                cmd_value = command.get("command", "")
-                cmd_timeout = command.get("timeout", self.timeout)
-                
-                logger.debug(f"执行命令: {cmd_name}: {cmd_value}")
-                
-                # 执行命令
-                stdin, stdout, stderr = client.exec_command(cmd_value, timeout=cmd_timeout)
-                
-                # 获取输出
-                stdout_str = stdout.read().decode('utf-8')
-                stderr_str = stderr.read().decode('utf-8')
-                exit_code = stdout.channel.recv_exit_status()
-                
-                # 记录命令结果
-                cmd_result = {
-                    "name": cmd_name,
-                    "command": cmd_value,
-                    "stdout": stdout_str,
-                    "stderr": stderr_str,
-                    "exit_code": exit_code,
-                    "status": "passed"
-                }
-                
-                # 验证预期结果
-                if cmd_name in expected_results:
-                    expected = expected_results[cmd_name]
-                    
-                    # 验证退出码
-                    if "exit_code" in expected and expected["exit_code"] != exit_code:
-                        cmd_result["status"] = "failed"
-                        cmd_result["error"] = f"退出码不匹配: 期望 {expected['exit_code']}, 实际 {exit_code}"
-                    
-                    # 验证标准输出
-                    if "stdout" in expected:
-                        if isinstance(expected["stdout"], list):
-                            # 检查每一行是否都在输出中
-                            for line in expected["stdout"]:
-                                if line not in stdout_str:
-                                    cmd_result["status"] = "failed"
-                                    cmd_result["error"] = f"标准输出不匹配: 期望包含 '{line}'"
-                                    break
-                        else:
-                            # 检查整个字符串是否在输出中
-                            if expected["stdout"] not in stdout_str:
-                                cmd_result["status"] = "failed"
-                                cmd_result["error"] = f"标准输出不匹配: 期望包含 '{expected['stdout']}'"
-                    
-                    # 验证标准错误
-                    if "stderr" in expected:
-                        if isinstance(expected["stderr"], list):
-                            # 检查每一行是否都在输出中
-                            for line in expected["stderr"]:
-                                if line not in stderr_str:
-                                    cmd_result["status"] = "failed"
-                                    cmd_result["error"] = f"标准错误不匹配: 期望包含 '{line}'"
-                                    break
-                        else:
-                            # 检查整个字符串是否在输出中
-                            if expected["stderr"] not in stderr_str:
-                                cmd_result["status"] = "failed"
-                                cmd_result["error"] = f"标准错误不匹配: 期望包含 '{expected['stderr']}'"
-                
-                # 添加到结果列表
-                result["command_results"].append(cmd_result)
-                
-                # 如果命令失败，整个测试失败
-                if cmd_result["status"] == "failed":
-                    result["status"] = "failed"
-                    result["error"] = f"命令 '{cmd_name}' 执行失败: {cmd_result.get('error', '')}"
-                    logger.error(f"测试失败: {name}, {result['error']}")
-                    break
+            # 从连接池借出SSH连接，每个命令在该连接上打开新通道
+            with self.ssh_pool.connection(host, port, username, password, key_file) as connection:
+                self._execute_commands(connection, name, commands, expected_results, result, parallel_commands)
             
             # 计算耗时
             duration = time.time() - start_time
@@ -332,10 +243,6 @@ class SshTestRunner:
             logger.error(f"测试执行异常: {name}, 错误: {str(e)}")
         
         finally:
-            # 关闭SSH连接
-            if client:
-                client.close()
-            
             # 记录结束时间
             result["end_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             result["end_timestamp"] = int(time.time() * 1000)
@@ -345,6 +252,228 @@ class SshTestRunner:
         
         return result
     
+    def _execute_commands(self, connection, name, commands, expected_results, result, parallel_commands=False):
+        """
+        在借出的连接上执行测试用例中的命令
+        
+        Args:
+            connection: 连接池借出的SshLease实例
+            name: 测试名称
+            commands: 命令列表
+            expected_results: 预期结果字典
+            result: 测试结果字典
+            parallel_commands: 是否在独立通道上并发执行互不依赖的命令
+        """
+        if parallel_commands and len(commands) > 1:
+            cmd_results = self._execute_commands_concurrently(connection, commands, expected_results)
+        else:
+            cmd_results = []
+            for i, command in enumerate(commands):
+                try:
+                    cmd_result = self._execute_command(connection, i, command, expected_results)
+                except Exception as e:
+                    cmd_name = command.get("name", f"命令 {i+1}")
+                    logger.error(f"执行命令出错: {cmd_name}, 错误: {str(e)}")
+                    cmd_result = self._failed_command_result(cmd_name, command, f"执行命令出错: {str(e)}")
+                cmd_results.append(cmd_result)
+                # 顺序模式下命令失败后不再执行后续命令
+                if cmd_result["status"] == "failed":
+                    break
+        
+        # 添加到结果列表
+        result["command_results"].extend(cmd_results)
+        
+        # 如果命令失败，整个测试失败
+        for cmd_result in cmd_results:
+            if cmd_result["status"] == "failed":
+                result["status"] = "failed"
+                result["error"] = f"命令 '{cmd_result['name']}' 执行失败: {cmd_result.get('error', '')}"
+                logger.error(f"测试失败: {name}, {result['error']}")
+                break
+    
+    def _execute_commands_concurrently(self, connection, commands, expected_results):
+        """
+        在同一传输层的多个通道上并发执行命令，depends_on 中列出的命令成功后才会执行依赖它的命令
+        
+        Args:
+            connection: 连接池借出的SshLease实例
+            commands: 命令列表
+            expected_results: 预期结果字典
+            
+        Returns:
+            命令结果列表，与命令声明顺序一致；执行出错或依赖存在循环的命令记为失败，每个命令都有结果
+        """
+        names = [command.get("name", f"命令 {i+1}") for i, command in enumerate(commands)]
+        
+        # 解析依赖关系
+        dependencies = []
+        for i, command in enumerate(commands):
+            depends_on = command.get("depends_on", [])
+            if isinstance(depends_on, str):
+                depends_on = [depends_on]
+            unknown = [dep for dep in depends_on if dep not in names]
+            if unknown:
+                raise ValueError(f"命令 '{names[i]}' 依赖的命令不存在: {', '.join(unknown)}")
+            dependencies.append({names.index(dep) for dep in depends_on})
+        
+        cmd_results = [None] * len(commands)
+        remaining = set(range(len(commands)))
+        running = {}
+        workers = min(len(commands), self.ssh_pool.max_channels_per_host)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while remaining or running:
+                # 提交依赖已全部完成的命令，依赖失败的命令直接跳过
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for i in sorted(remaining):
+                        if any(cmd_results[dep] is None for dep in dependencies[i]):
+                            continue
+                        remaining.discard(i)
+                        progressed = True
+                        failed = [names[dep] for dep in sorted(dependencies[i]) if cmd_results[dep]["status"] != "passed"]
+                        if failed:
+                            cmd_results[i] = self._skipped_command_result(
+                                names[i], commands[i], f"依赖的命令未通过: {', '.join(failed)}")
+                        else:
+                            future = executor.submit(self._execute_command, connection, i, commands[i], expected_results)
+                            running[future] = i
+                
+                if not running:
+                    if remaining:
+                        error = f"命令依赖存在循环: {', '.join(names[i] for i in sorted(remaining))}"
+                        for i in remaining:
+                            cmd_results[i] = self._failed_command_result(names[i], commands[i], error)
+                    break
+                
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = running.pop(future)
+                    try:
+                        cmd_results[i] = future.result()
+                    except Exception as e:
+                        # 单个命令出错不影响已完成命令的结果，这些结果中的溢出文件在保存日志后删除
+                        logger.error(f"执行命令出错: {names[i]}, 错误: {str(e)}")
+                        cmd_results[i] = self._failed_command_result(names[i], commands[i], f"执行命令出错: {str(e)}")
+        
+        return cmd_results
+    
+    def _expected_lines(self, expected, stream):
+        """获取预期结果中要求输出包含的字符串列表"""
+        value = expected.get(stream) if isinstance(expected, dict) else None
+        if value is None:
+            return []
+        return value if isinstance(value, list) else [value]
+    
+    def _failed_command_result(self, cmd_name, command, error):
+        """生成执行出错的命令结果"""
+        return dict(self._skipped_command_result(cmd_name, command, error), status="failed")
+    
+    def _skipped_command_result(self, cmd_name, command, reason):
+        """生成被跳过的命令结果"""
+        return {
+            "name": cmd_name,
+            "command": command.get("command", ""),
+            "stdout": "",
+            "stderr": "",
+            "exit_code": None,
+            "status": "skipped",
+            "error": reason
+        }
+    
+    def _execute_command(self, connection, index, command, expected_results):
+        """
+        在新通道上执行单个命令并验证预期结果
+        
+        Args:
+            connection: 连接池借出的SshLease实例
+            index: 命令序号
+            command: 命令定义
+            expected_results: 预期结果字典
+            
+        Returns:
+            命令结果字典
+        """
+        cmd_name = command.get("name", f"命令 {index+1}")
+        cmd_value = command.get("command", "")
+        cmd_timeout = command.get("timeout", self.timeout)
+        
+        logger.debug(f"执行命令: {cmd_name}: {cmd_value}")
+        
+        # 期望出现在输出中的字符串，在读取输出的同时增量匹配
+        expected = expected_results.get(cmd_name, {})
+        stdout_capture = BoundedOutputCapture(
+            self.output_limit, self.log_dir, f"cmd{index+1}_stdout_", self._expected_lines(expected, "stdout"))
+        stderr_capture = BoundedOutputCapture(
+            self.output_limit, self.log_dir, f"cmd{index+1}_stderr_", self._expected_lines(expected, "stderr"))
+        
+        # 在复用的传输层上打开新通道执行命令
+        with connection.channel(timeout=cmd_timeout) as channel:
+            channel.exec_command(cmd_value)
+            
+            # 分块读取输出，超过内存上限的部分溢出到临时文件
+            try:
+                exit_code = read_channel(channel, stdout_capture, stderr_capture, cmd_timeout)
+            except Exception:
+                stdout_capture.discard()
+                stderr_capture.discard()
+                raise
+        
+        # 记录命令结果
+        cmd_result = {
+            "name": cmd_name,
+            "command": cmd_value,
+            "stdout": stdout_capture.text(),
+            "stderr": stderr_capture.text(),
+            "exit_code": exit_code,
+            "status": "passed"
+        }
+        for stream, capture in (("stdout", stdout_capture), ("stderr", stderr_capture)):
+            if capture.truncated:
+                cmd_result[f"{stream}_truncated"] = True
+                cmd_result[f"{stream}_bytes"] = capture.total_bytes
+                cmd_result[f"{stream}_spill"] = capture.spill_path
+        
+        # 验证预期结果
+        if cmd_name in expected_results:
+            # 验证退出码
+            if "exit_code" in expected and expected["exit_code"] != exit_code:
+                cmd_result["status"] = "failed"
+                cmd_result["error"] = f"退出码不匹配: 期望 {expected['exit_code']}, 实际 {exit_code}"
+            
+            # 验证标准输出
+            if "stdout" in expected:
+                if isinstance(expected["stdout"], list):
+                    # 检查每一行是否都在输出中
+                    for line in expected["stdout"]:
+                        if not stdout_capture.matcher.matched(line):
+                            cmd_result["status"] = "failed"
+                            cmd_result["error"] = f"标准输出不匹配: 期望包含 '{line}'"
+                            break
+                else:
+                    # 检查整个字符串是否在输出中
+                    if not stdout_capture.matcher.matched(expected["stdout"]):
+                        cmd_result["status"] = "failed"
+                        cmd_result["error"] = f"标准输出不匹配: 期望包含 '{expected['stdout']}'"
+            
+            # 验证标准错误
+            if "stderr" in expected:
+                if isinstance(expected["stderr"], list):
+                    # 检查每一行是否都在输出中
+                    for line in expected["stderr"]:
+                        if not stderr_capture.matcher.matched(line):
+                            cmd_result["status"] = "failed"
+                            cmd_result["error"] = f"标准错误不匹配: 期望包含 '{line}'"
+                            break
+                else:
+                    # 检查整个字符串是否在输出中
+                    if not stderr_capture.matcher.matched(expected["stderr"]):
+                        cmd_result["status"] = "failed"
+                        cmd_result["error"] = f"标准错误不匹配: 期望包含 '{expected['stderr']}'"
+        
+        return cmd_result
+    
     def _save_command_logs(self, test_name, command_results):
         """
         保存命令输出到日志文件
@@ -374,12 +503,46 @@ class SshTestRunner:
                     
                     f.write("\n标准输出:\n")
                     f.write("-"*80 + "\n")
-                    f.write(cmd_result['stdout'])
+                    self._write_output(f, cmd_result, "stdout", filepath)
                     f.write("\n\n标准错误:\n")
                     f.write("-"*80 + "\n")
-                    f.write(cmd_result['stderr'])
+                    self._write_output(f, cmd_result, "stderr", filepath)
                     f.write("\n\n" + "="*80 + "\n\n")
             
             logger.debug(f"命令日志已保存: {filepath}")
         except Exception as e:
-            logger.error(f"保存命令日志失败: {str(e)}") 
\ No newline at end of file
+            logger.error(f"保存命令日志失败: {str(e)}")
+        finally:
+            # 删除未能写入日志的溢出文件
+            for cmd_result in command_results:
+                for stream in ("stdout", "stderr"):
+                    spill_path = cmd_result.pop(f"{stream}_spill", None)
+                    if spill_path and os.path.exists(spill_path):
+                        os.remove(spill_path)
+    
+    def _write_output(self, f, cmd_result, stream, log_path):
+        """
+        写入命令输出，超出内存上限的部分从溢出文件分块拷贝
+        
+        Args:
+            f: 日志文件对象
+            cmd_result: 命令结果字典
+            stream: 输出类型，stdout 或 stderr
+            log_path: 日志文件路径
+        """
+        f.write(cmd_result[stream])
+        
+        spill_path = cmd_result.pop(f"{stream}_spill", None)
+        if not spill_path:
+            return
+        
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with open(spill_path, "rb") as spill:
+            while True:
+                chunk = spill.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(decoder.decode(chunk))
+        f.write(decoder.decode(b"", final=True))
+        os.remove(spill_path)
+        cmd_result[f"{stream}_log"] = log_path 
\ No newline at end of file
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import gzip
+import json
+import time
+
+import pytest
+
+from common.report_catalog import ReportCatalog
+from common.report_index import sidecar_path
+
+DAY = 86400
+
+
+@pytest.fixture
+def reports_dir(tmp_path):
+    """临时报告目录"""
+    path = tmp_path / "reports"
+    path.mkdir()
+    return str(path)
+
+
+@pytest.fixture
+def catalog(reports_dir, tmp_path):
+    """临时报告目录的报告索引，数据库也放在临时目录中"""
+    return ReportCatalog(reports_dir, path=str(tmp_path / "catalog.db"))
+
+
+@pytest.fixture
+def write_report(reports_dir):
+    """
+    在报告目录中写入报告的函数
+
+    参数依次为: 文件名(可带 .gz 后缀)、内容大小(字节)、写入结果索引头的汇总信息、
+    报告距今天数(相对创建fixture的时间，天数相同的报告修改时间相同)、
+    是否写入NDJSON结果副本和索引(summary不为None时总是写入)
+    """
+    now = time.time()
+
+    def write(filename, size=100, summary=None, age_days=None, sidecar=False):
+        path = os.path.join(reports_dir, filename)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            f.write("x" * size)
+        if sidecar or summary is not None:
+            ndjson_path = sidecar_path(path)
+            with open(ndjson_path, "w", encoding="utf-8") as f:
+                f.write("{}\n")
+            with open(f"{ndjson_path}.idx", "w", encoding="utf-8") as f:
+                f.write(json.dumps({"summary": summary}) + "\n")
+        if age_days is not None:
+            mtime = now - age_days * DAY
+            os.utime(path, (mtime, mtime))
+        return path
+
+    return write
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+import pytest
+
+from common import case_discovery
+from common.case_discovery import CaseDiscovery
+
+
+def write_case(testcases_dir, rel_path, **case):
+    path = os.path.join(testcases_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(case, f, ensure_ascii=False)
+    return path
+
+
+@pytest.fixture
+def testcases_dir(tmp_path):
+    path = str(tmp_path / "testcases")
+    write_case(path, "user/login.json", name="登录", tags=["smoke"])
+    write_case(path, "user/logout.json", name="登出", tags=["regression"])
+    write_case(path, "order/create.json", name="下单")
+    return path
+
+
+@pytest.fixture
+def discovery(testcases_dir, tmp_path):
+    return CaseDiscovery("api", testcases_dir, index_path=str(tmp_path / "case_index.json"), workers=2)
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """记录实际读取解析的用例文件"""
+    paths = []
+    load_case = CaseDiscovery._load_case
+
+    def tracking_load_case(self, rel_path):
+        paths.append(rel_path)
+        return load_case(self, rel_path)
+
+    monkeypatch.setattr(case_discovery.CaseDiscovery, "_load_case", tracking_load_case)
+    return paths
+
+
+def test_discover_annotates_cases(discovery, testcases_dir):
+    cases = discovery.discover()
+
+    assert [case["name"] for case in cases] == ["下单", "登录", "登出"]
+    assert cases[1]["submodule"] == "user"
+    assert cases[1]["file_path"] == os.path.join(testcases_dir, "user", "login.json")
+
+
+def test_unchanged_files_are_served_from_cache(discovery, parsed):
+    discovery.discover()
+    assert len(parsed) == 3
+
+    parsed.clear()
+    cases = discovery.discover()
+    assert parsed == []
+    assert len(cases) == 3
+
+    parsed.clear()
+    assert [case["name"] for case in discovery.discover(tags="smoke")] == ["登录"]
+    assert parsed == []
+
+
+def test_modified_and_deleted_files_are_refreshed(discovery, testcases_dir, parsed):
+    discovery.discover()
+    parsed.clear()
+
+    path = write_case(testcases_dir, "user/login.json", name="登录(新)", tags=["smoke", "new"])
+    os.utime(path, ns=(1, 1))
+    os.remove(os.path.join(testcases_dir, "order", "create.json"))
+    cases = discovery.discover()
+
+    assert parsed == [os.path.join("user", "login.json")]
+    assert [case["name"] for case in cases] == ["登录(新)", "登出"]
+
+
+def test_returned_cases_do_not_modify_cache(discovery):
+    discovery.discover()[0]["name"] = "changed"
+
+    assert discovery.discover()[0]["name"] == "下单"
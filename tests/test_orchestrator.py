@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+
+from common.orchestrator import ModuleOrchestrator
+
+
+class FakeRunner:
+    """按顺序产出给定数量结果的运行器，记录结果流是否被关闭"""
+
+    parallel = 1
+
+    def __init__(self, count, error=None):
+        self.count = count
+        self.error = error
+        self.closed = threading.Event()
+
+    def iter_results(self, test_cases=None):
+        try:
+            for i in range(self.count):
+                yield {"name": f"case_{i}"}
+            if self.error:
+                raise self.error
+        finally:
+            self.closed.set()
+
+
+def test_merges_all_module_results():
+    orchestrator = ModuleOrchestrator([("API", None, FakeRunner(5)), ("SSH", None, FakeRunner(3))], buffer_size=2)
+
+    assert len(list(orchestrator.iter_results())) == 8
+
+
+def test_producers_stop_when_consumer_stops_early():
+    runners = [FakeRunner(10000), FakeRunner(10000)]
+    orchestrator = ModuleOrchestrator([("API", None, runners[0]), ("UI", None, runners[1])], buffer_size=2)
+
+    results = orchestrator.iter_results()
+    next(results)
+    results.close()
+
+    for runner in runners:
+        assert runner.closed.wait(5)
+
+
+def test_module_error_is_raised_after_other_modules_finish():
+    orchestrator = ModuleOrchestrator([("API", None, FakeRunner(2, ValueError("boom"))),
+                                       ("SSH", None, FakeRunner(3))])
+
+    results = []
+    with pytest.raises(ValueError):
+        for result in orchestrator.iter_results():
+            results.append(result)
+    assert len(results) == 5
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+
+def test_reconcile_indexes_reports_only(catalog, reports_dir, write_report):
+    summary = {"total": 10, "passed": 8, "failed": 2, "skipped": 0, "pass_rate": 80.0}
+    write_report("report_20250101_000000.html", summary=summary)
+    write_report("report_20250102_000000.json.gz")
+    os.mkdir(os.path.join(reports_dir, "allure_report_20250103_000000"))
+    write_report("report_20250104_000000.html.part")
+    write_report("notes.txt")
+
+    assert catalog.reconcile() == 3
+    assert catalog.count(None) == 3
+
+    html = catalog.get("report_20250101_000000.html")
+    assert html["type"] == "html"
+    assert html["failed"] == 2
+    assert html["pass_rate"] == 80.0
+    assert catalog.get("report_20250102_000000.json.gz")["id"] == "report_20250102_000000"
+    assert catalog.get("allure_report_20250103_000000")["type"] == "allure"
+    assert catalog.failed_total() == 2
+
+
+def test_reconcile_skips_unchanged_directory(catalog, write_report):
+    write_report("report_20250101_000000.html")
+    assert catalog.reconcile() == 1
+    assert catalog.reconcile() == 0
+    assert catalog.reconcile(force=True) == 0
+
+
+def test_reconcile_removes_deleted_reports(catalog, write_report):
+    path = write_report("report_20250101_000000.html")
+    write_report("report_20250102_000000.html")
+    catalog.reconcile()
+
+    os.remove(path)
+    assert catalog.reconcile(force=True) == 1
+    assert catalog.get("report_20250101_000000.html") is None
+    assert catalog.count() == 1
+
+
+def test_add_ignores_files_outside_reports_dir(catalog, tmp_path):
+    path = tmp_path / "report_20250101_000000.html"
+    path.write_text("<html></html>")
+    assert catalog.add(str(path)) is False
+    assert catalog.count(None) == 0
+
+
+def test_find_prefers_newest_existing_report(catalog, write_report):
+    write_report("report_20250101_000000.html", age_days=2)
+    write_report("report_20250101_000000.html.gz", age_days=1)
+    catalog.reconcile()
+
+    assert catalog.find("report_20250101_000000")["filename"] == "report_20250101_000000.html.gz"
+
+
+def test_find_prefers_compressed_report_with_same_mtime(catalog, write_report):
+    write_report("report_20250101_000000.html", age_days=1)
+    write_report("report_20250101_000000.html.gz", age_days=1)
+    catalog.reconcile()
+
+    assert catalog.find("report_20250101_000000")["filename"] == "report_20250101_000000.html.gz"
+
+
+def test_find_drops_stale_rows(catalog, write_report):
+    write_report("report_20250101_000000.html", age_days=2)
+    compressed = write_report("report_20250101_000000.html.gz", age_days=1)
+    catalog.reconcile()
+    os.remove(compressed)
+
+    assert catalog.find("report_20250101_000000")["filename"] == "report_20250101_000000.html"
+    assert catalog.get("report_20250101_000000.html.gz") is None
+    assert catalog.find("report_20250101_000000", type="json") is None
+
+
+def test_add_replaces_stale_row_for_same_report(catalog, write_report):
+    plain = write_report("report_20250101_000000.html")
+    catalog.add(plain)
+    os.remove(plain)
+    catalog.add(write_report("report_20250101_000000.html.gz"))
+
+    assert catalog.get("report_20250101_000000.html") is None
+    assert catalog.count() == 1
+
+
+def test_list_sorts_and_pages(catalog, write_report):
+    for day, failed in ((1, 3), (2, 0), (3, 1)):
+        write_report(f"report_2025010{day}_000000.html", age_days=10 - day,
+                     summary={"total": 5, "passed": 5 - failed, "failed": failed, "skipped": 0,
+                              "pass_rate": (5 - failed) * 20.0})
+    catalog.reconcile()
+
+    total, reports = catalog.list(per_page=2)
+    assert total == 3
+    assert [r["id"] for r in reports] == ["report_20250103_000000", "report_20250102_000000"]
+    _, reports = catalog.list(page=2, per_page=2)
+    assert [r["id"] for r in reports] == ["report_20250101_000000"]
+    _, reports = catalog.list(sort="failed", order="asc")
+    assert [r["failed"] for r in reports] == [0, 1, 3]
+    _, reports = catalog.list(sort="filename; DROP TABLE reports")
+    assert len(reports) == 3
+
+
+def test_list_is_scoped_to_report_type(catalog, write_report):
+    write_report("report_20250101_000000.html")
+    write_report("report_20250102_000000.json.gz")
+    catalog.reconcile()
+
+    assert [r["type"] for r in catalog.list(type="html")[1]] == ["html"]
+    assert catalog.list(type=None)[0] == 2
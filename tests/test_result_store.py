@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from common.result_store import ResultStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore("test", path=str(tmp_path / "result_store.json"))
+    store.base_dir = str(tmp_path)
+    case_dir = tmp_path / "api_test" / "testcases" / "user"
+    case_dir.mkdir(parents=True)
+    (case_dir / "login.json").write_text('{"name": "登录"}', encoding="utf-8")
+    return store
+
+
+def result(file_path, status="passed"):
+    return {"module": "api", "submodule": "user", "name": "登录", "status": status, "duration": 0.1,
+            "file_path": file_path, "response": {"content": "x" * 1000}}
+
+
+def test_key_is_relative_to_module_testcases_dir(store, tmp_path):
+    local = str(tmp_path / "api_test" / "testcases" / "user" / "login.json")
+    assert store.key("api", local) == "api:user/login.json"
+    assert store.key("api", "/srv/worker/gxpt/api_test/testcases/user/login.json") == "api:user/login.json"
+    assert store.key("api", "C:\\worker\\api_test\\testcases\\user\\login.json") == "api:user/login.json"
+    assert store.key("api", str(tmp_path / "elsewhere.json")) is None
+    assert store.key("api", "") is None
+
+
+def test_remote_result_is_recorded_and_reused(store, tmp_path):
+    local = str(tmp_path / "api_test" / "testcases" / "user" / "login.json")
+    store.record(result("/srv/worker/gxpt/api_test/testcases/user/login.json"))
+    store.save()
+
+    reloaded = ResultStore("test", path=store.path)
+    reloaded.base_dir = store.base_dir
+    selected, reused = reloaded.select("api", [{"name": "登录", "file_path": local}], changed_only=True)
+
+    assert selected == []
+    assert reused[0]["status"] == "passed"
+    assert reused[0]["reused"] is True
+    assert "response" not in reused[0]
+
+
+def test_unrecordable_result_is_logged(store, tmp_path):
+    messages = []
+    from loguru import logger
+    handler = logger.add(messages.append, level="WARNING")
+    try:
+        store.record(result(str(tmp_path / "elsewhere.json")))
+    finally:
+        logger.remove(handler)
+
+    assert store._entries == {}
+    assert any("无法记录用例结果" in str(message) for message in messages)
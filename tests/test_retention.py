@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import gzip
+import json
+from collections import namedtuple
+
+from common import retention as retention_module
+from common.retention import RetentionEngine, COMPACT_MIN_SIZE, DAY
+
+SUMMARY = {"total": 4, "passed": 3, "failed": 1, "skipped": 0, "pass_rate": 75.0}
+
+
+def make_engine(catalog, tmp_path, **kwargs):
+    catalog.reconcile()
+    return RetentionEngine(catalog=catalog, base_dir=str(tmp_path), **kwargs)
+
+
+def test_from_config_disabled_by_default():
+    assert RetentionEngine.from_config(None) is None
+    assert RetentionEngine.from_config({"reports": {"html": {"max_age_days": 1}}}) is None
+
+
+def test_max_age_deletes_old_reports_and_sidecars(catalog, reports_dir, tmp_path, write_report):
+    old = write_report("report_20250101_000000.html", age_days=40, sidecar=True)
+    new = write_report("report_20250301_000000.html", age_days=5, sidecar=True)
+    engine = make_engine(catalog, tmp_path, policies={"html": {"max_age_days": 30}})
+
+    stats = engine.run()
+
+    assert stats["deleted"] == 1
+    assert not os.path.exists(old)
+    assert not os.path.exists(os.path.join(reports_dir, "report_20250101_000000.ndjson"))
+    assert not os.path.exists(os.path.join(reports_dir, "report_20250101_000000.ndjson.idx"))
+    assert os.path.exists(new)
+    assert catalog.get("report_20250101_000000.html") is None
+    assert catalog.count() == 1
+
+
+def test_policy_only_applies_to_its_report_type(catalog, tmp_path, write_report):
+    html = write_report("report_20250101_000000.html", age_days=40, sidecar=True)
+    json_report = write_report("report_20250102_000000.json.gz", age_days=40, sidecar=True)
+    engine = make_engine(catalog, tmp_path, policies={"json": {"max_age_days": 30}})
+
+    engine.run()
+
+    assert os.path.exists(html)
+    assert not os.path.exists(json_report)
+
+
+def test_max_count_keeps_newest_reports(catalog, tmp_path, write_report):
+    paths = [write_report(f"report_2025010{day}_000000.html", age_days=10 - day, sidecar=True)
+             for day in range(1, 6)]
+    engine = make_engine(catalog, tmp_path, policies={"html": {"max_count": 2}})
+
+    stats = engine.run()
+
+    assert stats["deleted"] == 3
+    assert [os.path.exists(path) for path in paths] == [False, False, False, True, True]
+
+
+def test_summary_after_days_compacts_large_reports(catalog, reports_dir, tmp_path, write_report):
+    large = write_report("report_20250101_000000.html", age_days=10, size=COMPACT_MIN_SIZE * 2,
+                         summary=SUMMARY)
+    small = write_report("report_20250102_000000.html", age_days=10, summary=SUMMARY)
+    unsummarized = write_report("report_20250103_000000.html", age_days=10, size=COMPACT_MIN_SIZE * 2, sidecar=True)
+    recent = write_report("report_20250104_000000.html", age_days=1, size=COMPACT_MIN_SIZE * 2,
+                          summary=SUMMARY)
+    mtime = os.stat(large).st_mtime_ns
+    engine = make_engine(catalog, tmp_path, policies={"html": {"summary_after_days": 7}})
+
+    stats = engine.run()
+
+    assert stats["compacted"] == 1
+    assert stats.get("deleted", 0) == 0
+    assert os.path.getsize(large) < COMPACT_MIN_SIZE
+    assert os.stat(large).st_mtime_ns == mtime
+    assert not os.path.exists(os.path.join(reports_dir, "report_20250101_000000.ndjson"))
+    assert catalog.get("report_20250101_000000.html")["failed"] == 1
+    for path in (small, unsummarized, recent):
+        assert os.path.getsize(path) >= 100
+    assert not [name for name in os.listdir(reports_dir) if name.startswith(".compact_")]
+
+    # 已压缩的报告小于COMPACT_MIN_SIZE，不会被重复压缩
+    assert engine.run().get("compacted", 0) == 0
+
+
+def test_summary_after_days_keeps_compression(catalog, tmp_path, write_report):
+    path = write_report("report_20250101_000000.json.gz", age_days=10, summary=SUMMARY)
+    # 写入随机内容，使压缩后的大小超过COMPACT_MIN_SIZE
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(os.urandom(COMPACT_MIN_SIZE).hex())
+    old = time.time() - 10 * DAY
+    os.utime(path, (old, old))
+    engine = make_engine(catalog, tmp_path, policies={"json": {"summary_after_days": 7}})
+
+    assert engine.run()["compacted"] == 1
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["compacted"] is True
+    assert report["summary"] == SUMMARY
+
+
+def test_attachments_pruned_by_age_and_pattern(catalog, tmp_path):
+    screenshots = tmp_path / "screenshots"
+    screenshots.mkdir()
+    old = time.time() - 10 * DAY
+    for name in ("old.png", "old.log", ".keep"):
+        (screenshots / name).write_text("x")
+        os.utime(screenshots / name, (old, old))
+    (screenshots / "new.png").write_text("x")
+    old_dir = screenshots / "old_run.png"
+    old_dir.mkdir()
+    (old_dir / "step.png").write_text("xx")
+    os.utime(old_dir, (old, old))
+    engine = make_engine(catalog, tmp_path, attachments=[
+        {"path": "screenshots", "pattern": "*.png", "max_age_days": 7}])
+
+    stats = engine.run()
+
+    assert stats["attachments"] == 2
+    assert sorted(os.listdir(screenshots)) == [".keep", "new.png", "old.log"]
+
+
+def test_batch_size_limits_each_run(catalog, tmp_path, write_report):
+    for day in range(1, 6):
+        write_report(f"report_2025010{day}_000000.html", age_days=40, sidecar=True)
+    engine = make_engine(catalog, tmp_path, policies={"html": {"max_age_days": 30}}, batch_size=2)
+
+    assert engine.run()["deleted"] == 2
+    assert engine.run()["deleted"] == 2
+    assert catalog.count() == 1
+
+
+def test_disk_pressure_keeps_newest_report_per_type(catalog, tmp_path, monkeypatch, write_report):
+    paths = [write_report(f"report_2025010{day}_000000.html", age_days=10 - day, sidecar=True)
+             for day in range(1, 4)]
+    json_report = write_report("report_20250104_000000.json", age_days=9, sidecar=True)
+    usage = namedtuple("usage", "total used free")
+    monkeypatch.setattr(retention_module.shutil, "disk_usage", lambda path: usage(100, 100, 0))
+    engine = make_engine(catalog, tmp_path, min_free_mb=1)
+
+    stats = engine.run()
+
+    assert stats["deleted"] == 2
+    assert [os.path.exists(path) for path in paths] == [False, False, True]
+    assert os.path.exists(json_report)
+
+
+def test_no_policies_deletes_nothing(catalog, tmp_path, write_report):
+    path = write_report("report_20250101_000000.html", age_days=400, size=COMPACT_MIN_SIZE * 2,
+                        summary=SUMMARY)
+    engine = make_engine(catalog, tmp_path)
+
+    assert engine.run() == {}
+    assert os.path.exists(path)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from common.duration_history import DurationHistory
+from common.scheduling import CaseScheduler
+
+
+def test_empty_history_is_not_replaced_by_shared_history(tmp_path):
+    history = DurationHistory(str(tmp_path / "history.json"))
+    scheduler = CaseScheduler("api", history=history)
+
+    assert scheduler.history is history
+
+    scheduler.record({"module": "api", "submodule": "", "name": "benchmark_0", "duration": 0.5,
+                      "status": "passed"})
+    scheduler.finish("API")
+    assert DurationHistory(str(tmp_path / "history.json")).estimate("api//benchmark_0") == 0.5
+
+
+def test_lpt_orders_longest_cases_first(tmp_path):
+    history = DurationHistory(str(tmp_path / "history.json"))
+    for name, duration in (("short", 0.1), ("long", 5.0), ("medium", 1.0)):
+        history.record({"module": "api", "submodule": "", "name": name, "duration": duration, "status": "passed"})
+    scheduler = CaseScheduler("api", history=history)
+
+    ordered = scheduler.order([{"name": "short"}, {"name": "medium"}, {"name": "long"}], workers=2)
+
+    assert [case["name"] for case in ordered] == ["long", "medium", "short"]
+    assert scheduler.predicted == 5.0
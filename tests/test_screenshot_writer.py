@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+
+from ui_test.screenshot_writer import ScreenshotWriter
+
+
+def wait_written(writer, count, timeout=5):
+    """等待后台线程写入指定数量的截图"""
+    deadline = time.time() + timeout
+    while writer.written < count and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_duplicate_frame_reuses_written_screenshot(tmp_path):
+    writer = ScreenshotWriter(str(tmp_path), optimize=False)
+    first = writer.submit(b"frame", "1.png", stream="main")
+    wait_written(writer, 1)
+
+    assert writer.submit(b"frame", "2.png", stream="main") == first
+    assert writer.submit(b"frame", "3.png", stream="other").endswith("3.png")
+    writer.close()
+    assert writer.deduplicated == 1
+    assert sorted(os.listdir(tmp_path)) == ["1.png", "3.png"]
+
+
+def test_failed_write_is_not_used_for_dedup(tmp_path):
+    writer = ScreenshotWriter(str(tmp_path), optimize=False)
+    # 子目录不存在，写入失败
+    writer.submit(b"frame", os.path.join("missing", "1.png"), stream="main")
+    writer.close()
+    assert writer.written == 0
+    assert writer._used_bytes == 0
+
+    writer = ScreenshotWriter(str(tmp_path), optimize=False)
+    writer.submit(b"frame", os.path.join("missing", "1.png"), stream="main")
+    second = writer.submit(b"frame", "2.png", stream="main")
+    writer.close()
+    assert second.endswith("2.png")
+    assert os.listdir(tmp_path) == ["2.png"]
+    assert writer.deduplicated == 0
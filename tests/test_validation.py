@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from api_test import validation
+from api_test.validation import ResponseValidator, SchemaValidatorCache
+
+SCHEMA = {"type": "object", "required": ["id"]}
+
+
+def test_new_validator_keeps_compiled_schemas(monkeypatch):
+    monkeypatch.setattr(validation, "_validator_cache", SchemaValidatorCache(4))
+    ResponseValidator(cache_size=4).precompile([SCHEMA])
+
+    ResponseValidator(cache_size=2)
+    assert validation._validator_cache.stats()["size"] == 1
+    assert validation._validator_cache.max_size == 4
+
+    ResponseValidator(cache_size=16)
+    assert validation._validator_cache.stats()["size"] == 1
+    assert validation._validator_cache.max_size == 16
+
+
+def test_inline_validation_returns_only_verdict(monkeypatch):
+    monkeypatch.setattr(validation, "_validator_cache", SchemaValidatorCache())
+    validator = ResponseValidator()
+
+    assert validator.validate('{"id": 1}', {"id": 1}, SCHEMA) == (None, None)
+    error, detail = validator.validate('{"name": "x"}', schema=SCHEMA)
+    assert error.startswith("JSON Schema验证失败")
+    assert validator.validate("not json", {"id": 1}, check=False) == (None, None)
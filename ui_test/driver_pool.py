@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from loguru import logger
+
+
+# 每个进程只解析一次WebDriver可执行文件路径
+_driver_paths = {}
+_driver_paths_lock = threading.Lock()
+
+
+def resolve_driver_path(browser_type):
+    """
+    获取浏览器对应的WebDriver可执行文件路径，同一进程内只下载/解析一次
+
+    Args:
+        browser_type: 浏览器类型，可选值为 chrome, firefox, edge
+
+    Returns:
+        WebDriver可执行文件路径
+    """
+    browser_type = browser_type.lower()
+    with _driver_paths_lock:
+        path = _driver_paths.get(browser_type)
+        if path is None:
+            if browser_type == "firefox":
+                from webdriver_manager.firefox import GeckoDriverManager
+                path = GeckoDriverManager().install()
+            elif browser_type == "edge":
+                from webdriver_manager.microsoft import EdgeChromiumDriverManager
+                path = EdgeChromiumDriverManager().install()
+            else:
+                from webdriver_manager.chrome import ChromeDriverManager
+                path = ChromeDriverManager().install()
+            _driver_paths[browser_type] = path
+            logger.info(f"WebDriver路径: {browser_type} -> {path}")
+        return path
+
+
+class PooledDriver:
+    """池中的WebDriver实例及其已执行的用例数"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class WebDriverPool:
+    """预热的WebDriver实例池，用例之间重置浏览器状态，使用N次后回收重建"""
+
+    def __init__(self, create_driver, size=1, max_uses=20):
+        """
+        初始化WebDriver池
+
+        Args:
+            create_driver: 创建WebDriver实例的函数
+            size: 池中最多同时存在的实例数，通常等于并行线程数
+            max_uses: 单个实例执行的最大用例数，达到后关闭并重建
+        """
+        self.create_driver = create_driver
+        self.size = max(1, int(size))
+        self.max_uses = max(1, int(max_uses))
+        self._idle = []
+        self._busy = {}
+        self._created = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        借出一个WebDriver实例，有空闲实例时复用，池未满时新建，否则等待其他用例归还
+
+        Returns:
+            WebDriver实例
+        """
+        with self._cond:
+            while True:
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    pooled = None
+                    break
+                self._cond.wait()
+
+        if pooled is None:
+            try:
+                pooled = PooledDriver(self.create_driver())
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+
+        pooled.uses += 1
+        with self._cond:
+            self._busy[id(pooled.driver)] = pooled
+        return pooled.driver
+
+    def release(self, driver, discard=False):
+        """
+        归还WebDriver实例，重置浏览器状态后放回池中
+
+        Args:
+            driver: acquire 借出的WebDriver实例
+            discard: 为True时直接关闭该实例，例如浏览器会话已失效
+        """
+        with self._cond:
+            pooled = self._busy.pop(id(driver), None)
+        if pooled is None:
+            return
+
+        if not discard and pooled.uses < self.max_uses:
+            try:
+                self.reset(driver)
+                with self._cond:
+                    self._idle.append(pooled)
+                    self._cond.notify()
+                return
+            except Exception as e:
+                logger.warning(f"重置浏览器状态失败，将重建实例: {str(e)}")
+        elif pooled.uses >= self.max_uses:
+            logger.debug(f"WebDriver实例已执行 {pooled.uses} 个用例，关闭并回收")
+
+        self._quit(driver)
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def reset(self, driver):
+        """
+        清除Cookie和本地存储，并切换到新的空白标签页
+
+        Args:
+            driver: WebDriver实例
+        """
+        try:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            # about:blank 等页面没有可访问的存储
+            pass
+
+        if hasattr(driver, "execute_cdp_cmd"):
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        else:
+            driver.delete_all_cookies()
+
+        old_handles = list(driver.window_handles)
+        driver.switch_to.new_window("tab")
+        new_handle = driver.current_window_handle
+        for handle in old_handles:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(new_handle)
+
+    def close(self):
+        """关闭池中所有实例"""
+        with self._cond:
+            drivers = [pooled.driver for pooled in self._idle] + [pooled.driver for pooled in self._busy.values()]
+            self._idle = []
+            self._busy = {}
+            self._created = 0
+            self._cond.notify_all()
+        for driver in drivers:
+            self._quit(driver)
+
+    def _quit(self, driver):
+        """关闭浏览器"""
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"关闭浏览器失败: {str(e)}")
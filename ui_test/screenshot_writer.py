@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import queue
+import hashlib
+import threading
+from loguru import logger
+
+
+class ScreenshotWriter:
+    """后台截图写入器，在独立线程中压缩和保存截图，跳过连续重复的画面，并限制单次运行的磁盘占用"""
+
+    def __init__(self, screenshot_dir, quota_mb=500, optimize=True, queue_size=100):
+        """
+        初始化截图写入器
+
+        Args:
+            screenshot_dir: 截图保存目录
+            quota_mb: 单次运行最多写入的截图大小(MB)，为0时不限制
+            optimize: 是否使用Pillow重新压缩PNG，未安装Pillow时直接写入原始数据
+            queue_size: 等待写入的截图数上限，写入跟不上时截图线程在此等待
+        """
+        self.screenshot_dir = screenshot_dir
+        self.quota_mb = quota_mb
+        self.quota_bytes = int(float(quota_mb) * 1024 * 1024)
+        self.optimize = optimize
+        self.written = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self._used_bytes = 0
+        self._last_frames = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._thread = threading.Thread(target=self._worker, name="screenshot-writer", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, screenshot_dir, screenshot_config):
+        """
+        根据配置创建截图写入器
+
+        Args:
+            screenshot_dir: 截图保存目录
+            screenshot_config: 截图配置字典，对应配置文件中的 ui.screenshots
+
+        Returns:
+            ScreenshotWriter实例
+        """
+        screenshot_config = screenshot_config or {}
+        return cls(
+            screenshot_dir,
+            quota_mb=screenshot_config.get('quota_mb', 500),
+            optimize=screenshot_config.get('optimize', True),
+            queue_size=screenshot_config.get('queue_size', 100)
+        )
+
+    def submit(self, png, filename, stream=None):
+        """
+        提交一张截图，编码和写入在后台线程完成
+
+        Args:
+            png: 截图的PNG数据
+            filename: 截图文件名
+            stream: 画面来源标识，同一来源与上一张截图内容相同时不再写入
+
+        Returns:
+            截图路径；与上一张已写入的截图相同时返回该截图的路径，超过磁盘配额时返回None
+        """
+        digest = hashlib.sha1(png).hexdigest()
+        with self._lock:
+            last = self._last_frames.get(stream)
+            if last and last[0] == digest:
+                self.deduplicated += 1
+                return last[1]
+
+            # 先按原始大小预占配额，写入后按实际大小修正
+            if self.quota_bytes and self._used_bytes + len(png) > self.quota_bytes:
+                self.dropped += 1
+                logger.warning(f"截图超过磁盘配额 {self.quota_mb}MB，跳过: {filename}")
+                return None
+            self._used_bytes += len(png)
+
+        # 写入成功后才记为该来源的上一张截图，写入失败的截图不会被后续相同画面引用
+        filepath = os.path.join(self.screenshot_dir, filename)
+        self._queue.put((png, filepath, stream, digest))
+        return filepath
+
+    def close(self):
+        """等待队列中的截图全部写入后停止后台线程"""
+        self._queue.put(None)
+        self._thread.join()
+        logger.debug(f"截图写入完成: 写入 {self.written} 张, 重复跳过 {self.deduplicated} 张, "
+                     f"超出配额 {self.dropped} 张, 共 {self._used_bytes / 1024 / 1024:.1f}MB")
+
+    def _worker(self):
+        """后台写入线程"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            png, filepath, stream, digest = item
+            try:
+                data = self._encode(png)
+                with open(filepath, "wb") as f:
+                    f.write(data)
+            except Exception as e:
+                logger.error(f"保存截图失败: {filepath}, 错误: {str(e)}")
+                with self._lock:
+                    # 释放预占的配额
+                    self._used_bytes -= len(png)
+                continue
+            with self._lock:
+                self._used_bytes += len(data) - len(png)
+                self.written += 1
+                self._last_frames[stream] = (digest, filepath)
+            logger.debug(f"截图已保存: {filepath}")
+
+    def _encode(self, png):
+        """使用Pillow重新压缩PNG，结果更大或压缩失败时返回原始数据"""
+        if not self.optimize:
+            return png
+        try:
+            from PIL import Image
+        except ImportError:
+            return png
+
+        try:
+            with Image.open(io.BytesIO(png)) as image:
+                output = io.BytesIO()
+                image.save(output, format="PNG", optimize=True)
+            data = output.getvalue()
+            return data if len(data) < len(png) else png
+        except Exception as e:
+            logger.warning(f"压缩截图失败，保存原始数据: {str(e)}")
+            return png
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from loguru import logger
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+# 定位方式映射
+LOCATOR_MAP = {
+    "id": By.ID,
+    "name": By.NAME,
+    "class": By.CLASS_NAME,
+    "tag": By.TAG_NAME,
+    "link": By.LINK_TEXT,
+    "partial_link": By.PARTIAL_LINK_TEXT,
+    "css": By.CSS_SELECTOR,
+    "xpath": By.XPATH
+}
+
+# 各动作执行前元素需要满足的就绪条件
+ACTION_READINESS = {
+    "click": "clickable",
+    "submit": "clickable",
+    "input": "clickable",
+    "clear": "clickable",
+    "select": "clickable",
+    "press_key": "clickable",
+    "hover": "visible",
+    "assert_text": "visible",
+    "assert_value": "visible",
+    "assert_visible": "visible",
+    "assert_enabled": "visible",
+    "assert_disabled": "visible",
+    "assert_selected": "present",
+    "assert_not_selected": "present",
+    "assert_not_visible": "present",
+    "scroll_to": "present",
+}
+
+# 默认需要在执行后等待页面网络空闲的动作
+NAVIGATION_ACTIONS = {"click", "submit", "press_key", "refresh", "back", "forward"}
+
+# 页面加载完成、没有未完成的fetch/XHR请求，且最近一次请求开始或结束后已安静一段时间时视为网络空闲；
+# 页面加载完成且最近一段时间内DOM没有变化时视为DOM空闲。
+# 首次执行时在页面中安装计数器：包装fetch和XMLHttpRequest统计未完成请求，用PerformanceObserver记录
+# 资源加载完成的时间，用MutationObserver记录DOM最后一次变化的时间；不依赖资源计时缓冲区中的条目数，
+# 缓冲区写满(默认150条)后仍能检测到新请求
+NETWORK_STATE_SCRIPT = """
+var state = window.__stepEngineNetwork;
+if (!state) {
+    state = window.__stepEngineNetwork = {pending: 0, last: performance.now(), dom: performance.now()};
+    var touch = function () { state.last = performance.now(); };
+    if (window.MutationObserver && document.documentElement) {
+        new MutationObserver(function () { state.dom = performance.now(); }).observe(
+            document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+    }
+    var done = function () { state.pending = Math.max(0, state.pending - 1); touch(); };
+    if (window.PerformanceObserver) {
+        try { new PerformanceObserver(touch).observe({type: 'resource'}); } catch (e) {}
+    }
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            state.pending++; touch();
+            return fetch.apply(this, arguments).then(
+                function (response) { done(); return response; },
+                function (error) { done(); throw error; });
+        };
+    }
+    if (window.XMLHttpRequest) {
+        var send = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function () {
+            state.pending++; touch();
+            this.addEventListener('loadend', done);
+            return send.apply(this, arguments);
+        };
+    }
+}
+return [document.readyState, state.pending, performance.now() - state.last, performance.now() - state.dom];
+"""
+
+
+class StepEngine:
+    """UI步骤执行引擎，按动作等待显式就绪条件，并记录每个步骤的等待耗时"""
+
+    def __init__(self, driver, timeout=30, poll_interval=0.1, idle_window=0.5):
+        """
+        初始化步骤执行引擎
+
+        Args:
+            driver: WebDriver实例，应关闭隐式等待
+            timeout: 等待元素就绪的超时时间(秒)
+            poll_interval: 检查就绪条件的间隔(秒)
+            idle_window: 判定网络空闲所需的无请求开始或结束的时长(秒)
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.idle_window = idle_window
+        self.step_results = []
+
+    def run_step(self, step, index):
+        """
+        执行一个测试步骤
+
+        步骤中的 wait 是执行后等待就绪条件的最长时间，条件满足后立即进入下一步；
+        未配置 until 时，导航类动作在 wait 时间内等待网络空闲，其余动作在 wait 时间内等待DOM空闲；
+        只有 until 为 sleep 时才固定等待 wait 秒。
+
+        Args:
+            step: 步骤数据
+            index: 步骤序号，从0开始
+
+        Returns:
+            步骤结果字典，包含 wait_time(元素就绪等待)、settle_time(执行后等待) 和 duration，
+            同时追加到 step_results 中，失败的步骤也会保留
+        """
+        action = step.get("action", "").lower()
+        step_result = {
+            "name": step.get("name", f"步骤 {index + 1}"),
+            "action": action,
+            "status": "failed",
+            "wait_time": 0,
+            "settle_time": 0,
+            "duration": 0
+        }
+        self.step_results.append(step_result)
+
+        start_time = time.time()
+        try:
+            # 等待元素满足动作所需的就绪条件
+            element = None
+            locator = self._locator(step.get("locator", {}))
+            if locator:
+                condition = step.get("wait_for") or ACTION_READINESS.get(action, "visible")
+                wait_start = time.time()
+                try:
+                    element = self._wait_element(condition, locator, self.timeout)
+                finally:
+                    step_result["wait_time"] = round(time.time() - wait_start, 3)
+
+            url_before = self.driver.current_url if self._needs_url(step) else None
+            self._perform(action, element, step.get("value", ""))
+
+            # 执行后等待页面就绪，wait 为最长等待时间
+            settle_start = time.time()
+            try:
+                self._settle(step, action, url_before)
+            finally:
+                step_result["settle_time"] = round(time.time() - settle_start, 3)
+
+            step_result["status"] = "passed"
+            return step_result
+        finally:
+            step_result["duration"] = round(time.time() - start_time, 3)
+            logger.debug(f"步骤 {step_result['name']}: 元素等待 {step_result['wait_time']:.3f}秒, "
+                         f"执行后等待 {step_result['settle_time']:.3f}秒")
+
+    def wait_network_idle(self, timeout):
+        """
+        等待页面加载完成、没有未完成的请求，且在空闲窗口内没有请求开始或结束
+
+        Args:
+            timeout: 最长等待时间(秒)
+
+        Returns:
+            在超时前达到空闲时返回True
+        """
+        return self._wait_page_idle(timeout, dom=False)
+
+    def wait_dom_idle(self, timeout):
+        """
+        等待页面加载完成，且在空闲窗口内DOM没有变化
+
+        Args:
+            timeout: 最长等待时间(秒)
+
+        Returns:
+            在超时前达到空闲时返回True
+        """
+        return self._wait_page_idle(timeout, dom=True)
+
+    def _wait_page_idle(self, timeout, dom):
+        """轮询页面中的计数器，dom为True时等待DOM空闲，否则等待网络空闲"""
+        deadline = time.time() + timeout
+        while True:
+            try:
+                ready_state, pending, network_quiet_ms, dom_quiet_ms = self.driver.execute_script(
+                    NETWORK_STATE_SCRIPT)
+            except Exception:
+                # 页面跳转过程中脚本可能执行失败
+                ready_state, pending, network_quiet_ms, dom_quiet_ms = "loading", None, 0, 0
+
+            if ready_state == "complete":
+                if dom and dom_quiet_ms >= self.idle_window * 1000:
+                    return True
+                if not dom and pending == 0 and network_quiet_ms >= self.idle_window * 1000:
+                    return True
+
+            now = time.time()
+            if now >= deadline:
+                return False
+            time.sleep(min(self.poll_interval, max(0, deadline - now)))
+
+    def _settle(self, step, action, url_before):
+        """执行后等待 until 条件，未达到显式条件时抛出超时异常"""
+        wait = float(step.get("wait", 0) or 0)
+        until = step.get("until")
+        if until is None:
+            # 未显式配置时，在 wait 时间内尽量等待页面就绪：导航类动作等待网络空闲，其余动作等待DOM空闲
+            if wait > 0 and action in NAVIGATION_ACTIONS:
+                self.wait_network_idle(wait)
+            elif wait > 0:
+                self.wait_dom_idle(wait)
+            return
+
+        if isinstance(until, str):
+            until = {"condition": until}
+        condition = until.get("condition", "network_idle")
+        timeout = wait if wait > 0 else self.timeout
+
+        if condition == "none":
+            return
+        if condition == "sleep":
+            # 显式配置的固定等待
+            time.sleep(wait)
+            return
+        if condition == "network_idle":
+            if not self.wait_network_idle(timeout):
+                raise TimeoutException(f"等待网络空闲超时 ({timeout}秒)")
+        elif condition == "dom_idle":
+            if not self.wait_dom_idle(timeout):
+                raise TimeoutException(f"等待DOM空闲超时 ({timeout}秒)")
+        elif condition == "url_changed":
+            WebDriverWait(self.driver, timeout, poll_frequency=self.poll_interval).until(
+                EC.url_changes(url_before), f"等待URL变化超时 ({timeout}秒)")
+        else:
+            locator = self._locator(until.get("locator", {}))
+            if not locator:
+                raise ValueError(f"等待条件 {condition} 需要指定 locator")
+            self._wait_element(condition, locator, timeout)
+
+    def _wait_element(self, condition, locator, timeout):
+        """等待元素满足就绪条件并返回元素"""
+        conditions = {
+            "visible": EC.visibility_of_element_located,
+            "clickable": EC.element_to_be_clickable,
+            "present": EC.presence_of_element_located
+        }
+        if condition not in conditions:
+            raise ValueError(f"不支持的等待条件: {condition}")
+        return WebDriverWait(self.driver, timeout, poll_frequency=self.poll_interval).until(
+            conditions[condition](locator), f"等待元素{condition}超时: {locator[1]} ({timeout}秒)")
+
+    def _needs_url(self, step):
+        """是否需要记录执行前的URL"""
+        until = step.get("until")
+        if isinstance(until, dict):
+            until = until.get("condition")
+        return until == "url_changed"
+
+    @staticmethod
+    def _locator(locator):
+        """将用例中的定位器转换为 (By, 表达式)，未指定表达式时返回None"""
+        locator_value = locator.get("value", "")
+        if not locator_value:
+            return None
+        by = LOCATOR_MAP.get(locator.get("type", "css").lower(), By.CSS_SELECTOR)
+        return by, locator_value
+
+    def _perform(self, action, element, value):
+        """
+        执行动作
+
+        Args:
+            action: 动作名称
+            element: 已就绪的元素，没有定位器时为None
+            value: 值
+        """
+        from selenium.webdriver.common.action_chains import ActionChains
+        from selenium.webdriver.common.keys import Keys
+
+        driver = self.driver
+
+        # 执行动作
+        if action == "click":
+            element.click()
+
+        elif action == "input":
+            element.clear()
+            element.send_keys(value)
+
+        elif action == "select":
+            from selenium.webdriver.support.ui import Select
+            select = Select(element)
+            select.select_by_visible_text(value)
+
+        elif action == "hover":
+            ActionChains(driver).move_to_element(element).perform()
+
+        elif action == "submit":
+            element.submit()
+
+        elif action == "clear":
+            element.clear()
+
+        elif action == "press_key":
+            # 映射特殊键
+            key_map = {
+                "enter": Keys.ENTER,
+                "tab": Keys.TAB,
+                "escape": Keys.ESCAPE,
+                "space": Keys.SPACE,
+                "backspace": Keys.BACKSPACE,
+                "delete": Keys.DELETE,
+                "arrow_up": Keys.ARROW_UP,
+                "arrow_down": Keys.ARROW_DOWN,
+                "arrow_left": Keys.ARROW_LEFT,
+                "arrow_right": Keys.ARROW_RIGHT
+            }
+
+            key = key_map.get(value.lower(), value)
+            element.send_keys(key)
+
+        elif action == "wait":
+            # 显式配置的固定等待
+            time.sleep(float(value) if value else 1)
+
+        elif action == "assert_text":
+            assert value in element.text, f"断言失败: 期望文本 '{value}' 不在实际文本 '{element.text}' 中"
+
+        elif action == "assert_value":
+            assert value == element.get_attribute("value"), f"断言失败: 期望值 '{value}' 不等于实际值 '{element.get_attribute('value')}'"
+
+        elif action == "assert_visible":
+            assert element.is_displayed(), "断言失败: 元素不可见"
+
+        elif action == "assert_not_visible":
+            assert not element.is_displayed(), "断言失败: 元素可见"
+
+        elif action == "assert_enabled":
+            assert element.is_enabled(), "断言失败: 元素不可用"
+
+        elif action == "assert_disabled":
+            assert not element.is_enabled(), "断言失败: 元素可用"
+
+        elif action == "assert_selected":
+            assert element.is_selected(), "断言失败: 元素未被选中"
+
+        elif action == "assert_not_selected":
+            assert not element.is_selected(), "断言失败: 元素被选中"
+
+        elif action == "execute_script":
+            driver.execute_script(value)
+
+        elif action == "scroll_to":
+            driver.execute_script("arguments[0].scrollIntoView(true);", element)
+
+        elif action == "refresh":
+            driver.refresh()
+
+        elif action == "back":
+            driver.back()
+
+        elif action == "forward":
+            driver.forward()
+
+        else:
+            raise ValueError(f"不支持的动作: {action}")
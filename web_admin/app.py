@@ -11,7 +11,7 @@ import json
 import time
 import subprocess
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash, send_from_directory, make_response
+from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash, send_from_directory, make_response, send_file, Response, stream_with_context
 from werkzeug.security import check_password_hash
 import threading
 from functools import wraps
@@ -37,6 +37,8 @@ print("Python路径:", sys.path)
 
 # 添加当前目录到系统路径
 sys.path.append(current_dir)
+# 添加项目根目录到系统路径，用于读取报告结果索引
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     # 导入模型
@@ -47,6 +49,11 @@ try:
     from utils.dingtalk import DingTalkNotifier
     # 恢复知识库模块的导入
     from routes.knowledge import knowledge
+    from common.report_index import ResultIndexReader, sidecar_path
+    from common.report_catalog import ReportCatalog, SORT_COLUMNS
+    from common.report_storage import find_report, content_encoding, open_decompressed
+    from common.config_manager import ConfigManager
+    from common.retention import RetentionEngine
     print("导入模块成功")
 except Exception as e:
     print("导入模块失败:", str(e))
@@ -139,6 +146,11 @@ except Exception as e:
 scheduler = get_scheduler()
 scheduler.start()
 
+# 报告保留策略在调度器中后台执行
+retention = RetentionEngine.from_config(ConfigManager().get('retention'))
+if retention:
+    scheduler.add_maintenance_job('retention', retention.interval, retention.run)
+
 # ==== 访问控制装饰器 ====
 def login_required(f):
     @wraps(f)
@@ -174,7 +186,7 @@ def index():
     
     return render_template('dashboard.html',
         tasks_count=len(get_task_list()),
-        reports_count=len(get_report_list()),
+        reports_count=get_report_list(per_page=1)[0],
         users_count=len(User.get_all_users()),
         error_count=count_errors_in_reports(),
         flask_version=__import__('flask').__version__,
@@ -484,42 +496,93 @@ def view_report(report_id):
     print(f"尝试查看报告: {report_id}")
     
     # 检查报告文件是否存在
-    if not report_id.endswith('.html'):
-        report_id_with_ext = f"{report_id}.html"
-    else:
-        report_id_with_ext = report_id
+    if report_id.endswith('.html'):
         report_id = report_id[:-5]  # 移除.html后缀
+    report_id_with_ext = f"{report_id}.html"
     
-    print(f"查找报告文件: {report_id_with_ext}")
-    
-    # 从项目根目录的reports目录读取报告文件
-    report_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reports', report_id_with_ext)
+    # 从项目根目录的reports目录读取报告文件，报告可能已压缩
+    reports_dir = get_reports_dir()
+    report_file = os.path.join(reports_dir, report_id_with_ext)
     print(f"报告文件路径: {report_file}")
     
-    if not os.path.exists(report_file):
+    if find_report(report_file) is None:
         print(f"报告文件不存在: {report_file}")
         flash('报告文件不存在', 'error')
         return redirect(url_for('reports'))
     
+    # 有结果索引时显示分页查看页，结果按需加载
     try:
-        # 读取报告文件内容
-        with open(report_file, 'r', encoding='utf-8') as f:
-            report_content = f.read()
-            print(f"成功读取报告: {report_id}, 内容长度: {len(report_content)}")
-        
-        # 直接返回HTML内容
-        return report_content
+        reader = ResultIndexReader(sidecar_path(report_file))
+        return render_template('report_viewer.html', report_id=report_id, summary=reader.summary,
+                               facets=reader.facets(), current_user=current_user)
+    except FileNotFoundError:
+        pass
     except Exception as e:
-        print(f"读取报告文件失败: {e}")
-        flash('无法读取报告文件', 'error')
-        return redirect(url_for('reports'))
+        print(f"读取报告结果索引失败: {e}")
+    
+    # 没有结果索引的旧报告直接从磁盘流式返回
+    return redirect(url_for('view_report_raw', report_id=report_id))
+
+# 路由：查看完整的原始报告
+@app.route('/reports/<report_id>/raw')
+@login_required
+def view_report_raw(report_id):
+    report_file = find_report(os.path.join(get_reports_dir(), f"{secure_filename(report_id)}.html"))
+    if report_file is None:
+        return '报告文件不存在', 404
+    
+    encoding = content_encoding(report_file)
+    if encoding is None:
+        return send_from_directory(get_reports_dir(), os.path.basename(report_file))
+    
+    # 客户端支持报告的压缩方式时直接返回压缩内容，否则边读边解压
+    if request.accept_encodings.quality(encoding) > 0:
+        response = send_file(report_file, mimetype='text/html')
+        response.headers['Content-Encoding'] = encoding
+    else:
+        def generate():
+            with open_decompressed(report_file) as f:
+                while True:
+                    chunk = f.read(256 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+        response = Response(stream_with_context(generate()), mimetype='text/html')
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# 路由：分页读取报告结果
+@app.route('/reports/<report_id>/results')
+@login_required
+def report_results(report_id):
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(500, max(1, request.args.get('per_page', 50, type=int)))
+    status = request.args.get('status') or None
+    module = request.args.get('module') or None
+    
+    try:
+        reader = ResultIndexReader(sidecar_path(os.path.join(get_reports_dir(), f"{secure_filename(report_id)}.html")))
+        total, results = reader.page(page, per_page, status=status, module=module)
+    except FileNotFoundError:
+        return jsonify({'success': False, 'message': '报告结果索引不存在'}), 404
+    
+    return jsonify({'success': True, 'total': total, 'page': page, 'per_page': per_page, 'results': results})
 
 # 路由：报告列表
 @app.route('/reports')
 @login_required
 def reports():
-    reports = get_report_list()
-    return render_template('reports.html', reports=reports, current_user=current_user)
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(200, max(1, request.args.get('per_page', 20, type=int)))
+    sort = request.args.get('sort', 'created_at')
+    if sort not in SORT_COLUMNS:
+        sort = 'created_at'
+    order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+    
+    total, reports = get_report_list(page=page, per_page=per_page, sort=sort, order=order)
+    pages = max(1, (total + per_page - 1) // per_page)
+    return render_template('reports.html', reports=reports, total=total, page=page, pages=pages,
+                           per_page=per_page, sort=sort, order=order, current_user=current_user)
 
 # AJAX路由：删除报告
 @app.route('/reports/<report_id_with_ext>', methods=['DELETE'])
@@ -535,31 +598,21 @@ def delete_report_ajax(report_id_with_ext):
     report_id_for_list = report_id_with_ext[:-5] # 用于列表查找的ID (无后缀)
     print(f"[路径处理] 列表查找ID: {report_id_for_list}, 文件名ID: {report_id_with_ext}")
     
-    reports = get_report_list()
-    print(f"[列表检查] 获取到报告列表，共 {len(reports)} 个报告")
+    # 在报告索引中查找要删除的报告
+    report_to_delete = report_catalog.find(report_id_for_list)
+    print(f"[列表检查] 报告 {report_id_for_list} 是否在报告索引中? {report_to_delete is not None}")
     
-    # 找到要删除的报告
-    report_to_delete = None
-    for report in reports:
-        print(f"[列表检查] 比较: {report['id']} (来自列表) vs {report_id_for_list} (处理后)")
-        if report['id'] == report_id_for_list:
-            report_to_delete = report
-            print(f"[列表检查] 在列表中找到匹配的报告: {report['id']}")
-            break
-    
-    # 构造绝对路径
+    # 构造绝对路径，报告可能已压缩
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     absolute_path = os.path.join(base_dir, 'reports', report_id_with_ext)
+    absolute_path = find_report(absolute_path) or absolute_path
     print(f"[文件操作] 构造的文件绝对路径: {absolute_path}")
 
     if report_to_delete:
         print(f"[流程控制] 报告 {report_id_for_list} 在列表中找到，准备从列表移除并删除文件")
-        # 从列表中移除报告
-        reports = [r for r in reports if r['id'] != report_to_delete['id']]
-        
-        # 保存更新后的报告列表
-        save_report_list(reports)
-        print("[列表操作] 已更新报告列表文件 (reports.json)")
+        # 从报告索引中移除报告
+        report_catalog.remove(report_to_delete['filename'])
+        print("[列表操作] 已从报告索引中移除")
         
         # 尝试删除报告文件
         try:
@@ -571,6 +624,7 @@ def delete_report_ajax(report_id_with_ext):
                 print(f"[文件操作] 准备删除文件: {absolute_path}")
                 os.remove(absolute_path)
                 print(f"[文件操作] 成功删除报告文件: {absolute_path}")
+                remove_report_sidecar(absolute_path)
                 return jsonify({'success': True, 'message': '报告已成功删除'})
             else:
                 print(f"[文件警告] 报告文件在磁盘上不存在: {absolute_path} (但已从列表移除)")
@@ -593,6 +647,7 @@ def delete_report_ajax(report_id_with_ext):
                 print(f"[文件操作] 准备删除未在列表中的文件: {absolute_path}")
                 os.remove(absolute_path)
                 print(f"[文件操作] 成功删除未在列表中的报告文件: {absolute_path}")
+                remove_report_sidecar(absolute_path)
                 return jsonify({'success': True, 'message': '报告文件已删除，但在列表中不存在'})
             except Exception as e:
                 print(f"[文件错误] 删除未在列表中的报告文件失败: {e}")
@@ -601,36 +656,25 @@ def delete_report_ajax(report_id_with_ext):
                 return jsonify({'success': False, 'message': f'删除报告文件失败: {str(e)}'})
         else:
             print(f"[最终状态] 报告 {report_id_for_list} 在列表和磁盘上都不存在")
-            # 记录目前的所有报告ID以便调试
-            report_ids = [r['id'] for r in reports]
-            print(f"[调试信息] 当前报告列表中的ID: {report_ids}")
             return jsonify({'success': True, 'message': '报告不存在', 'not_found': True})
 
 # 路由：删除报告（表单提交）
 @app.route('/reports/delete/<report_id>', methods=['POST'])
 @login_required
 def delete_report(report_id):
-    reports = get_report_list()
-    
-    # 找到要删除的报告
-    report_to_delete = None
-    for report in reports:
-        if report['id'] == report_id:
-            report_to_delete = report
-            break
+    # 在报告索引中查找要删除的报告
+    report_to_delete = report_catalog.find(report_id)
     
     if report_to_delete:
-        # 从列表中移除报告
-        reports = [r for r in reports if r['id'] != report_id]
-        
-        # 保存更新后的报告列表
-        save_report_list(reports)
+        # 从报告索引中移除报告
+        report_catalog.remove(report_to_delete['filename'])
         
         # 尝试删除报告文件
         try:
-            report_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reports', f"{report_id}.html")
+            report_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reports', report_to_delete['filename'])
             if os.path.exists(report_file):
                 os.remove(report_file)
+            remove_report_sidecar(report_file)
         except Exception as e:
             print(f"删除报告文件失败: {e}")
         
@@ -780,71 +824,58 @@ def save_task_list(tasks):
     with open(tasks_file, 'w', encoding='utf-8') as f:
         json.dump(tasks, f, ensure_ascii=False, indent=2)
 
-def get_report_list():
-    """获取所有测试报告"""
+def get_reports_dir():
+    """项目根目录下的报告目录"""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reports')
+
+# 报告目录的SQLite索引，报告列表从索引分页查询；生成、删除和按保留策略处理报告时同步更新，
+# 手工复制到报告目录或从中删除的报告在启动时和按间隔在后台同步，请求中不扫描报告目录
+report_catalog = ReportCatalog(get_reports_dir())
+scheduler.add_maintenance_job('report_catalog', ConfigManager().get('report.catalog_sync_interval', 600),
+                              report_catalog.reconcile, run_now=True)
+
+def remove_report_sidecar(report_file):
+    """删除报告对应的NDJSON结果文件和索引"""
+    path = sidecar_path(report_file)
+    for sidecar_file in (path, f"{path}.idx"):
+        if os.path.exists(sidecar_file):
+            os.remove(sidecar_file)
+
+def get_report_list(page=1, per_page=None, sort='created_at', order='desc'):
+    """
+    从报告索引分页查询HTML测试报告
+    
+    Args:
+        page: 页码，从1开始
+        per_page: 每页报告数，为None时返回全部
+        sort: 排序列，可选值见 SORT_COLUMNS
+        order: asc 或 desc
+    
+    Returns:
+        (报告总数, 当前页的报告列表)
+    """
     try:
-        # 从reports目录获取所有报告文件
-        reports_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reports')
-        print(f"查找报告目录: {reports_dir}")
-        
-        if not os.path.exists(reports_dir):
-            print("报告目录不存在!")
-            return []
-        
-        reports = []
-        report_files = os.listdir(reports_dir)
-        print(f"报告目录中的文件: {report_files}")
-        
-        for filename in report_files:
-            if filename.startswith('report_') and filename.endswith('.html'):
-                report_id = filename[:-5]  # 移除.html后缀
-                report_path = os.path.join(reports_dir, filename)
-                
-                # 确保报告文件实际存在且可读
-                if os.path.isfile(report_path) and os.access(report_path, os.R_OK):
-                    try:
-                        create_time = datetime.fromtimestamp(os.path.getctime(report_path)).strftime('%Y-%m-%d %H:%M:%S')
-                        report = {
-                            'id': report_id,
-                            'name': f'测试报告 {report_id}',
-                            'created_at': create_time,
-                            'create_time': create_time,  # 添加这个字段以匹配模板中的使用
-                            'report_url': f'/reports/{report_id}'  # 使用不带后缀的ID作为URL
-                        }
-                        reports.append(report)
-                        print(f"已加载报告: {report_id}")
-                    except Exception as e:
-                        print(f"处理报告 {filename} 时出错: {e}")
-                else:
-                    print(f"警告: 无法访问报告文件: {report_path}")
-        
-        # 按创建时间倒序排序
-        reports.sort(key=lambda x: x['created_at'], reverse=True)
-        print(f"找到 {len(reports)} 个报告")
-        return reports
+        # 报告查看页只能打开HTML报告，JSON和Allure报告不在列表中显示
+        total, reports = report_catalog.list(type='html', page=page, per_page=per_page, sort=sort, order=order)
     except Exception as e:
         print(f"获取报告列表出错: {e}")
         import traceback
         traceback.print_exc()
-        return []
-
-def save_report_list(reports):
-    """保存测试报告列表"""
-    try:
-        # 确保data目录存在
-        reports_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'reports.json')
-        os.makedirs(os.path.dirname(reports_file), exist_ok=True)
-        
-        with open(reports_file, 'w', encoding='utf-8') as f:
-            json.dump(reports, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"保存报告列表出错: {e}")
+        return 0, []
+    
+    for report in reports:
+        report['name'] = f"测试报告 {report['id']}"
+        report['create_time'] = report['created_at']  # 添加这个字段以匹配模板中的使用
+        report['report_url'] = f"/reports/{report['id']}"  # 使用不带后缀的ID作为URL
+    return total, reports
 
 def count_errors_in_reports():
     """统计报告中的错误数"""
-    reports = get_report_list()
-    error_count = sum(report.get('failed_cases', 0) for report in reports)
-    return error_count
+    try:
+        return report_catalog.failed_total(type='html')
+    except Exception as e:
+        print(f"统计报告错误数出错: {e}")
+        return 0
 
 def generate_report(task):
     """根据任务信息生成测试报告"""
@@ -1151,10 +1182,17 @@ def generate_report(task):
     except Exception as e:
         print(f"生成HTML报告失败: {e}")
     
-    # 保存报告信息
-    reports = get_report_list()
-    reports.append(report)
-    save_report_list(reports)
+    # 记录到报告索引
+    try:
+        report_catalog.add(report_file, {
+            'total': total_cases,
+            'passed': passed_cases,
+            'failed': failed_cases,
+            'skipped': 0,
+            'pass_rate': passed_cases / total_cases * 100 if total_cases > 0 else 0
+        })
+    except Exception as e:
+        print(f"更新报告索引失败: {e}")
     
     return report_id
 
@@ -3,7 +3,6 @@
 
 import os
 import json
-import glob
 from datetime import datetime
 
 # 报告数据文件路径
@@ -140,52 +139,40 @@ class Report:
         if not os.path.exists(reports_dir):
             return False, "报告目录不存在"
         
-        # 获取所有报告文件
-        html_reports = glob.glob(os.path.join(reports_dir, 'report_*.html'))
-        json_reports = glob.glob(os.path.join(reports_dir, 'report_*.json'))
-        allure_reports = glob.glob(os.path.join(reports_dir, 'allure_report_*'))
+        # 一次扫描报告目录，按文件名判断报告类型
+        found = []
+        with os.scandir(reports_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('allure_report_'):
+                    found.append((entry.path, 'allure'))
+                elif entry.name.startswith('report_') and entry.name.endswith('.html'):
+                    found.append((entry.path, 'html'))
+                elif entry.name.startswith('report_') and entry.name.endswith('.json'):
+                    found.append((entry.path, 'json'))
+        found.sort()
         
         # 获取已有报告路径
-        existing_reports = Report.get_all_reports()
-        existing_paths = [report.path for report in existing_reports]
+        reports = Report.get_all_reports()
+        existing_paths = {report.path for report in reports}
         
-        # 添加新报告
+        # 添加新报告，全部添加后只保存一次
         new_reports = []
+        for report_path, report_type in found:
+            if report_path in existing_paths:
+                continue
+            new_reports.append(Report(
+                id=str(len(reports) + len(new_reports) + 1),
+                name=os.path.basename(report_path),
+                path=report_path,
+                type=report_type
+            ))
+        
+        if new_reports:
+            try:
+                with open(REPORT_DATA_FILE, 'w', encoding='utf-8') as f:
+                    json.dump([report.to_dict() for report in reports + new_reports], f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                print(f"保存报告数据失败: {str(e)}")
+                return False, str(e)
         
-        # 处理HTML报告
-        for report_path in html_reports:
-            if report_path not in existing_paths:
-                report_name = os.path.basename(report_path)
-                success, report = Report.add_report(
-                    name=report_name,
-                    path=report_path,
-                    type='html'
-                )
-                if success:
-                    new_reports.append(report)
-        
-        # 处理JSON报告
-        for report_path in json_reports:
-            if report_path not in existing_paths:
-                report_name = os.path.basename(report_path)
-                success, report = Report.add_report(
-                    name=report_name,
-                    path=report_path,
-                    type='json'
-                )
-                if success:
-                    new_reports.append(report)
-        
-        # 处理Allure报告
-        for report_path in allure_reports:
-            if report_path not in existing_paths:
-                report_name = os.path.basename(report_path)
-                success, report = Report.add_report(
-                    name=report_name,
-                    path=report_path,
-                    type='allure'
-                )
-                if success:
-                    new_reports.append(report)
-        
-        return True, new_reports 
\ No newline at end of file
+        return True, new_reports
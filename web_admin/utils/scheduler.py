@@ -329,6 +329,41 @@ class TaskScheduler:
         """
         return list(self.tasks.values())
     
+    def add_maintenance_job(self, name, interval_seconds, job, run_now=False):
+        """
+        添加内置维护任务，如报告保留策略；维护任务不保存到任务配置文件，
+        在单独的线程中执行，不阻塞其他定时任务
+        
+        参数:
+            name: 维护任务名称
+            interval_seconds: 执行间隔（秒）
+            job: 无参数的可调用对象
+            run_now: 是否在注册后立即在后台执行一次
+        """
+        tag = f"maintenance_{name}"
+        
+        def job_func():
+            thread = threading.Thread(target=self._run_maintenance, args=(name, job), name=tag)
+            thread.daemon = True
+            thread.start()
+        
+        try:
+            schedule.clear(tag)
+            schedule.every(int(interval_seconds)).seconds.do(job_func).tag(tag)
+            logger.info(f"已注册维护任务: {name}, 间隔: {interval_seconds}秒")
+        except Exception as e:
+            logger.error(f"注册维护任务失败: {name}, 错误: {str(e)}")
+        
+        if run_now:
+            job_func()
+    
+    def _run_maintenance(self, name, job):
+        """执行维护任务并记录错误"""
+        try:
+            job()
+        except Exception as e:
+            logger.error(f"执行维护任务出错: {name}, 错误: {str(e)}")
+    
     def start(self):
         """
         启动调度器